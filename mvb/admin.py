@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Funcao, Funcionario, Financeiro, LavagemCarreta, LavadorSujoEntry, LavadorCargaEntry, TipoCaixa, TipoProduto, Profile
+from .models import Funcao, Funcionario, Financeiro, Lavagem, LavagemCarreta, LavadorSujoEntry, LavadorCargaEntry, TipoCaixa, TipoProduto, Profile, ExportJob, FechamentoMes
 from django.contrib.auth import get_user_model
 from django.contrib import messages
+from .forms import LavagemCarretaForm, LavadorSujoForm, LavadorCargaForm
 
 User = get_user_model()
 
@@ -16,6 +17,23 @@ def aprovar_usuarios(modeladmin, request, queryset):
             count += 1
     messages.success(request, f'{count} usuário(s) aprovados.')
 
+# Visão somente leitura de todas as origens; cadastro, edição e exclusão são feitos
+# pelos proxies de cada origem, com o formulário que exige os campos daquela origem
+@admin.register(Lavagem)
+class LavagemAdmin(admin.ModelAdmin):
+    list_display = ('data', 'origem', 'cliente', 'quantidade_caixas', 'valor_total')
+    list_filter = ('origem', 'tipo_lavagem')
+    date_hierarchy = 'data'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 class UserAdmin(admin.ModelAdmin):
     list_display = ('username', 'email', 'is_staff')
     actions = [aprovar_usuarios]
@@ -26,9 +44,30 @@ admin.site.register(User, UserAdmin)
 admin.site.register(Funcao)
 admin.site.register(Funcionario)
 admin.site.register(Financeiro)
-admin.site.register(LavagemCarreta)
-admin.site.register(LavadorSujoEntry)
-admin.site.register(LavadorCargaEntry)
+admin.site.register(LavagemCarreta, form=LavagemCarretaForm)
+admin.site.register(LavadorSujoEntry, form=LavadorSujoForm)
+admin.site.register(LavadorCargaEntry, form=LavadorCargaForm)
 admin.site.register(TipoCaixa)
 admin.site.register(TipoProduto)
-admin.site.register(Profile)
\ No newline at end of file
+admin.site.register(Profile)
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'solicitado_por', 'criado_em', 'nome_arquivo')
+    list_filter = ('status', 'tipo')
+
+    def get_queryset(self, request):
+        # o arquivo gerado (conteudo) pode ter vários MB por job
+        return super().get_queryset(request).defer('conteudo')
+
+# Fechamentos só nascem pela tela de Fechamento de Mês (FechamentoMes.fechar) e não
+# mudam depois; excluir equivale a reabrir o mês.
+@admin.register(FechamentoMes)
+class FechamentoMesAdmin(admin.ModelAdmin):
+    list_display = ('ano', 'mes', 'receita_total', 'despesas_total', 'lucro', 'fechado_em', 'fechado_por')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,836 @@
+import csv
+import hashlib
+import tempfile
+import zlib
+from functools import reduce
+from heapq import merge
+from itertools import chain, islice
+from operator import or_
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+
+from .models import (
+    FechamentoMes, Financeiro, LavagemCarreta, Presenca, ReceitaDiaria
+)
+from .graficos_svg import CORES
+from .services import (
+    PERIODOS, fechamentos_do_intervalo, filtrar_presencas, intervalo_periodo, lavagens_unificadas,
+    meses_do_intervalo, totais_periodo, total_lavagens, trechos_sem,
+)
+
+# openpyxl, reportlab e weasyprint são importados dentro das funções
+# que os usam: este módulo é carregado pelas urls, e o boot do worker web (e de
+# qualquer manage.py) não deve pagar por bibliotecas que só as exportações usam.
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Linhas lidas por ida ao banco nos .iterator() das exportações
+CHUNK_SIZE = 2000
+
+# O modo write-only grava a largura das colunas antes da primeira linha,
+# então a largura é medida no cabeçalho + nas primeiras linhas da aba.
+AMOSTRA_LARGURA = 500
+
+# Acima disso o arquivo temporário sai da memória e vai para o disco
+LIMITE_MEMORIA = 5 * 1024 * 1024
+
+# Tamanho aproximado de cada pedaço enviado ao cliente nas exportações CSV
+TAMANHO_PEDACO_CSV = 64 * 1024
+
+
+class PlanilhaStreaming:
+    """
+    Workbook do openpyxl em modo write-only: cada linha é serializada assim que
+    chega, então a memória não cresce com o tamanho da exportação.
+
+        planilha = PlanilhaStreaming()
+        planilha.adicionar_aba("Lavagens", cabecalho, linhas)
+        return planilha.resposta("lavagens.xlsx")
+    """
+
+    def __init__(self):
+        from openpyxl import Workbook
+
+        self.wb = Workbook(write_only=True)
+
+    def adicionar_aba(self, titulo, cabecalho, linhas):
+        from openpyxl.utils import get_column_letter
+
+        ws = self.wb.create_sheet(title=titulo)
+        linhas = iter(linhas)
+        amostra = list(islice(linhas, AMOSTRA_LARGURA))
+
+        larguras = {}
+        for linha in chain([cabecalho or []], amostra):
+            for idx, valor in enumerate(linha, start=1):
+                if valor not in (None, ""):
+                    larguras[idx] = max(larguras.get(idx, 0), len(str(valor)))
+        for idx, largura in larguras.items():
+            ws.column_dimensions[get_column_letter(idx)].width = largura + 2
+
+        if cabecalho:
+            ws.append(cabecalho)
+        for linha in chain(amostra, linhas):
+            ws.append(linha)
+
+    def gravar(self, destino):
+        self.wb.save(destino)
+
+    def resposta(self, nome_arquivo):
+        arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA)
+        self.gravar(arquivo)
+        arquivo.seek(0)
+        return FileResponse(
+            arquivo,
+            as_attachment=True,
+            filename=nome_arquivo,
+            content_type=XLSX_CONTENT_TYPE,
+        )
+
+
+class _Eco:
+    """Pseudo-buffer para o csv.writer: devolve a linha em vez de guardar."""
+
+    def write(self, valor):
+        return valor
+
+
+def _linhas_csv(secoes):
+    escritor = csv.writer(_Eco())
+    yield "\ufeff"  # BOM para o Excel reconhecer UTF-8
+    for i, (titulo, cabecalho, linhas) in enumerate(secoes):
+        # várias abas viram blocos separados por uma linha em branco
+        if len(secoes) > 1:
+            if i:
+                yield escritor.writerow([])
+            yield escritor.writerow([titulo])
+        if cabecalho:
+            yield escritor.writerow(cabecalho)
+        for linha in linhas:
+            yield escritor.writerow(linha)
+
+
+def _pedacos_csv(secoes, comprimir):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if comprimir else None
+    buffer = []
+    tamanho = 0
+    for texto in _linhas_csv(secoes):
+        buffer.append(texto)
+        tamanho += len(texto)
+        if tamanho >= TAMANHO_PEDACO_CSV:
+            dados = "".join(buffer).encode("utf-8")
+            buffer, tamanho = [], 0
+            if compressor:
+                dados = compressor.compress(dados)
+            if dados:
+                yield dados
+
+    dados = "".join(buffer).encode("utf-8")
+    if compressor:
+        dados = compressor.compress(dados) + compressor.flush()
+    if dados:
+        yield dados
+
+
+def resposta_csv(secoes, nome_arquivo, comprimir=False):
+    """
+    Exportação CSV (ou CSV gzip) gerada sob demanda: o primeiro pedaço sai
+    assim que as primeiras linhas chegam do banco.
+    """
+    response = StreamingHttpResponse(
+        _pedacos_csv(secoes, comprimir),
+        content_type="application/gzip" if comprimir else "text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
+    return response
+
+
+def gravar_exportacao(secoes, formato, destino, progresso=None):
+    """
+    Versão em arquivo de resposta_exportacao, usada pelos jobs em segundo plano.
+    Retorna a extensão do arquivo gravado.
+    """
+    progresso = progresso or (lambda pct: None)
+    total = len(secoes) or 1
+
+    if formato in ("csv", "csv.gz"):
+        secoes_com_progresso = []
+        for i, (titulo, cabecalho, linhas) in enumerate(secoes, start=1):
+            secoes_com_progresso.append((titulo, cabecalho, _avisar_ao_fim(linhas, progresso, 95 * i // total)))
+        for pedaco in _pedacos_csv(secoes_com_progresso, comprimir=formato == "csv.gz"):
+            destino.write(pedaco)
+        return formato
+
+    planilha = PlanilhaStreaming()
+    for i, (titulo, cabecalho, linhas) in enumerate(secoes, start=1):
+        planilha.adicionar_aba(titulo, cabecalho, linhas)
+        progresso(90 * i // total)
+    planilha.gravar(destino)
+    return "xlsx"
+
+
+def _avisar_ao_fim(linhas, progresso, pct):
+    yield from linhas
+    progresso(pct)
+
+
+def resposta_exportacao(secoes, nome_base, formato="xlsx"):
+    """
+    Entrega as seções [(titulo, cabecalho, linhas), ...] no formato pedido:
+    xlsx (padrão), csv ou csv.gz.
+    """
+    if formato == "csv":
+        return resposta_csv(secoes, f"{nome_base}.csv")
+    if formato == "csv.gz":
+        return resposta_csv(secoes, f"{nome_base}.csv.gz", comprimir=True)
+
+    planilha = PlanilhaStreaming()
+    for titulo, cabecalho, linhas in secoes:
+        planilha.adicionar_aba(titulo, cabecalho, linhas)
+    return planilha.resposta(f"{nome_base}.xlsx")
+
+
+# Fontes de linhas: geradores sobre .iterator(), com a linha de total no fim.
+
+def linhas_lavagens(filtros):
+    """Data, Cliente, Tipo, Produto, Tipo Caixa, Quantidade, Valor Unitário, Subtotal."""
+    tipos = dict(LavagemCarreta.TIPO_CHOICES)
+    total_geral = 0
+
+    for l in lavagens_unificadas(**filtros).iterator(chunk_size=CHUNK_SIZE):
+        subtotal = float(l["subtotal"] or 0)
+        total_geral += subtotal
+
+        yield [
+            l["data"],
+            l["cliente_nome"],
+            tipos.get(l["tipo"], l["tipo"]),
+            l["produto"] or "",
+            l["caixa"] or "",
+            l["quantidade"] or 0,
+            float(l["valor_unitario"] or 0),
+            subtotal,
+        ]
+
+    yield ["", "", "", "", "", "", "TOTAL", total_geral]
+
+
+def filtros_lavagem(params, com_periodo=True):
+    """Filtros de lavagens_unificadas a partir dos parâmetros da requisição."""
+    filtros = {
+        "tipo": params.get("tipo"),
+        "data": params.get("data"),
+        "cliente": params.get("cliente"),
+    }
+    if com_periodo:
+        filtros["data_inicio"] = params.get("data_inicio")
+        filtros["data_fim"] = params.get("data_fim")
+    return filtros
+
+
+def linhas_financeiro(financeiros, com_ano_mes=False):
+    """Data, [Ano, Mês], Salários, Frete, Café, Almoço, Contabilidade, INSS, Total."""
+    total_geral = 0
+
+    registros = financeiros.values_list(
+        "data", "ano", "mes", "salario_total_funcionarios", "frete",
+        "refeicao_cafe", "refeicao_almoco", "contabilidade", "inss", "total",
+    )
+
+    for data, ano, mes, *valores in registros.iterator(chunk_size=CHUNK_SIZE):
+        valores = [float(v or 0) for v in valores]
+        total_geral += valores[-1]
+        yield [data] + ([ano, mes] if com_ano_mes else []) + valores
+
+    colunas = 10 if com_ano_mes else 8
+    yield [""] * (colunas - 2) + ["TOTAL GERAL", total_geral]
+
+
+def linhas_presencas(presencas):
+    """Data, Funcionário, Status."""
+    status_display = dict(Presenca.STATUS_CHOICES)
+    total_presentes = 0
+    total_faltas = 0
+
+    registros = presencas.values_list("data", "funcionario__nome", "status")
+
+    for data, funcionario, status in registros.iterator(chunk_size=CHUNK_SIZE):
+        if status == "P":
+            total_presentes += 1
+        elif status == "F":
+            total_faltas += 1
+        yield [data, funcionario, status_display.get(status, status)]
+
+    yield ["", "TOTAL", f"Presentes: {total_presentes} | Faltas: {total_faltas}"]
+
+
+# =========================
+# Seções das planilhas (views e jobs em segundo plano)
+# =========================
+
+def _intervalo_relatorio(params):
+    return intervalo_periodo(params.get("periodo", "mensal"), params)
+
+
+def nome_relatorio(periodo, params=None):
+    dt_inicio, dt_fim = intervalo_periodo(periodo, params)
+    # o nome vai para o Content-Disposition: períodos fora da lista viram "personalizado"
+    nome = periodo if periodo in PERIODOS else "personalizado"
+    return f"relatorio_{nome}_{dt_inicio}_{dt_fim}"
+
+
+def secoes_relatorio(params):
+    dt_inicio, dt_fim = _intervalo_relatorio(params)
+
+    receitas = totais_periodo(dt_inicio, dt_fim)['receitas']
+    # meses fechados entram com a linha do fechamento; o Financeiro só é lido nos abertos
+    fechados = fechamentos_do_intervalo(dt_inicio, dt_fim)
+    abertos = trechos_sem(dt_inicio, dt_fim, fechados)
+
+    rows = [
+        ["Período", f"{dt_inicio} a {dt_fim}"],
+        [],
+        ["Receitas"],
+        ["Tipo", "Quantidade", "Valor Total (R$)"],
+    ]
+
+    rows.append(["Lavagens Carretas", receitas['carreta']['quantidade'], float(receitas['carreta']['valor'])])
+    rows.append(["Lavador Sujo", receitas['sujo']['quantidade'], float(receitas['sujo']['valor'])])
+    rows.append(["Lavador Carga (valor rendido)", receitas['carga']['quantidade'], float(receitas['carga']['valor'])])
+
+    rows.append([])
+    rows.append(["Despesas"])
+    rows.append(["Ano","Mês","Salário Total","Frete","Café","Almoço","Contabilidade","INSS","Total Despesas"])
+    despesas = []
+    if abertos:
+        despesas = Financeiro.objects.filter(
+            reduce(or_, (meses_do_intervalo(de, ate) for de, ate in abertos))
+        ).order_by('ano', 'mes').values_list(
+            "ano", "mes", *FechamentoMes.CATEGORIAS_DESPESA, "total",
+        ).iterator(chunk_size=CHUNK_SIZE)
+    das_fotos = (
+        [f.ano, f.mes, *(getattr(f, c) for c in FechamentoMes.CATEGORIAS_DESPESA), f.despesas_total]
+        for f in sorted(fechados.values(), key=lambda f: (f.ano, f.mes))
+    )
+    linhas_despesas = (
+        [ano, mes] + [float(v) for v in valores]
+        for ano, mes, *valores in merge(despesas, das_fotos, key=lambda linha: (linha[0], linha[1]))
+    )
+    return [("Resumo", None, chain(rows, linhas_despesas))]
+
+
+def _financeiros_filtrados(params, ordem):
+    qs = Financeiro.objects.all().order_by(*ordem)
+    ano = params.get('ano')
+    mes = params.get('mes')
+    if ano:
+        qs = qs.filter(ano=int(ano))
+    if mes:
+        qs = qs.filter(mes=int(mes))
+    return qs
+
+
+def secoes_financeiro(params):
+    qs = _financeiros_filtrados(params, ('-ano', '-mes'))
+    return [(
+        "Financeiro",
+        ["Data", "Ano", "Mes", "Salarios", "Frete", "Cafe", "Almoço", "Contabilidade", "INSS", "Total (R$)"],
+        linhas_financeiro(qs, com_ano_mes=True),
+    )]
+
+
+def secoes_lavagens(params):
+    return [(
+        "Lavagens",
+        ["Data", "Cliente", "Tipo Lavagem", "Produto", "Tipo Caixa", "Quantidade", "Valor Unitário (R$)", "Subtotal (R$)"],
+        linhas_lavagens(filtros_lavagem(params, com_periodo=False)),
+    )]
+
+
+def _financeiros_do_relatorio(params):
+    financeiros = Financeiro.objects.all()
+    data = params.get("data")
+    data_inicio = params.get("data_inicio")
+    data_fim = params.get("data_fim")
+
+    if data:
+        financeiros = financeiros.filter(data=data)
+    if data_inicio:
+        financeiros = financeiros.filter(data__gte=data_inicio)
+    if data_fim:
+        financeiros = financeiros.filter(data__lte=data_fim)
+    return financeiros
+
+
+def secoes_filtrado(params):
+    secoes = []
+
+    # ======================
+    # LAVAGENS
+    # ======================
+    if params.get("incluir_lavagens"):
+        secoes.append((
+            "Lavagens",
+            ["Data", "Cliente", "Tipo", "Produto", "Tipo Caixa", "Quantidade", "Valor Unitário", "Subtotal"],
+            linhas_lavagens(filtros_lavagem(params)),
+        ))
+
+    # ======================
+    # FINANCEIRO
+    # ======================
+    if params.get("incluir_financeiro"):
+        secoes.append((
+            "Financeiro",
+            ["Data", "Salários", "Frete", "Café", "Almoço", "Contabilidade", "INSS", "Total"],
+            linhas_financeiro(_financeiros_do_relatorio(params)),
+        ))
+
+    # ======================
+    # PRESENÇAS
+    # ======================
+    if params.get("incluir_presencas"):
+        presencas = filtrar_presencas(
+            funcionario=params.get("cliente"),  # se você reutilizar o select
+            data=params.get("data"),
+            data_inicio=params.get("data_inicio"),
+            data_fim=params.get("data_fim")
+        )
+        secoes.append(("Presenças", ["Data", "Funcionário", "Status"], linhas_presencas(presencas)))
+
+    return secoes
+
+
+# =========================
+# PDFs (views e jobs em segundo plano)
+# Cada gerador grava em `destino` (arquivo ou HttpResponse) e avisa o
+# andamento por `progresso(pct)`.
+# =========================
+
+def _sem_progresso(pct):
+    pass
+
+
+def impressao_grafico(tipo, rotulos, valores, tamanho):
+    bruto = repr((tipo, list(rotulos), [round(v, 2) for v in valores], tamanho)).encode()
+    return hashlib.sha1(bruto).hexdigest()[:20]
+
+
+# Acima disso o gráfico das lavagens no PDF agrupa por mês em vez de por dia
+MAX_BARRAS_PDF = 62
+
+
+def grafico_pdf(rotulos, series, largura=480, altura=180, empilhado=False):
+    """
+    Gráfico de barras como Drawing do reportlab.graphics: vai para o PDF como
+    vetor, sem matplotlib e sem rasterizar. `series` é uma lista de (nome, valores).
+    """
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.graphics.charts.legends import Legend
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib import colors
+
+    legenda = len(series) > 1
+    desenho = Drawing(largura, altura)
+    grafico = VerticalBarChart()
+    grafico.x, grafico.y = 45, 40
+    grafico.width = largura - 55
+    grafico.height = altura - 50 - (15 if legenda else 0)
+    grafico.data = [[float(v or 0) for v in valores] for _, valores in series]
+
+    # rótulos demais no eixo X se sobrepõem: mostra um a cada `passo`
+    passo = max(1, -(-len(rotulos) * 30 // grafico.width))
+    grafico.categoryAxis.categoryNames = [r if i % passo == 0 else "" for i, r in enumerate(rotulos)]
+    grafico.categoryAxis.labels.angle = 45
+    grafico.categoryAxis.labels.boxAnchor = "ne"
+    grafico.categoryAxis.labels.fontSize = 7
+    if empilhado:
+        grafico.categoryAxis.style = "stacked"
+    grafico.valueAxis.labels.fontSize = 7
+    grafico.valueAxis.valueMin = min([0.0] + [v for valores in grafico.data for v in valores])
+    grafico.valueAxis.labelTextFormat = lambda v: f"{v:,.0f}".replace(",", ".")
+    for i in range(len(series)):
+        grafico.bars[i].fillColor = colors.HexColor(CORES[i % len(CORES)])
+        grafico.bars[i].strokeColor = None
+    desenho.add(grafico)
+
+    if legenda:
+        caixa = Legend()
+        caixa.x, caixa.y = grafico.x, altura - 4
+        caixa.columnMaximum = 1
+        caixa.deltax = 90
+        caixa.fontSize = 8
+        caixa.alignment = "right"
+        caixa.colorNamePairs = [
+            (colors.HexColor(CORES[i % len(CORES)]), nome) for i, (nome, _) in enumerate(series)
+        ]
+        desenho.add(caixa)
+    return desenho
+
+
+def _serie_lavagens(por_dia_origem):
+    """(rotulos, series) do gráfico de lavagens: por dia, ou por mês em períodos longos."""
+    dias = sorted({d for d, _ in por_dia_origem})
+    if len(dias) > MAX_BARRAS_PDF:
+        chave = lambda d: f"{d.month:02d}/{d.year}"
+    else:
+        chave = lambda d: d.strftime("%d/%m")
+    rotulos = list(dict.fromkeys(chave(d) for d in dias))
+    posicao = {r: i for i, r in enumerate(rotulos)}
+
+    series = []
+    for origem, nome in ReceitaDiaria.ORIGEM_CHOICES:
+        valores = [0.0] * len(rotulos)
+        for (d, o), valor in por_dia_origem.items():
+            if o == origem:
+                valores[posicao[chave(d)]] += valor
+        if any(valores):
+            series.append((nome, valores))
+    return rotulos, series
+
+
+def gerar_relatorio_pdf(params, destino, progresso=_sem_progresso, base_url=None):
+    dt_inicio, dt_fim = _intervalo_relatorio(params)
+
+    lavagens = LavagemCarreta.objects.filter(data__range=(dt_inicio, dt_fim)).select_related('tipo_caixa')
+    financeiro_qs = Financeiro.objects.filter(meses_do_intervalo(dt_inicio, dt_fim)).order_by('ano', 'mes')
+
+    context = {
+        'dt_inicio': dt_inicio,
+        'dt_fim': dt_fim,
+        'lavagens': lavagens,
+        'financeiro_qs': financeiro_qs,
+    }
+    html_string = render_to_string('mvb/relatorio_pdf.html', context)
+    progresso(40)
+    from weasyprint import HTML
+
+    HTML(string=html_string, base_url=base_url).write_pdf(destino)
+
+
+def gerar_financeiro_pdf(params, destino, progresso=_sem_progresso):
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+
+    qs = _financeiros_filtrados(params, ('ano', 'mes'))
+
+    # montar tabela
+    data_table = [["Data","Ano","Mês","Salários","Frete","Café","Almoço","Contab.","INSS","Total"]]
+    total_geral = 0
+    x_labels = []
+    y_totals = []
+
+    for f in qs.iterator(chunk_size=CHUNK_SIZE):
+        data_table.append([
+            f.criado_em.strftime("%Y-%m-%d"),
+            str(f.ano),
+            str(f.mes),
+            f"{f.salario_total_funcionarios:.2f}",
+            f"{f.frete:.2f}",
+            f"{f.refeicao_cafe:.2f}",
+            f"{f.refeicao_almoco:.2f}",
+            f"{f.contabilidade:.2f}",
+            f"{f.inss:.2f}",
+            f"{f.total:.2f}",
+        ])
+        total_geral += float(f.total or 0)
+        x_labels.append(f"{f.ano}-{f.mes}")
+        y_totals.append(float(f.total or 0))
+
+    # linha total
+    data_table.append(["","","","","","","","TOTAL GERAL","",f"{total_geral:.2f}"])
+    progresso(30)
+
+    doc = SimpleDocTemplate(destino, pagesize=A4)
+    styles = getSampleStyleSheet()
+    elems = [Paragraph("Relatório Financeiro", styles['Title']), Spacer(1,12)]
+
+    # tabela
+    table = Table(data_table, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('GRID',(0,0),(-1,-1),0.5,colors.black),
+        ('BACKGROUND',(0,0),(-1,0),colors.lightgrey),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ]))
+    elems.append(table)
+    elems.append(Spacer(1,12))
+
+    # gráfico (barras)
+    if x_labels and y_totals:
+        elems.append(Paragraph("Total por Período", styles['Heading3']))
+        elems.append(grafico_pdf(x_labels, [("Total", y_totals)]))
+    progresso(60)
+
+    doc.build(elems)
+
+
+def gerar_pdf_filtrado(params, destino, progresso=_sem_progresso):
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+
+    data = params.get("data")
+    cliente = params.get("cliente")
+
+    data_inicio = params.get("data_inicio")
+    data_fim = params.get("data_fim")
+
+    incluir_lavagens = params.get("incluir_lavagens")
+    incluir_financeiro = params.get("incluir_financeiro")
+    incluir_presencas = params.get("incluir_presencas")
+
+    doc = SimpleDocTemplate(destino, pagesize=A4)
+    styles = getSampleStyleSheet()
+
+    elementos = [Paragraph("Relatório Filtrado", styles["Title"])]
+
+    # =========================
+    # LAVAGENS (SÓ SE MARCADO)
+    # =========================
+    if incluir_lavagens:
+        filtros = filtros_lavagem(params)
+        tipos = dict(LavagemCarreta.TIPO_CHOICES)
+
+        data_table = [
+            ["Data", "Cliente", "Tipo", "Produto", "Tipo Caixa", "Qtd", "Valor Unit.", "Total"]
+        ]
+
+        por_dia_origem = {}
+        for l in lavagens_unificadas(**filtros).iterator(chunk_size=CHUNK_SIZE):
+            chave = (l["data"], l["origem"])
+            por_dia_origem[chave] = por_dia_origem.get(chave, 0.0) + float(l["subtotal"] or 0)
+            data_table.append([
+                l["data"].strftime("%d/%m/%Y"),
+                l["cliente_nome"],
+                tipos.get(l["tipo"], l["tipo"]),
+                l["produto"] or "",
+                l["caixa"] or "",
+                l["quantidade"] or 0,
+                f"R$ {float(l['valor_unitario'] or 0):.2f}",
+                f"R$ {float(l['subtotal'] or 0):.2f}",
+            ])
+
+        data_table.append(["", "", "", "", "", "", "TOTAL", f"R$ {total_lavagens(**filtros):.2f}"])
+
+        table = Table(data_table, repeatRows=1)
+        table.setStyle(TableStyle([
+            ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
+            ("GRID", (0,0), (-1,-1), 0.5, colors.black),
+            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+            ("FONTNAME", (-2,-1), (-1,-1), "Helvetica-Bold"),
+            ("BACKGROUND", (-2,-1), (-1,-1), colors.beige),
+        ]))
+
+        elementos.append(Paragraph("Lavagens", styles["Heading2"]))
+        if por_dia_origem:
+            rotulos, series = _serie_lavagens(por_dia_origem)
+            elementos.append(grafico_pdf(rotulos, series, empilhado=True))
+        elementos.append(table)
+    progresso(30)
+
+    # =========================
+    # FINANCEIRO (SÓ SE MARCADO)
+    # =========================
+    if incluir_financeiro:
+        financeiros = _financeiros_do_relatorio(params)
+
+        tabela_financeiro = [
+            ["Data", "Salários", "Frete", "Café", "Almoço", "Contabilidade", "INSS", "Total"]
+        ]
+
+        total_geral_financeiro = 0
+        por_mes = {}
+
+        for f in financeiros:
+            total_geral_financeiro += float(f.total)
+            por_mes[(f.ano, f.mes)] = por_mes.get((f.ano, f.mes), 0.0) + float(f.total)
+
+            tabela_financeiro.append([
+                f.data.strftime("%d/%m/%Y"),
+                f"R$ {f.salario_total_funcionarios:.2f}",
+                f"R$ {f.frete:.2f}",
+                f"R$ {f.refeicao_cafe:.2f}",
+                f"R$ {f.refeicao_almoco:.2f}",
+                f"R$ {f.contabilidade:.2f}",
+                f"R$ {f.inss:.2f}",
+                f"R$ {f.total:.2f}",
+            ])
+
+        tabela_financeiro.append([
+            "", "", "", "", "", "", "TOTAL", f"R$ {total_geral_financeiro:.2f}"
+        ])
+
+        table_fin = Table(tabela_financeiro, repeatRows=1)
+        table_fin.setStyle(TableStyle([
+            ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
+            ("GRID", (0,0), (-1,-1), 0.5, colors.black),
+            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+            ("FONTNAME", (-2,-1), (-1,-1), "Helvetica-Bold"),
+            ("BACKGROUND", (-2,-1), (-1,-1), colors.beige),
+        ]))
+
+        elementos.append(Paragraph("Financeiro", styles["Heading2"]))
+        if por_mes:
+            meses = sorted(por_mes)
+            elementos.append(grafico_pdf(
+                [f"{m:02d}/{a}" for a, m in meses], [("Total", [por_mes[am] for am in meses])], altura=150
+            ))
+        elementos.append(table_fin)
+    progresso(50)
+
+    # ======================
+    # PRESENÇAS (PDF)
+    # ======================
+    if incluir_presencas:
+        presencas = filtrar_presencas(
+            funcionario=cliente,
+            data=data,
+            data_inicio=data_inicio,
+            data_fim=data_fim
+        )
+
+        tabela_presencas = [
+            ["Data", "Funcionário", "Status"]
+        ]
+
+        total_presentes = 0
+        total_faltas = 0
+
+        for p in presencas:
+            status = p.get_status_display()
+
+            if status.lower() == "presente":
+                total_presentes += 1
+            elif status.lower() == "falta":
+                total_faltas += 1
+
+            tabela_presencas.append([
+                p.data.strftime("%d/%m/%Y"),
+                p.funcionario.nome,
+                status,
+            ])
+
+        # Linha de totais
+        tabela_presencas.append([
+            "",
+            "TOTAL",
+            f"Presentes: {total_presentes} | Faltas: {total_faltas}"
+        ])
+
+        table = Table(tabela_presencas, colWidths=[80, 220, 200])
+
+        table.setStyle(TableStyle([
+            ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
+            ("GRID", (0,0), (-1,-1), 0.5, colors.black),
+            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+            ("FONTNAME", (1,-1), (-1,-1), "Helvetica-Bold"),
+            ("BACKGROUND", (1,-1), (-1,-1), colors.beige),
+            ("ALIGN", (0,0), (-1,-1), "CENTER"),
+            ("ALIGN", (1,1), (1,-1), "LEFT"),
+        ]))
+
+        elementos.append(Paragraph("Relatório de Presenças", styles["Heading2"]))
+        elementos.append(table)
+    progresso(70)
+
+    doc.build(elementos)
+
+
+def gerar_lavagens_pdf(params, destino, progresso=_sem_progresso):
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+
+    filtros = filtros_lavagem(params, com_periodo=False)
+    tipos = dict(LavagemCarreta.TIPO_CHOICES)
+
+    doc = SimpleDocTemplate(destino, pagesize=A4)
+    styles = getSampleStyleSheet()
+
+    tabela = [
+        ["Data", "Cliente", "Tipo", "Produto", "Caixa", "Qtd", "Valor Unit.", "Subtotal"],
+    ]
+
+    for l in lavagens_unificadas(**filtros).iterator(chunk_size=CHUNK_SIZE):
+        valor_unitario = l["valor_unitario"]
+        tabela.append([
+            str(l["data"]),
+            l["cliente_nome"],
+            tipos.get(l["tipo"], l["tipo"]),
+            l["produto"] or "",
+            l["caixa"] or "",
+            l["quantidade"],
+            f"R$ {valor_unitario:.2f}" if valor_unitario else "-",
+            f"R$ {float(l['subtotal'] or 0):.2f}",
+        ])
+
+    progresso(40)
+    total_geral = total_lavagens(**filtros)
+
+    # ADICIONAR TOTAL GERAL
+    tabela.append([
+        "",
+        "",
+        "",
+        "",
+        "",
+        "",
+        "TOTAL GERAL:",
+        f"R$ {total_geral:.2f}",
+    ])
+
+    table = Table(tabela)
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+        ("ALIGN", (5, 1), (7, -1), "RIGHT"),
+        ("BACKGROUND", (6, -1), (7, -1), colors.whitesmoke),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+    ]))
+
+    doc.build([
+        Paragraph("Relatório de Lavagens", styles["Title"]),
+        table
+    ])
+
+
+# =========================
+# Exportações em segundo plano (ExportJob)
+# =========================
+
+def _planilha(secoes_de):
+    def gerar(params, destino, progresso=_sem_progresso):
+        return gravar_exportacao(secoes_de(params), params.get("formato", "xlsx"), destino, progresso)
+    return gerar
+
+
+# tipo do ExportJob -> (gerador, nome base do arquivo). PDFs não devolvem extensão.
+GERADORES = {
+    "relatorio_pdf": (gerar_relatorio_pdf, "relatorio"),
+    "relatorio_excel": (_planilha(secoes_relatorio), "relatorio"),
+    "filtrado_pdf": (gerar_pdf_filtrado, "relatorio_filtrado"),
+    "filtrado_excel": (_planilha(secoes_filtrado), "relatorio_filtrado"),
+    "financeiro_pdf": (gerar_financeiro_pdf, "financeiro_relatorio"),
+    "financeiro_excel": (_planilha(secoes_financeiro), "financeiro_relatorio"),
+    "lavagens_pdf": (gerar_lavagens_pdf, "lavagens_filtradas"),
+    "lavagens_excel": (_planilha(secoes_lavagens), "lavagens_filtradas"),
+}
+
+
+def executar_job(job):
+    """Gera o arquivo do job em job.conteudo/nome_arquivo, atualizando o progresso no banco."""
+    gerador, nome_base = GERADORES[job.tipo]
+
+    def progresso(pct):
+        type(job).objects.filter(pk=job.pk).update(progresso=pct)
+
+    with tempfile.TemporaryFile() as arquivo:
+        extensao = gerador(job.parametros, arquivo, progresso) or "pdf"
+        arquivo.seek(0)
+        job.conteudo = arquivo.read()
+    job.nome_arquivo = f"{nome_base}_{job.pk}.{extensao}"
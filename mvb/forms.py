@@ -34,7 +34,18 @@ class FinanceiroForm(forms.ModelForm):
             'inss': 'INSS',
         }
 
-class LavagemCarretaForm(forms.ModelForm):
+class LavagemForm(forms.ModelForm):
+    # colunas que a tabela Lavagem aceita nulas, mas que a origem do formulário exige
+    obrigatorios = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for campo in self.obrigatorios:
+            self.fields[campo].required = True
+
+class LavagemCarretaForm(LavagemForm):
+    obrigatorios = ['tipo_caixa', 'tipo_produto', 'valor_por_caixa']
+
     class Meta:
         model = LavagemCarreta
         fields = ['data','carreta_ident','tipo_caixa',
@@ -44,23 +55,75 @@ class LavagemCarretaForm(forms.ModelForm):
     #Código para filtrar itens excluidos para que não apareçam na seleção    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['tipo_produto'].queryset = TipoProduto.objects.filter(ativo=True)
-        self.fields['tipo_caixa'].queryset = TipoCaixa.objects.filter(ativo=True)
+        self.fields['tipo_produto'].queryset = TipoProduto.objects.filter(ativo=True).order_by('nome')
+        self.fields['tipo_caixa'].queryset = TipoCaixa.objects.filter(ativo=True).order_by('nome')
+
+class LavadorSujoForm(LavagemForm):
+    obrigatorios = ['tamanho_caixa', 'tipo_produto', 'valor_por_caixa']
 
-class LavadorSujoForm(forms.ModelForm):
     class Meta:
         model = LavadorSujoEntry
         fields = ['data','quantidade_caixas','tamanho_caixa',
                   'tipo_produto','valor_por_caixa', 'cliente', 'tipo_lavagem'
         ]
 
-class LavadorCargaForm(forms.ModelForm):
+class LavadorCargaForm(LavagemForm):
     class Meta:
         model = LavadorCargaEntry
         fields = ['data','quantidade_caixas','q_3A','q_2A','q_1A','q_G',
                   'valor_rendido', 'cliente', 'tipo_lavagem'
         ]
 
+# Lançamento em lote: cada linha do formset é um LavagemCarretaForm/LavadorSujoForm/
+# LavadorCargaForm. Os ModelChoiceField consultariam o banco uma vez por linha para
+# montar as opções e outra por linha para validar; o formset carrega cada queryset
+# uma vez e entrega às linhas um campo que só consulta essa lista.
+class EscolhaCarregada(forms.ModelChoiceField):
+    def __init__(self, campo, objetos):
+        super().__init__(
+            queryset=campo.queryset, required=campo.required, label=campo.label,
+            empty_label=campo.empty_label, help_text=campo.help_text, widget=campo.widget,
+        )
+        self.objetos = objetos
+        self.choices = [('', self.empty_label)] + [(str(o.pk), str(o)) for o in objetos.values()]
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objetos[str(value)]
+        except KeyError:
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+
+
+class LoteLavagemFormSet(forms.BaseModelFormSet):
+    def __init__(self, *args, **kwargs):
+        self._objetos = {}
+        kwargs.setdefault('queryset', self.model.objects.none())
+        super().__init__(*args, **kwargs)
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        conferidas = []
+        for nome in ('cliente', 'tipo_caixa', 'tipo_produto'):
+            campo = form.fields.get(nome)
+            if campo is None:
+                continue
+            if nome not in self._objetos:
+                self._objetos[nome] = {str(o.pk): o for o in campo.queryset}
+            form.fields[nome] = EscolhaCarregada(campo, self._objetos[nome])
+            conferidas.append(nome)
+        form.instance.fks_conferidas = tuple(conferidas)
+
+
+LINHAS_LOTE_MAX = 100
+
+def lote_formset(form_class, linhas):
+    return forms.modelformset_factory(
+        form_class._meta.model, form=form_class, formset=LoteLavagemFormSet,
+        extra=linhas, max_num=LINHAS_LOTE_MAX, validate_max=True,
+    )
+
 class TipoCaixaForm(forms.ModelForm):
     class Meta:
         model = TipoCaixa
@@ -0,0 +1,173 @@
+"""
+Gráficos SVG em Python puro: linha e barras empilhadas.
+
+Para as séries mensais do dashboard e dos relatórios não compensa carregar o
+matplotlib: o SVG sai como texto em microssegundos, tem poucos KB e vai direto
+no HTML. Todo texto é escapado e o resultado já vem marcado como seguro.
+
+    svg = grafico_linha(["01/2025", "02/2025"], [("Receita", [1200, 950]), ("Despesas", [800, 870])])
+"""
+from html import escape
+from math import ceil, floor, log10
+
+from django.utils.safestring import mark_safe
+
+# Mesmas cores do AdminLTE/Bootstrap usadas nos cards
+CORES = ["#007bff", "#28a745", "#ffc107", "#dc3545", "#17a2b8", "#6c757d", "#6f42c1", "#fd7e14"]
+
+MARGEM_ESQUERDA = 52
+MARGEM_DIREITA = 12
+MARGEM_TOPO = 12
+MARGEM_BAIXO = 24
+ALTURA_LEGENDA = 18
+# Largura mínima reservada para cada rótulo do eixo X antes de começar a pular rótulos
+LARGURA_ROTULO = 54
+
+
+def grafico_linha(rotulos, series, largura=640, altura=240, titulo=""):
+    """Uma linha por série; `series` é uma lista de (nome, valores)."""
+    series = _normalizar(series)
+    if not rotulos or not series:
+        return _vazio(largura, altura, titulo)
+    todos = [v for _, valores in series for v in valores]
+    g = _Moldura(rotulos, min(todos), max(todos), largura, altura, [n for n, _ in series])
+
+    for i, (nome, valores) in enumerate(series):
+        cor = CORES[i % len(CORES)]
+        pontos = " ".join(f"{g.centro(j):.1f},{g.y(v):.1f}" for j, v in enumerate(valores))
+        g.partes.append(f'<polyline fill="none" stroke="{cor}" stroke-width="2" points="{pontos}"/>')
+        if len(valores) <= 60:
+            for j, v in enumerate(valores):
+                g.partes.append(
+                    f'<circle cx="{g.centro(j):.1f}" cy="{g.y(v):.1f}" r="2.5" fill="{cor}">'
+                    f'<title>{escape(nome)} {escape(str(rotulos[j]))}: {_moeda(v)}</title></circle>'
+                )
+    return g.svg(titulo)
+
+
+def grafico_barras_empilhadas(rotulos, series, largura=640, altura=240, titulo=""):
+    """Barras empilhadas: as séries somam na mesma barra (negativos empilham para baixo)."""
+    series = _normalizar(series)
+    if not rotulos or not series:
+        return _vazio(largura, altura, titulo)
+    positivos = [sum(max(v[j], 0) for _, v in series) for j in range(len(rotulos))]
+    negativos = [sum(min(v[j], 0) for _, v in series) for j in range(len(rotulos))]
+    g = _Moldura(rotulos, min(negativos), max(positivos), largura, altura, [n for n, _ in series])
+
+    topo = [0.0] * len(rotulos)
+    fundo = [0.0] * len(rotulos)
+    for i, (nome, valores) in enumerate(series):
+        cor = CORES[i % len(CORES)]
+        for j, v in enumerate(valores):
+            pilha = topo if v >= 0 else fundo
+            base, pilha[j] = pilha[j], pilha[j] + v
+            x = g.x0 + g.banda * 0.15 + g.banda * j
+            g.partes.append(_barra(x, g.banda * 0.7, g.y(base), g.y(pilha[j]), cor, f"{nome} {rotulos[j]}: {_moeda(v)}"))
+    return g.svg(titulo)
+
+
+class _Moldura:
+    """Eixos, grade, rótulos e legenda; os gráficos acrescentam suas formas em `partes`."""
+
+    def __init__(self, rotulos, minimo, maximo, largura, altura, nomes):
+        self.largura, self.altura = largura, altura
+        self.nomes = nomes if len(nomes) > 1 else []
+        self.marcas = _escala(min(minimo, 0), max(maximo, 0))
+        self.x0 = MARGEM_ESQUERDA
+        self.y0 = MARGEM_TOPO + (ALTURA_LEGENDA if self.nomes else 0)
+        self.largura_util = largura - MARGEM_ESQUERDA - MARGEM_DIREITA
+        self.altura_util = altura - self.y0 - MARGEM_BAIXO
+        self.banda = self.largura_util / len(rotulos)
+        self.partes = []
+        self._eixos(rotulos)
+
+    def y(self, valor):
+        baixo, alto = self.marcas[0], self.marcas[-1]
+        return self.y0 + self.altura_util * (alto - valor) / (alto - baixo)
+
+    def centro(self, j):
+        return self.x0 + self.banda * (j + 0.5)
+
+    def _eixos(self, rotulos):
+        direita = self.x0 + self.largura_util
+        for marca in self.marcas:
+            y = self.y(marca)
+            cor = "#999" if marca == 0 else "#e5e5e5"
+            self.partes.append(f'<line x1="{self.x0}" y1="{y:.1f}" x2="{direita}" y2="{y:.1f}" stroke="{cor}"/>')
+            self.partes.append(
+                f'<text x="{self.x0 - 6}" y="{y + 4:.1f}" text-anchor="end" fill="#666">{_abreviar(marca)}</text>'
+            )
+        passo = max(1, ceil(len(rotulos) * LARGURA_ROTULO / self.largura_util))
+        base = self.y0 + self.altura_util + 16
+        for j in range(0, len(rotulos), passo):
+            self.partes.append(
+                f'<text x="{self.centro(j):.1f}" y="{base:.1f}" text-anchor="middle" fill="#666">'
+                f'{escape(str(rotulos[j]))}</text>'
+            )
+
+    def _legenda(self):
+        x = self.x0
+        partes = []
+        for i, nome in enumerate(self.nomes):
+            cor = CORES[i % len(CORES)]
+            partes.append(f'<rect x="{x}" y="{MARGEM_TOPO - 9}" width="10" height="10" fill="{cor}"/>')
+            partes.append(f'<text x="{x + 14}" y="{MARGEM_TOPO}" fill="#333">{escape(nome)}</text>')
+            x += 24 + 7 * len(nome)
+        return partes
+
+    def svg(self, titulo):
+        return _documento(self.largura, self.altura, titulo, self._legenda() + self.partes)
+
+
+def _documento(largura, altura, titulo, partes):
+    rotulo = f' aria-label="{escape(titulo)}"' if titulo else ""
+    return mark_safe(
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {largura} {altura}" width="100%" '
+        f'role="img"{rotulo} font-family="sans-serif" font-size="11">'
+        + (f"<title>{escape(titulo)}</title>" if titulo else "")
+        + "".join(partes)
+        + "</svg>"
+    )
+
+
+def _vazio(largura, altura, titulo):
+    return _documento(largura, altura, titulo, [
+        f'<text x="{largura / 2}" y="{altura / 2}" text-anchor="middle" fill="#999">Sem dados no período</text>'
+    ])
+
+
+def _barra(x, largura, y_base, y_valor, cor, dica):
+    topo, altura = min(y_base, y_valor), abs(y_base - y_valor)
+    return (
+        f'<rect x="{x:.1f}" y="{topo:.1f}" width="{largura:.1f}" height="{altura:.1f}" fill="{cor}">'
+        f'<title>{escape(dica)}</title></rect>'
+    )
+
+
+def _normalizar(series):
+    # Decimal/None das agregações viram float
+    return [(str(nome), [float(v or 0) for v in valores]) for nome, valores in series]
+
+
+def _escala(minimo, maximo, divisoes=5):
+    """Marcas "redondas" (1, 2, 2,5 ou 5 × 10^n) cobrindo [minimo, maximo]."""
+    if maximo <= minimo:
+        maximo = minimo + 1
+    bruto = (maximo - minimo) / divisoes
+    magnitude = 10 ** floor(log10(bruto))
+    passo = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= bruto)
+    inicio = floor(minimo / passo) * passo
+    fim = ceil(maximo / passo) * passo
+    return [inicio + i * passo for i in range(round((fim - inicio) / passo) + 1)]
+
+
+def _abreviar(valor):
+    for limite, sufixo in ((1e6, "M"), (1e3, "k")):
+        if abs(valor) >= limite:
+            texto = f"{valor / limite:.1f}".rstrip("0").rstrip(".")
+            return texto.replace(".", ",") + sufixo
+    return f"{valor:g}".replace(".", ",")
+
+
+def _moeda(valor):
+    return "R$ " + f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
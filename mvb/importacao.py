@@ -0,0 +1,235 @@
+"""
+Importação do histórico de lavagens de carreta a partir de planilhas (XLSX/CSV).
+
+A planilha é lida e validada de uma vez com pandas: cada regra é uma operação
+sobre a coluna inteira, e clientes, tipos de caixa e produtos são resolvidos
+por dicionários carregados numa consulta cada. As linhas válidas são gravadas
+com Lavagem.criar_em_lote; as inválidas voltam no relatório com o número da
+linha na planilha e os motivos.
+
+    resultado = importar_lavagens(arquivo, "historico.xlsx", usuario=request.user)
+    resultado.importadas, resultado.erros  # [(linha, ["motivo", ...]), ...]
+"""
+import io
+import unicodedata
+from collections import defaultdict, namedtuple
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from .models import Cliente, Lavagem, LavagemCarreta, TipoCaixa, TipoProduto, meses_fechados
+
+# pandas é importado dentro das funções, como as bibliotecas de mvb.exportacao:
+# este módulo é carregado pelas views e o boot não deve pagar por ele.
+
+# coluna do modelo -> cabeçalhos aceitos (já normalizados: minúsculas, sem acento, "_" no lugar de espaço)
+COLUNAS = {
+    'data': ['data', 'data_da_lavagem'],
+    'carreta_ident': ['carreta', 'carreta_ident', 'motorista', 'carreta_nome_motorista'],
+    'cliente': ['cliente'],
+    'tipo_caixa': ['tipo_caixa', 'caixa'],
+    'tipo_produto': ['tipo_produto', 'produto'],
+    'quantidade_caixas': ['quantidade_caixas', 'quantidade', 'caixas'],
+    'valor_por_caixa': ['valor_por_caixa', 'valor_caixa', 'valor'],
+    'tipo_lavagem': ['tipo_lavagem', 'tipo'],
+}
+OBRIGATORIAS = ['data', 'tipo_caixa', 'tipo_produto', 'quantidade_caixas', 'valor_por_caixa']
+
+# Linhas por INSERT no bulk_create
+LOTE = 5000
+
+# Limites das colunas de LavagemCarreta
+MAX_QUANTIDADE = 2147483647
+MAX_VALOR_CAIXA = Decimal('999999.99')
+CENTAVO = Decimal('0.01')
+MAX_CARRETA = LavagemCarreta._meta.get_field('carreta_ident').max_length
+
+Resultado = namedtuple("Resultado", "importadas erros total")
+
+
+class PlanilhaInvalida(ValueError):
+    """A planilha não pôde ser lida ou não tem as colunas obrigatórias."""
+
+
+def importar_lavagens(arquivo, nome, usuario=None, validar_apenas=False, lote=LOTE, limite=None):
+    """
+    Lê `arquivo` (caminho ou arquivo aberto; XLSX ou CSV, pela extensão de `nome`),
+    valida todas as linhas e grava as válidas. Com `validar_apenas`, só valida.
+    Planilhas com mais de `limite` linhas são recusadas antes da validação.
+    """
+    df = ler_planilha(arquivo, nome)
+    if limite is not None and len(df) > limite:
+        raise PlanilhaInvalida(
+            f"A planilha tem {len(df)} linhas; pela tela o limite é {limite}. "
+            "Divida o arquivo ou use o comando importar_lavagens."
+        )
+    valores, erros = validar(df)
+    lavagens = [
+        LavagemCarreta(criado_por=usuario, **linha)
+        for linha in valores.to_dict('records')
+    ]
+    if not validar_apenas:
+        Lavagem.criar_em_lote(lavagens, lote=lote)
+    return Resultado(len(lavagens), sorted(erros.items()), len(df))
+
+
+def ler_planilha(arquivo, nome):
+    import pandas as pd
+
+    try:
+        if nome.lower().endswith(('.xlsx', '.xlsm')):
+            df = pd.read_excel(arquivo, dtype=object, engine='openpyxl')
+        elif nome.lower().endswith('.csv'):
+            df = _ler_csv(pd, arquivo)
+        else:
+            raise PlanilhaInvalida("Formato não suportado; envie um arquivo .xlsx ou .csv.")
+    except (ValueError, OSError) as e:
+        if isinstance(e, PlanilhaInvalida):
+            raise
+        raise PlanilhaInvalida(f"Não foi possível ler a planilha: {e}")
+
+    aceitas = {apelido: coluna for coluna, apelidos in COLUNAS.items() for apelido in apelidos}
+    df.columns = [aceitas.get(_normalizar(c), _normalizar(c)) for c in df.columns]
+    faltando = [c for c in OBRIGATORIAS if c not in df.columns]
+    if faltando:
+        raise PlanilhaInvalida(f"Coluna(s) obrigatória(s) ausente(s): {', '.join(faltando)}.")
+    for coluna in COLUNAS:
+        if coluna not in df.columns:
+            df[coluna] = ""
+    # número da linha na planilha (cabeçalho é a linha 1)
+    df.index = df.index + 2
+    texto = df[list(COLUNAS)].apply(lambda s: s.astype(str).where(s.notna(), "").str.strip())
+    # linhas totalmente em branco (comuns no fim de planilhas) não são lançamentos
+    return texto[(texto != "").any(axis=1)]
+
+
+def validar(df):
+    """
+    Valida o DataFrame de ler_planilha() coluna a coluna. Retorna (valores, erros):
+    as linhas válidas já convertidas para os campos do modelo e {linha: [motivos]}.
+    """
+    import pandas as pd
+
+    erros = defaultdict(list)
+
+    def acusar(mascara, mensagem):
+        for linha in df.index[mascara]:
+            erros[linha].append(mensagem)
+
+    valores = pd.DataFrame(index=df.index)
+
+    # data: dd/mm/aaaa ou ISO (o que o Excel entrega vira "aaaa-mm-dd 00:00:00")
+    datas = pd.to_datetime(df['data'], format='%d/%m/%Y', errors='coerce')
+    resto = datas.isna()
+    datas[resto] = pd.to_datetime(df.loc[resto, 'data'], format='ISO8601', errors='coerce')
+    acusar(datas.isna(), "data inválida")
+    fechados = meses_fechados()
+    if fechados:
+        meses = datas.dt.year * 100 + datas.dt.month
+        acusar(meses.isin([ano * 100 + mes for ano, mes in fechados]), "mês fechado")
+    valores['data'] = datas.dt.date
+
+    quantidade = pd.to_numeric(df['quantidade_caixas'], errors='coerce')
+    acusar(
+        quantidade.isna() | (quantidade < 0) | (quantidade % 1 != 0) | (quantidade > MAX_QUANTIDADE),
+        "quantidade de caixas deve ser um inteiro não negativo",
+    )
+    valores['quantidade_caixas'] = quantidade
+
+    # Decimal direto do texto (sem passar por float): "1,005" é recusado, não arredondado
+    textos = _decimal_brasileiro(df['valor_por_caixa'])
+    conversao = {texto: _valor_por_caixa(texto) for texto in textos.unique()}
+    motivos = textos.map(lambda texto: conversao[texto][1])
+    for motivo in motivos.dropna().unique():
+        acusar(motivos == motivo, motivo)
+    valores['valor_por_caixa'] = textos.map(lambda texto: conversao[texto][0])
+
+    for coluna, modelo, consulta in [
+        ('cliente', Cliente, Cliente.objects.all()),
+        ('tipo_caixa', TipoCaixa, TipoCaixa.objects.filter(ativo=True)),
+        ('tipo_produto', TipoProduto, TipoProduto.objects.filter(ativo=True)),
+    ]:
+        por_nome, ambiguos = _por_nome(consulta)
+        chaves = _normalizar_serie(df[coluna])
+        ids = chaves.map(por_nome).astype('Int64')
+        vazio = chaves == ""
+        rotulo = modelo._meta.verbose_name
+        if coluna in OBRIGATORIAS:
+            acusar(vazio, f"{rotulo} não informado")
+        acusar(chaves.isin(ambiguos), f"{rotulo} com nome repetido no cadastro")
+        acusar(~vazio & ~chaves.isin(ambiguos) & ids.isna(), f"{rotulo} não cadastrado")
+        valores[f'{coluna}_id'] = ids
+
+    tipos = {}
+    for chave, rotulo in Lavagem.TIPO_CHOICES:
+        tipos[_normalizar(chave)] = tipos[_normalizar(rotulo)] = chave
+    tipo = _normalizar_serie(df['tipo_lavagem'])
+    acusar((tipo != "") & ~tipo.isin(tipos), "tipo de lavagem inválido")
+    valores['tipo_lavagem'] = tipo.map(tipos).fillna(Lavagem._meta.get_field('tipo_lavagem').default)
+
+    acusar(df['carreta_ident'].str.len() > MAX_CARRETA, f"carreta com mais de {MAX_CARRETA} caracteres")
+    valores['carreta_ident'] = df['carreta_ident']
+
+    valores = valores.drop(index=list(erros))
+    valores['quantidade_caixas'] = valores['quantidade_caixas'].astype(int)
+    for coluna in ('cliente_id', 'tipo_caixa_id', 'tipo_produto_id'):
+        valores[coluna] = [None if pd.isna(v) else int(v) for v in valores[coluna]]
+    return valores, dict(erros)
+
+
+def _ler_csv(pd, arquivo):
+    conteudo = arquivo.read() if hasattr(arquivo, 'read') else Path(arquivo).read_bytes()
+    if isinstance(conteudo, bytes):
+        try:
+            conteudo = conteudo.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            # CSV salvo pelo Excel em português
+            conteudo = conteudo.decode('cp1252')
+    # o Excel em português separa com ";"; o resto do mundo, com ","
+    cabecalho = conteudo.split("\n", 1)[0]
+    separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+    return pd.read_csv(io.StringIO(conteudo), dtype=str, sep=separador, keep_default_na=False)
+
+
+def _valor_por_caixa(texto):
+    """(Decimal com 2 casas, None) ou (None, motivo do erro)."""
+    try:
+        valor = Decimal(texto)
+    except InvalidOperation:
+        return None, "valor por caixa inválido"
+    if not valor.is_finite() or valor < 0 or valor > MAX_VALOR_CAIXA:
+        return None, "valor por caixa inválido"
+    if valor != valor.quantize(CENTAVO):
+        return None, "valor por caixa com mais de 2 casas decimais"
+    return valor.quantize(CENTAVO), None
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode()
+    return "_".join(texto.casefold().split())
+
+
+def _normalizar_serie(serie):
+    # nomes se repetem muito: normaliza cada valor distinto uma vez só
+    return serie.map({valor: _normalizar(valor) for valor in serie.unique()})
+
+
+def _decimal_brasileiro(serie):
+    # "1.234,56" -> "1234.56"; "12.5" (ponto decimal) fica como está
+    com_virgula = serie.str.contains(",", regex=False)
+    return serie.where(~com_virgula, serie.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+
+
+def _por_nome(consulta):
+    """
+    {nome normalizado: pk} em uma consulta. TipoCaixa é encontrado pelo nome ou
+    por "nome - tamanho"; nomes que apontam para mais de um cadastro ficam de fora.
+    """
+    por_nome, ambiguos = {}, set()
+    for obj in consulta:
+        for nome in {_normalizar(obj.nome), _normalizar(str(obj))}:
+            if nome in por_nome and por_nome[nome] != obj.pk:
+                ambiguos.add(nome)
+            por_nome[nome] = obj.pk
+    for nome in ambiguos:
+        del por_nome[nome]
+    return por_nome, ambiguos
@@ -0,0 +1,229 @@
+import json
+import math
+import time
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, reverse
+
+from mvb import urls as mvb_urls
+from mvb.models import Cliente, Financeiro, Funcionario, LavagemCarreta, Presenca, TipoCaixa, TipoProduto
+from mvb.semeadura import semear
+
+BASELINE_PADRAO = Path(settings.BASE_DIR) / "bench_views_baseline.json"
+
+# Rotas que alteram dados no GET, só aceitam POST ou dependem de algo que o benchmark não cria
+IGNORADAS = {
+    "logout": "encerra a sessão",
+    "aprovar_usuario": "aprova o usuário no GET",
+    "password_reset_confirm": "exige token de e-mail",
+    "solicitar_exportacao": "apenas POST (enfileira job)",
+    "export_pdf": "apenas POST (enfileira job)",
+    "exportar_pdf_filtrado": "apenas POST (enfileira job)",
+    "exportar_financeiro_pdf": "apenas POST (enfileira job)",
+    "exportar_lavagens_pdf": "apenas POST (enfileira job)",
+    "status_exportacao": "depende de um ExportJob do usuário",
+    "baixar_exportacao": "depende de um ExportJob concluído",
+}
+
+# Modelo de onde sai o <int:pk>/<int:cliente_id> de cada rota
+MODELO_DA_ROTA = {
+    "editar_funcionario": Funcionario,
+    "deletar_funcionario": Funcionario,
+    "excluir_tipo_caixa": TipoCaixa,
+    "excluir_tipo_produto": TipoProduto,
+    "editar_lavagem": LavagemCarreta,
+    "excluir_lavagem": LavagemCarreta,
+    "editar_financeiro": Financeiro,
+    "excluir_financeiro": Financeiro,
+    "editar_cliente": Cliente,
+    "excluir_cliente": Cliente,
+    "editar_presenca": Presenca,
+    "excluir_presenca": Presenca,
+    "relatorio_por_cliente": Cliente,
+}
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede p50/p95, consultas e bytes de cada URL de mvb/urls.py, como staff e como "
+        "usuário aprovado, num banco de teste populado, e compara com um baseline JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=5, help="Requisições medidas por view")
+        parser.add_argument('--clientes', type=int, default=200)
+        parser.add_argument('--funcionarios', type=int, default=40)
+        parser.add_argument('--anos', type=int, default=1)
+        parser.add_argument('--lavagens-por-dia', type=int, default=60)
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--manter-banco', action='store_true', help="Reaproveita o banco de teste entre execuções")
+        parser.add_argument('--filtro', help="Só mede rotas cujo nome contém este texto")
+        parser.add_argument('--baseline', default=str(BASELINE_PADRAO), help="Arquivo JSON do baseline")
+        parser.add_argument('--salvar-baseline', action='store_true', help="Grava o resultado como novo baseline")
+        parser.add_argument(
+            '--tolerancia', type=float, default=0.25,
+            help="Aumento relativo do p95 aceito antes de acusar regressão (0.25 = 25%%)"
+        )
+
+    def handle(self, *args, **options):
+        if options['repeticoes'] < 1:
+            raise CommandError("--repeticoes deve ser pelo menos 1.")
+
+        setup_test_environment()
+        nome_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['manter_banco'])
+        try:
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+                if not LavagemCarreta.objects.exists():
+                    self.popular(options)
+                resultado = self.medir(options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0, keepdb=options['manter_banco'])
+            teardown_test_environment()
+
+        self.imprimir(resultado)
+
+        caminho = Path(options['baseline'])
+        if options['salvar_baseline']:
+            caminho.write_text(json.dumps(resultado, indent=2, ensure_ascii=False, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f"Baseline gravado em {caminho}"))
+            return
+        if caminho.exists():
+            regressoes = self.comparar(resultado, json.loads(caminho.read_text()), options['tolerancia'])
+            if regressoes:
+                for linha in regressoes:
+                    self.stderr.write(self.style.ERROR(linha))
+                raise CommandError(f"{len(regressoes)} regressão(ões) em relação a {caminho}")
+            self.stdout.write(self.style.SUCCESS(f"Sem regressões em relação a {caminho}"))
+
+    def popular(self, options):
+        self.stdout.write("Populando o banco de teste...")
+        contagem = semear(
+            clientes=options['clientes'], funcionarios=options['funcionarios'], anos=options['anos'],
+            lavagens_por_dia=options['lavagens_por_dia'], semente=options['semente'],
+        )
+        call_command('reconstruir_receita_diaria', '--reconstruir', stdout=StringIO())
+        self.stdout.write(", ".join(f"{modelo}: {qtd}" for modelo, qtd in contagem.items()))
+
+    def usuarios(self):
+        staff, _ = User.objects.get_or_create(
+            username="bench_staff", defaults={"is_staff": True, "is_superuser": True}
+        )
+        comum, _ = User.objects.get_or_create(username="bench_usuario")
+        comum.profile.is_approved = True
+        comum.profile.save()
+        return {"staff": staff, "usuario": comum}
+
+    def rotas(self):
+        hoje = date.today()
+        filtro_relatorio = (
+            f"?incluir_lavagens=1&incluir_financeiro=1&incluir_presencas=1"
+            f"&data_inicio={hoje - timedelta(days=30)}&data_fim={hoje}"
+        )
+        consulta = {
+            "resultado_relatorio": filtro_relatorio,
+            "exportar_excel_filtrado": filtro_relatorio,
+        }
+
+        for padrao in mvb_urls.urlpatterns:
+            if not isinstance(padrao, URLPattern) or not padrao.name:
+                continue
+            nome = padrao.name
+            if nome in IGNORADAS:
+                yield nome, None, IGNORADAS[nome]
+                continue
+
+            kwargs = {}
+            for argumento, conversor in padrao.pattern.converters.items():
+                if argumento == "periodo":
+                    kwargs[argumento] = "mensal"
+                elif argumento == "origem":
+                    kwargs[argumento] = "carreta"
+                elif nome in MODELO_DA_ROTA and type(conversor).__name__ == "IntConverter":
+                    obj = MODELO_DA_ROTA[nome].objects.order_by('-pk').first()
+                    if obj is None:
+                        break
+                    kwargs[argumento] = obj.pk
+                else:
+                    break
+            else:
+                yield nome, reverse(nome, kwargs=kwargs) + consulta.get(nome, ""), None
+                continue
+            yield nome, None, "argumentos não suportados"
+
+    def medir(self, options):
+        resultado = {}
+        usuarios = self.usuarios()
+        rotas = [r for r in self.rotas() if not options['filtro'] or options['filtro'] in r[0]]
+
+        for nome, url, motivo in rotas:
+            if url is None:
+                self.stdout.write(self.style.WARNING(f"ignorada: {nome} ({motivo})"))
+                continue
+            for papel, user in usuarios.items():
+                client = Client()
+                client.force_login(user)
+                amostras = []
+                for i in range(options['repeticoes'] + 1):
+                    with CaptureQueriesContext(connection) as consultas:
+                        inicio = time.perf_counter()
+                        try:
+                            response = client.get(url)
+                            tamanho = (
+                                sum(len(p) for p in response.streaming_content)
+                                if response.streaming else len(response.content)
+                            )
+                        except Exception as e:
+                            self.stderr.write(self.style.ERROR(f"{nome} ({papel}): {type(e).__name__}: {e}"))
+                            break
+                        duracao = time.perf_counter() - inicio
+                    if i:  # a primeira requisição só aquece caches e imports
+                        amostras.append((duracao, len(consultas), tamanho, response.status_code))
+                if not amostras:
+                    continue
+                tempos = [a[0] * 1000 for a in amostras]
+                resultado[f"{papel} {nome}"] = {
+                    "url": url,
+                    "status": amostras[-1][3],
+                    "p50_ms": round(percentil(tempos, 50), 2),
+                    "p95_ms": round(percentil(tempos, 95), 2),
+                    "consultas": max(a[1] for a in amostras),
+                    "bytes": amostras[-1][2],
+                }
+        return resultado
+
+    def imprimir(self, resultado):
+        self.stdout.write(f"{'view':<48} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'consultas':>9} {'bytes':>10}")
+        for chave, r in sorted(resultado.items()):
+            self.stdout.write(
+                f"{chave:<48} {r['status']:>6} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+                f"{r['consultas']:>9} {r['bytes']:>10}"
+            )
+
+    def comparar(self, resultado, baseline, tolerancia):
+        regressoes = []
+        for chave, atual in sorted(resultado.items()):
+            anterior = baseline.get(chave)
+            if not anterior:
+                continue
+            if atual["consultas"] > anterior["consultas"]:
+                regressoes.append(f"{chave}: consultas {anterior['consultas']} -> {atual['consultas']}")
+            if atual["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+                regressoes.append(f"{chave}: p95 {anterior['p95_ms']:.1f} ms -> {atual['p95_ms']:.1f} ms")
+            if atual["status"] != anterior["status"]:
+                regressoes.append(f"{chave}: status {anterior['status']} -> {atual['status']}")
+        return regressoes
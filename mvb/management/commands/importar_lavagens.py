@@ -0,0 +1,58 @@
+import csv
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from mvb.importacao import LOTE, PlanilhaInvalida, importar_lavagens
+from mvb.models import MesFechado
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa o histórico de lavagens de carreta de uma planilha XLSX ou CSV. As linhas "
+        "válidas são gravadas com bulk_create; as inválidas são listadas com o motivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Planilha .xlsx ou .csv")
+        parser.add_argument('--usuario', help="Usuário registrado como criador dos lançamentos")
+        parser.add_argument('--validar', action='store_true', help="Só valida; não grava nada")
+        parser.add_argument('--erros', help="Grava o relatório de erros neste CSV em vez de listá-lo")
+        parser.add_argument('--lote', type=int, default=LOTE, help="Linhas por bulk_create")
+
+    def handle(self, *args, **options):
+        caminho = Path(options['arquivo'])
+        if not caminho.exists():
+            raise CommandError(f"Arquivo não encontrado: {caminho}")
+        usuario = None
+        if options['usuario']:
+            try:
+                usuario = get_user_model().objects.get(username=options['usuario'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Usuário '{options['usuario']}' não existe.")
+
+        inicio = time.perf_counter()
+        try:
+            resultado = importar_lavagens(
+                caminho, caminho.name, usuario=usuario, validar_apenas=options['validar'], lote=options['lote']
+            )
+        except (PlanilhaInvalida, MesFechado) as e:
+            raise CommandError(" ".join(getattr(e, 'messages', [str(e)])))
+        duracao = time.perf_counter() - inicio
+
+        if options['erros']:
+            with open(options['erros'], 'w', newline='', encoding='utf-8') as f:
+                escritor = csv.writer(f, delimiter=';')
+                escritor.writerow(["Linha", "Erros"])
+                escritor.writerows((linha, "; ".join(motivos)) for linha, motivos in resultado.erros)
+        else:
+            for linha, motivos in resultado.erros:
+                self.stdout.write(f"  linha {linha}: {'; '.join(motivos)}")
+
+        verbo = "válida(s)" if options['validar'] else "importada(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.importadas} de {resultado.total} linha(s) {verbo} em {duracao:.1f}s; "
+            f"{len(resultado.erros)} com erro."
+        ))
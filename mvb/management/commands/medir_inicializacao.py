@@ -0,0 +1,115 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Bibliotecas que só as exportações e os gráficos usam
+BIBLIOTECAS_RELATORIO = [
+    "pandas", "openpyxl", "reportlab.platypus", "weasyprint",
+]
+
+# Executado em um interpretador novo a cada medição, para não herdar módulos já carregados.
+SCRIPT = """
+import json, resource, sys, time
+
+inicio = time.perf_counter()
+import project.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+boot = time.perf_counter() - inicio
+rss_boot = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+bibliotecas = {bibliotecas!r}
+carregadas = [b for b in bibliotecas if b in sys.modules]
+indisponiveis = []
+if {com_bibliotecas!r}:
+    for nome in bibliotecas:
+        try:
+            __import__(nome)
+        except Exception:
+            indisponiveis.append(nome)
+
+print(json.dumps({{
+    "segundos_boot": boot,
+    "segundos_total": time.perf_counter() - inicio,
+    "rss_boot_kb": rss_boot,
+    "rss_total_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "carregadas_no_boot": carregadas,
+    "indisponiveis": indisponiveis,
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo de importação e o RSS de project.wsgi (com as urls carregadas) em "
+        "processos novos, e quanto custaria carregar as bibliotecas de relatório junto."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=5, help="Processos por cenário (usa a mediana)")
+        parser.add_argument('--json', action='store_true', help="Imprime o resultado em JSON")
+        parser.add_argument(
+            '--estrito', action='store_true',
+            help="Falha se alguma biblioteca de relatório for importada no boot"
+        )
+
+    def handle(self, *args, **options):
+        if options['repeticoes'] < 1:
+            raise CommandError("--repeticoes deve ser pelo menos 1.")
+
+        resultado = {
+            "boot": self.medir(False, options['repeticoes']),
+            "boot_com_bibliotecas": self.medir(True, options['repeticoes']),
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultado, indent=2))
+        else:
+            boot = resultado["boot"]
+            completo = resultado["boot_com_bibliotecas"]
+            self.stdout.write(
+                f"project.wsgi + urls:        {boot['segundos_boot'] * 1000:7.0f} ms  "
+                f"{boot['rss_boot_kb'] / 1024:6.1f} MB"
+            )
+            self.stdout.write(
+                f"+ bibliotecas de relatório: {completo['segundos_total'] * 1000:7.0f} ms  "
+                f"{completo['rss_total_kb'] / 1024:6.1f} MB"
+            )
+            if completo["indisponiveis"]:
+                self.stdout.write(self.style.WARNING(
+                    "Não importadas (ausentes neste ambiente): " + ", ".join(completo["indisponiveis"])
+                ))
+
+        carregadas = resultado["boot"]["carregadas_no_boot"]
+        if carregadas:
+            mensagem = "Carregadas no boot: " + ", ".join(carregadas)
+            if options['estrito']:
+                raise CommandError(mensagem)
+            self.stderr.write(self.style.WARNING(mensagem))
+
+    def medir(self, com_bibliotecas, repeticoes):
+        script = SCRIPT.format(bibliotecas=BIBLIOTECAS_RELATORIO, com_bibliotecas=com_bibliotecas)
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'project.settings'))
+
+        amostras = []
+        for _ in range(repeticoes):
+            proc = subprocess.run(
+                [sys.executable, "-c", script],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                raise CommandError(f"Falha ao importar project.wsgi:\n{proc.stderr}")
+            amostras.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+        resumo = {
+            chave: statistics.median(a[chave] for a in amostras)
+            for chave in ("segundos_boot", "segundos_total", "rss_boot_kb", "rss_total_kb")
+        }
+        resumo["carregadas_no_boot"] = amostras[-1]["carregadas_no_boot"]
+        resumo["indisponiveis"] = amostras[-1]["indisponiveis"]
+        return resumo
@@ -0,0 +1,84 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from mvb.exportacao import executar_job
+from mvb.models import ExportJob
+
+logger = logging.getLogger("mvb.exportacao")
+
+# Reservas de um job antes de desistir dele (o worker pode ter caído por causa do próprio job)
+MAX_TENTATIVAS = 3
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker das exportações em segundo plano: gera os arquivos dos ExportJob "
+        "pendentes, na ordem de chegada, guardando o arquivo no próprio job (banco)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help="Processa a fila atual e sai")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos entre consultas à fila vazia")
+        parser.add_argument(
+            '--timeout', type=float, default=30.0,
+            help="Minutos em 'processando' após os quais o job é considerado abandonado e volta à fila",
+        )
+
+    def handle(self, *args, **options):
+        timeout = timedelta(minutes=options['timeout'])
+        while True:
+            close_old_connections()
+            self.recuperar_abandonados(timeout)
+            job = self.reservar_proximo()
+            if job:
+                self.processar(job)
+                continue
+            if options['uma_vez']:
+                return
+            time.sleep(options['intervalo'])
+
+    def recuperar_abandonados(self, timeout):
+        # jobs de um worker que morreu (deploy, OOM) ficariam em 'processando' para sempre
+        abandonados = ExportJob.objects.filter(status='processando', iniciado_em__lt=timezone.now() - timeout)
+        desistidos = abandonados.filter(tentativas__gte=MAX_TENTATIVAS).update(
+            status='erro', erro="Tempo esgotado ao gerar o arquivo.", concluido_em=timezone.now()
+        )
+        devolvidos = abandonados.update(status='pendente', iniciado_em=None, progresso=0)
+        if desistidos or devolvidos:
+            self.stderr.write(f"Jobs abandonados: {devolvidos} de volta à fila, {desistidos} com erro.")
+
+    def reservar_proximo(self):
+        # o UPDATE condicional garante que dois workers não peguem o mesmo job
+        for pk in ExportJob.objects.filter(status='pendente').values_list('pk', flat=True)[:5]:
+            reservado = ExportJob.objects.filter(pk=pk, status='pendente').update(
+                status='processando', iniciado_em=timezone.now(), progresso=0, tentativas=F('tentativas') + 1
+            )
+            if reservado:
+                return ExportJob.objects.get(pk=pk)
+        return None
+
+    def processar(self, job):
+        self.stdout.write(f"Gerando {job}...")
+        try:
+            executar_job(job)
+        except Exception as e:
+            # o traceback vai para o log do worker; no job (e no JSON de status) fica só o resumo
+            logger.exception("Falha ao gerar %s", job)
+            job.status = 'erro'
+            job.erro = f"{type(e).__name__}: {e}"[:200]
+            job.concluido_em = timezone.now()
+            job.save(update_fields=['status', 'erro', 'concluido_em'])
+            self.stderr.write(self.style.ERROR(f"Falha em {job}"))
+            return
+
+        job.status = 'concluido'
+        job.progresso = 100
+        job.concluido_em = timezone.now()
+        job.save(update_fields=['nome_arquivo', 'conteudo', 'status', 'progresso', 'concluido_em'])
+        self.stdout.write(self.style.SUCCESS(f"{job} pronto: {job.nome_arquivo}"))
@@ -0,0 +1,83 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from mvb.models import ReceitaDiaria, invalidar_kpis
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcilia a tabela ReceitaDiaria com a Lavagem (carretas, lavador sujo e "
+        "lavador carga). Use --reconstruir para apagar e recriar o período inteiro."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help="Data inicial (AAAA-MM-DD)")
+        parser.add_argument('--ate', help="Data final (AAAA-MM-DD)")
+        parser.add_argument('--reconstruir', action='store_true', help="Apaga e recria os buckets do período")
+        parser.add_argument('--dry-run', action='store_true', help="Apenas mostra as divergências")
+
+    def handle(self, *args, **options):
+        try:
+            dt_inicio = date.fromisoformat(options['desde']) if options['desde'] else None
+            dt_fim = date.fromisoformat(options['ate']) if options['ate'] else None
+        except ValueError as e:
+            raise CommandError(f"Data inválida: {e}")
+
+        esperado = ReceitaDiaria.calcular(dt_inicio, dt_fim)
+
+        existentes = ReceitaDiaria.objects.all()
+        if dt_inicio:
+            existentes = existentes.filter(data__gte=dt_inicio)
+        if dt_fim:
+            existentes = existentes.filter(data__lte=dt_fim)
+
+        with transaction.atomic():
+            if options['reconstruir']:
+                if options['dry_run']:
+                    self.stdout.write(
+                        f"Seriam apagados {existentes.count()} bucket(s) e recriados {len(esperado)} (dry-run)."
+                    )
+                    return
+                invalidar_kpis(*existentes.dates('data', 'month'), *{d for d, _, _ in esperado})
+                existentes.delete()
+                ReceitaDiaria.objects.bulk_create([
+                    ReceitaDiaria(data=d, origem=o, cliente_id=c, quantidade_caixas=qtd, valor_total=valor)
+                    for (d, o, c), (qtd, valor) in esperado.items()
+                ], batch_size=1000)
+                self.stdout.write(self.style.SUCCESS(f"{len(esperado)} bucket(s) recriados."))
+                return
+
+            criar, atualizar, remover = [], [], []
+            datas_afetadas = set()
+            for r in existentes.iterator(chunk_size=2000):
+                chave = (r.data, r.origem, r.cliente_id)
+                valores = esperado.pop(chave, None)
+                if valores is None:
+                    remover.append(r.pk)
+                    datas_afetadas.add(r.data)
+                elif (r.quantidade_caixas, r.valor_total) != valores:
+                    r.quantidade_caixas, r.valor_total = valores
+                    atualizar.append(r)
+                    datas_afetadas.add(r.data)
+            for (d, o, c), (qtd, valor) in esperado.items():
+                criar.append(ReceitaDiaria(data=d, origem=o, cliente_id=c, quantidade_caixas=qtd, valor_total=valor))
+                datas_afetadas.add(d)
+
+            if not options['dry_run']:
+                invalidar_kpis(*datas_afetadas)
+                for i in range(0, len(remover), 500):
+                    ReceitaDiaria.objects.filter(pk__in=remover[i:i + 500]).delete()
+                ReceitaDiaria.objects.bulk_update(atualizar, ['quantidade_caixas', 'valor_total'], batch_size=1000)
+                ReceitaDiaria.objects.bulk_create(criar, batch_size=1000)
+
+        if options['dry_run']:
+            self.stdout.write(
+                f"Seriam criados: {len(criar)} | atualizados: {len(atualizar)} | "
+                f"removidos: {len(remover)} (dry-run)"
+            )
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Criados: {len(criar)} | Atualizados: {len(atualizar)} | Removidos: {len(remover)}"
+        ))
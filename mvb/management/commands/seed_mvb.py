@@ -0,0 +1,92 @@
+import time
+from datetime import date
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from mvb.models import (
+    CHAVE_MESES_FECHADOS, FechamentoMes, Financeiro, Lavagem, MesFechado, Presenca, ReceitaDiaria,
+)
+from mvb.semeadura import semear
+
+# Movimento apagado por --limpar (com os fechamentos, que o congelam);
+# cadastros (clientes, funcionários, tipos) ficam
+MOVIMENTO = (FechamentoMes, ReceitaDiaria, Lavagem, Presenca, Financeiro)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos em volume de produção (clientes, funcionários, lavagens, "
+        "presenças e financeiro) com bulk_create, de forma determinística pela semente, "
+        "e reconstrói a ReceitaDiaria no fim."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=200)
+        parser.add_argument('--funcionarios', type=int, default=60)
+        parser.add_argument('--anos', type=int, default=3, help="Anos de movimento gerados")
+        parser.add_argument(
+            '--lavagens-por-dia', type=int, default=120,
+            help="Média diária de lançamentos somando as três tabelas de lavagem"
+        )
+        parser.add_argument('--fim', help="Último dia do movimento (AAAA-MM-DD); padrão: hoje")
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=5000, help="Linhas por bulk_create")
+        parser.add_argument('--limpar', action='store_true', help="Apaga o movimento existente e os fechamentos de mês antes de gerar")
+        parser.add_argument('--forcar', action='store_true', help="Permite rodar com DEBUG desligado")
+        parser.add_argument('--no-input', action='store_true', help="Não pede confirmação para --limpar")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['forcar']:
+            raise CommandError("DEBUG está desligado; use --forcar se este banco pode mesmo receber dados sintéticos.")
+        try:
+            fim = date.fromisoformat(options['fim']) if options['fim'] else None
+        except ValueError as e:
+            raise CommandError(f"Data inválida: {e}")
+        if options['limpar'] and not options['no_input']:
+            resposta = input(f"Apagar todo o movimento e os fechamentos de '{connection.settings_dict['NAME']}'? [s/N] ")
+            if resposta.strip().lower() != 's':
+                raise CommandError("Cancelado.")
+
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            # sem fsync a cada lote; em caso de queda, basta gerar de novo
+            # (o SQLite só aceita o PRAGMA fora de transação)
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA synchronous = OFF")
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            if options['limpar']:
+                # DELETE direto: .delete() carregaria cada linha para disparar os signals
+                with connection.cursor() as cursor:
+                    for modelo in MOVIMENTO:
+                        cursor.execute(f"DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}")
+                # o DELETE direto também não passa pelo signal que invalida este cache
+                transaction.on_commit(lambda: cache.delete(CHAVE_MESES_FECHADOS))
+            try:
+                contagem = semear(
+                    clientes=options['clientes'], funcionarios=options['funcionarios'], anos=options['anos'],
+                    lavagens_por_dia=options['lavagens_por_dia'], fim=fim, semente=options['semente'],
+                    lote=options['lote'], progresso=self.progresso,
+                )
+            except MesFechado as e:
+                raise CommandError(e.messages[0])
+            self.stdout.write("\nReconstruindo ReceitaDiaria...")
+            # --reconstruir também invalida o cache de KPIs dos meses gerados
+            call_command('reconstruir_receita_diaria', '--reconstruir', stdout=StringIO())
+        duracao = time.perf_counter() - inicio
+
+        total = sum(contagem.values())
+        for modelo, qtd in contagem.items():
+            self.stdout.write(f"  {modelo:<20} {qtd:>10}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} linha(s) em {duracao:.1f}s ({total / duracao:,.0f} linhas/s)."
+        ))
+
+    def progresso(self, modelo, total):
+        self.stdout.write(f"  {modelo:<20} {total:>10}", ending="\r")
+        self.stdout.flush()
@@ -0,0 +1,117 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from mvb.models import (
+    Cliente, Financeiro, Funcionario, LavadorCargaEntry, LavadorSujoEntry,
+    Lavagem, LavagemCarreta, Presenca, TipoCaixa, TipoProduto,
+)
+from mvb.semeadura import semear
+
+
+# Cadastros e Financeiro têm poucas linhas mesmo em produção, e o planejador do
+# PostgreSQL os varre de qualquer forma; só para eles o teste desliga o Seq Scan
+# e verifica se existe índice que atenda a consulta. Nas tabelas de movimento o
+# plano é o que o planejador escolheria em produção.
+TABELAS_PEQUENAS = (Financeiro, Funcionario, TipoCaixa, TipoProduto)
+
+
+class Rollback(Exception):
+    pass
+
+
+def consultas_relatorios(fim):
+    """(nome, queryset, tabela que não pode ser lida por varredura sequencial)"""
+    semana = (fim - timedelta(days=6), fim)
+    mes = (fim.replace(day=1), fim)
+    cliente = Cliente.objects.order_by('pk').first()
+    funcionario = Funcionario.objects.filter(ativo=True).order_by('pk').first()
+
+    consultas = []
+    for modelo in (LavagemCarreta, LavadorSujoEntry, LavadorCargaEntry):
+        nome = modelo.__name__
+        consultas += [
+            (f"{nome}: data__range", modelo.objects.filter(data__range=semana), modelo),
+            (f"{nome}: data__year/month", modelo.objects.filter(data__year=fim.year, data__month=fim.month), modelo),
+            (f"{nome}: cliente + data__range", modelo.objects.filter(cliente=cliente, data__range=mes), modelo),
+            (f"{nome}: lista por -data", modelo.objects.order_by('-data')[:20], modelo),
+        ]
+    consultas += [
+        ("Lavagem: data__range", Lavagem.objects.filter(data__range=semana), Lavagem),
+        ("Lavagem: cliente + data__range", Lavagem.objects.filter(cliente=cliente, data__range=mes), Lavagem),
+        ("Presenca: data__range", Presenca.objects.filter(data__range=semana), Presenca),
+        (
+            "Presenca: funcionario + status + data__range",
+            Presenca.objects.filter(funcionario=funcionario, status='F', data__range=mes),
+            Presenca,
+        ),
+        ("Financeiro: ano/mes", Financeiro.objects.filter(ano=fim.year, mes=fim.month), Financeiro),
+        ("Financeiro: data__range", Financeiro.objects.filter(data__range=mes), Financeiro),
+        ("Funcionario: ativos por nome", Funcionario.objects.filter(ativo=True).order_by('nome'), Funcionario),
+        ("TipoCaixa: ativos por nome", TipoCaixa.objects.filter(ativo=True).order_by('nome'), TipoCaixa),
+        ("TipoProduto: ativos por nome", TipoProduto.objects.filter(ativo=True).order_by('nome'), TipoProduto),
+    ]
+    return consultas
+
+
+def varredura_sequencial(plano, tabela):
+    if connection.vendor == 'postgresql':
+        return re.search(rf'Seq Scan on "?{tabela}"?\b', plano) is not None
+    if connection.vendor == 'sqlite':
+        # "SCAN tabela" sem "USING ... INDEX" é leitura da tabela inteira
+        return any(
+            re.search(rf'\bSCAN {tabela}\b', linha) and 'INDEX' not in linha
+            for linha in plano.splitlines()
+        )
+    raise CommandError(f"Banco '{connection.vendor}' não suportado.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula uma massa de dados sintética (dentro de uma transação desfeita no fim), "
+        "roda EXPLAIN nas consultas dos relatórios e falha se alguma ler a tabela inteira."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anos', type=int, default=2, help="Anos de movimento gerados")
+        parser.add_argument('--lavagens-por-dia', type=int, default=120)
+        parser.add_argument('--mostrar', action='store_true', help="Imprime o plano de cada consulta")
+
+    def handle(self, *args, **options):
+        falhas = []
+        try:
+            with transaction.atomic():
+                self.stdout.write("Gerando massa de dados...")
+                semear(anos=options['anos'], lavagens_por_dia=options['lavagens_por_dia'], clientes=300)
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+
+                fim = LavagemCarreta.objects.latest('data').data
+                for nome, qs, modelo in consultas_relatorios(fim):
+                    plano = self.explicar(qs, forcar_indice=modelo in TABELAS_PEQUENAS)
+                    ruim = varredura_sequencial(plano, modelo._meta.db_table)
+                    if ruim:
+                        falhas.append(nome)
+                    marca = self.style.ERROR("SEQ SCAN") if ruim else self.style.SUCCESS("índice  ")
+                    self.stdout.write(f"{marca}  {nome}")
+                    if options['mostrar'] or ruim:
+                        self.stdout.write("    " + plano.replace("\n", "\n    "))
+                raise Rollback
+        except Rollback:
+            pass
+
+        if falhas:
+            raise CommandError(f"{len(falhas)} consulta(s) sem índice: " + "; ".join(falhas))
+        self.stdout.write(self.style.SUCCESS("Todas as consultas usam índice."))
+
+    def explicar(self, qs, forcar_indice):
+        if not forcar_indice or connection.vendor != 'postgresql':
+            return qs.explain()
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            try:
+                return qs.explain()
+            finally:
+                cursor.execute("SET LOCAL enable_seqscan = on")
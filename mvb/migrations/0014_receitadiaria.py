@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:37
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum, F, DecimalField, ExpressionWrapper
+
+
+def popular_receita_diaria(apps, schema_editor):
+    ReceitaDiaria = apps.get_model('mvb', 'ReceitaDiaria')
+    valor_caixas = Sum(ExpressionWrapper(F('quantidade_caixas') * F('valor_por_caixa'), output_field=DecimalField()))
+    origens = [
+        ('carreta', apps.get_model('mvb', 'LavagemCarreta'), valor_caixas),
+        ('sujo', apps.get_model('mvb', 'LavadorSujoEntry'), valor_caixas),
+        ('carga', apps.get_model('mvb', 'LavadorCargaEntry'), Sum('valor_rendido')),
+    ]
+    for origem, modelo, valor in origens:
+        linhas = modelo.objects.values('data', 'cliente_id').annotate(
+            qtd=Sum('quantidade_caixas'), valor=valor
+        ).order_by()
+        ReceitaDiaria.objects.bulk_create([
+            ReceitaDiaria(
+                data=r['data'], origem=origem, cliente_id=r['cliente_id'],
+                quantidade_caixas=r['qtd'] or 0, valor_total=r['valor'] or Decimal('0.00'),
+            )
+            for r in linhas
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mvb', '0013_tipocaixa_ativo_tipoproduto_ativo_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceitaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('origem', models.CharField(choices=[('carreta', 'Lavagens Carretas'), ('sujo', 'Lavador Sujo'), ('carga', 'Lavador Carga')], max_length=10)),
+                ('quantidade_caixas', models.PositiveIntegerField(default=0)),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='receitas_diarias', to='mvb.cliente')),
+            ],
+            options={
+                'ordering': ['-data'],
+                'unique_together': {('data', 'origem', 'cliente')},
+            },
+        ),
+        migrations.RunPython(popular_receita_diaria, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mvb', '0014_receitadiaria'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('relatorio_pdf', 'Relatório por período (PDF)'), ('relatorio_excel', 'Relatório por período (planilha)'), ('filtrado_pdf', 'Relatório filtrado (PDF)'), ('filtrado_excel', 'Relatório filtrado (planilha)'), ('financeiro_pdf', 'Financeiro (PDF)'), ('financeiro_excel', 'Financeiro (planilha)'), ('lavagens_pdf', 'Lavagens (PDF)'), ('lavagens_excel', 'Lavagens (planilha)')], max_length=30)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=15)),
+                ('progresso', models.PositiveSmallIntegerField(default=0)),
+                ('arquivo', models.FileField(blank=True, upload_to='exportacoes/')),
+                ('erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exportacoes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['criado_em'],
+                'indexes': [models.Index(fields=['status', 'criado_em'], name='mvb_exportj_status_21ce07_idx')],
+            },
+        ),
+    ]
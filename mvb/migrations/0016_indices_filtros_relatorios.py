@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mvb', '0015_exportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='financeiro',
+            index=models.Index(fields=['data'], name='financeiro_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financeiro',
+            index=models.Index(fields=['ano', 'mes'], name='financeiro_ano_mes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='funcionario',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['nome'], name='funcionario_ativo_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lavadorcargaentry',
+            index=models.Index(fields=['data'], name='lavcarga_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lavadorcargaentry',
+            index=models.Index(fields=['cliente', 'data'], name='lavcarga_cliente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lavadorsujoentry',
+            index=models.Index(fields=['data'], name='lavsujo_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lavadorsujoentry',
+            index=models.Index(fields=['cliente', 'data'], name='lavsujo_cliente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lavagemcarreta',
+            index=models.Index(fields=['data'], name='lavcarreta_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lavagemcarreta',
+            index=models.Index(fields=['cliente', 'data'], name='lavcarreta_cliente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='presenca',
+            index=models.Index(fields=['data'], name='presenca_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='presenca',
+            index=models.Index(fields=['funcionario', 'status', 'data'], name='presenca_func_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tipocaixa',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['nome'], name='tipocaixa_ativo_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tipoproduto',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['nome'], name='tipoproduto_ativo_nome_idx'),
+        ),
+    ]
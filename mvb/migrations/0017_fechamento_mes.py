@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mvb', '0016_indices_filtros_relatorios'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FechamentoMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.PositiveIntegerField()),
+                ('mes', models.PositiveIntegerField()),
+                ('quantidade_carreta', models.PositiveIntegerField(default=0)),
+                ('quantidade_sujo', models.PositiveIntegerField(default=0)),
+                ('quantidade_carga', models.PositiveIntegerField(default=0)),
+                ('receita_carreta', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('receita_sujo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('receita_carga', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('salario_total_funcionarios', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('frete', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refeicao_cafe', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refeicao_almoco', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('contabilidade', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('inss', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('receita_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('despesas_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lucro', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fechado_em', models.DateTimeField(auto_now_add=True)),
+                ('fechado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fechamentos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-ano', '-mes'],
+                'constraints': [models.UniqueConstraint(fields=('ano', 'mes'), name='fechamento_ano_mes_unico')],
+            },
+        ),
+    ]
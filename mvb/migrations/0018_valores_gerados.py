@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:28
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mvb', '0017_fechamento_mes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lavadorsujoentry',
+            name='valor_total',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('quantidade_caixas'), '*', models.F('valor_por_caixa')), output_field=models.DecimalField(decimal_places=2, max_digits=14)),
+        ),
+        migrations.AddField(
+            model_name='lavagemcarreta',
+            name='valor_total',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('quantidade_caixas'), '*', models.F('valor_por_caixa')), output_field=models.DecimalField(decimal_places=2, max_digits=14)),
+        ),
+        # uma coluna comum não pode virar gerada com ALTER: remove e cria de novo
+        migrations.RemoveField(
+            model_name='financeiro',
+            name='total',
+        ),
+        migrations.AddField(
+            model_name='financeiro',
+            name='total',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('salario_total_funcionarios'), '+', models.F('frete')), '+', models.F('refeicao_cafe')), '+', models.F('refeicao_almoco')), '+', models.F('contabilidade')), '+', models.F('inss')), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+    ]
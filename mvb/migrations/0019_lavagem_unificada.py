@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:32
+
+import django.core.validators
+import django.db.models.deletion
+import django.db.models.expressions
+import mvb.models
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Lavagem é criada aqui, vazia; 0020 copia as três tabelas antigas e 0021 as
+# remove. Ficam em migrações separadas porque, no PostgreSQL, as FKs são
+# DEFERRABLE INITIALLY DEFERRED: linhas gravadas por RunPython deixam eventos de
+# trigger pendentes até o commit, e um ALTER TABLE na mesma transação falha.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mvb', '0018_valores_gerados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lavagem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origem', models.CharField(choices=[('carreta', 'Lavagens Carretas'), ('sujo', 'Lavador Sujo'), ('carga', 'Lavador Carga')], editable=False, max_length=10)),
+                ('data', models.DateField(verbose_name='Data da Lavagem')),
+                ('tipo_lavagem', models.CharField(choices=[('sujo', 'Sujo'), ('carga', 'Por Carga')], default='sujo', max_length=10)),
+                ('lavador', models.CharField(blank=True, editable=False, max_length=50)),
+                ('quantidade_caixas', models.PositiveIntegerField(default=0)),
+                ('carreta_ident', models.CharField(blank=True, max_length=100, verbose_name='Carreta (Nome Motorista)')),
+                ('valor_por_caixa', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))])),
+                ('tamanho_caixa', models.CharField(blank=True, max_length=10)),
+                ('q_3A', models.PositiveIntegerField(default=0)),
+                ('q_2A', models.PositiveIntegerField(default=0)),
+                ('q_1A', models.PositiveIntegerField(default=0)),
+                ('q_G', models.PositiveIntegerField(default=0)),
+                ('valor_rendido', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Valor que rendeu da carreta')),
+                ('valor_total', models.GeneratedField(db_persist=True, expression=models.Case(models.When(origem='carga', then=models.F('valor_rendido')), default=django.db.models.expressions.CombinedExpression(models.F('quantidade_caixas'), '*', models.F('valor_por_caixa'))), output_field=models.DecimalField(decimal_places=2, max_digits=14))),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=mvb.models.proteger_carretas, related_name='lavagens', to='mvb.cliente')),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('tipo_caixa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='mvb.tipocaixa')),
+                ('tipo_produto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='mvb.tipoproduto')),
+            ],
+            options={
+                'verbose_name_plural': 'lavagens',
+                'indexes': [models.Index(fields=['data'], name='lavagem_data_idx'), models.Index(fields=['origem', 'data'], name='lavagem_origem_data_idx'), models.Index(fields=['cliente', 'data'], name='lavagem_cliente_data_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:32
+
+from django.core.management.color import no_style
+from django.db import migrations
+
+
+# Colunas copiadas de cada tabela antiga, além das comuns às três
+COMUNS = ['data', 'cliente_id', 'tipo_lavagem', 'quantidade_caixas', 'criado_por_id']
+TABELAS = {
+    'carreta': ('LavagemCarreta', ['carreta_ident', 'tipo_caixa_id', 'tipo_produto_id', 'valor_por_caixa']),
+    'sujo': ('LavadorSujoEntry', ['lavador', 'tamanho_caixa', 'tipo_produto_id', 'valor_por_caixa']),
+    'carga': ('LavadorCargaEntry', ['lavador', 'q_3A', 'q_2A', 'q_1A', 'q_G', 'valor_rendido']),
+}
+# As carretas mantêm o id (é o das URLs lavagens/<pk>/editar e excluir); como os ids
+# das três tabelas se repetem, sujo e carga recebem ids novos, depois dos delas.
+MANTEM_ID = 'carreta'
+LOTE = 5000
+
+
+def _copiar(origem_qs, criar, destino):
+    lote = []
+    for linha in origem_qs.iterator(chunk_size=LOTE):
+        lote.append(criar(linha))
+        if len(lote) >= LOTE:
+            destino.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        destino.objects.bulk_create(lote)
+
+
+def _reiniciar_sequencia(schema_editor, *modelos):
+    # ids gravados explicitamente não avançam a sequência do PostgreSQL
+    for sql in schema_editor.connection.ops.sequence_reset_sql(no_style(), modelos):
+        schema_editor.execute(sql)
+
+
+def copiar_para_lavagem(apps, schema_editor):
+    Lavagem = apps.get_model('mvb', 'Lavagem')
+    for origem, (nome, campos) in TABELAS.items():
+        antigo = apps.get_model('mvb', nome)
+        id_ = ['id'] if origem == MANTEM_ID else []
+        _copiar(
+            antigo.objects.order_by('data', 'pk').values(*id_, *COMUNS, *campos),
+            lambda linha, origem=origem: Lavagem(origem=origem, **linha),
+            Lavagem,
+        )
+        _reiniciar_sequencia(schema_editor, Lavagem)
+
+
+def copiar_de_lavagem(apps, schema_editor):
+    Lavagem = apps.get_model('mvb', 'Lavagem')
+    for origem, (nome, campos) in TABELAS.items():
+        antigo = apps.get_model('mvb', nome)
+        _copiar(
+            Lavagem.objects.filter(origem=origem).order_by('pk').values('id', *COMUNS, *campos),
+            lambda linha, antigo=antigo: antigo(**linha),
+            antigo,
+        )
+        _reiniciar_sequencia(schema_editor, antigo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mvb', '0019_lavagem_unificada'),
+    ]
+
+    operations = [
+        migrations.RunPython(copiar_para_lavagem, copiar_de_lavagem),
+    ]
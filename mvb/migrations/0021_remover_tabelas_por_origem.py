@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mvb', '0020_copiar_lavagens'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='LavadorCargaEntry',
+        ),
+        migrations.DeleteModel(
+            name='LavadorSujoEntry',
+        ),
+        migrations.DeleteModel(
+            name='LavagemCarreta',
+        ),
+        migrations.CreateModel(
+            name='LavadorCargaEntry',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('mvb.lavagem',),
+        ),
+        migrations.CreateModel(
+            name='LavadorSujoEntry',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('mvb.lavagem',),
+        ),
+        migrations.CreateModel(
+            name='LavagemCarreta',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('mvb.lavagem',),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mvb', '0021_remover_tabelas_por_origem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='tentativas',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:05
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def unificar_buckets_sem_cliente(apps, schema_editor):
+    # Inclusões simultâneas podem ter criado o mesmo bucket sem cliente mais de uma
+    # vez; cada um é refeito a partir da Lavagem antes de a constraint existir.
+    ReceitaDiaria = apps.get_model('mvb', 'ReceitaDiaria')
+    Lavagem = apps.get_model('mvb', 'Lavagem')
+    repetidos = ReceitaDiaria.objects.filter(cliente__isnull=True).values('data', 'origem').annotate(
+        n=Count('id')
+    ).filter(n__gt=1).order_by()
+    for bucket in repetidos:
+        chave = {'data': bucket['data'], 'origem': bucket['origem'], 'cliente': None}
+        ReceitaDiaria.objects.filter(**chave).delete()
+        totais = Lavagem.objects.filter(**chave).aggregate(
+            n=Count('id'), qtd=Sum('quantidade_caixas'), valor=Sum('valor_total')
+        )
+        if totais['n']:
+            ReceitaDiaria.objects.create(
+                **chave, quantidade_caixas=totais['qtd'] or 0, valor_total=totais['valor'] or Decimal('0.00'),
+            )
+
+
+class Migration(migrations.Migration):
+    # No PostgreSQL o RunPython deixaria eventos de trigger pendentes (FK cliente
+    # é DEFERRED) antes da criação da constraint; sem a transação da migração,
+    # cada operação confirma a sua.
+    atomic = False
+
+    dependencies = [
+        ('mvb', '0022_exportjob_tentativas'),
+    ]
+
+    operations = [
+        migrations.RunPython(unificar_buckets_sem_cliente, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='receitadiaria',
+            constraint=models.UniqueConstraint(condition=models.Q(('cliente__isnull', True)), fields=('data', 'origem'), name='receitadiaria_sem_cliente_unica'),
+        ),
+    ]
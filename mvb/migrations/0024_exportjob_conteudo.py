@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mvb', '0023_receitadiaria_sem_cliente_unica'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='exportjob',
+            name='arquivo',
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='conteudo',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='nome_arquivo',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -1,8 +1,14 @@
-from django.db import models
+import uuid
+from calendar import monthrange
+from datetime import date, timedelta
+from django.db import connection, models, transaction
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from decimal import Decimal
-from django.db.models.signals import post_save, pre_save
+from django.db.models import Sum, F
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
 from .validators import validate_cpf
 from django.utils import timezone
@@ -28,6 +34,11 @@ class Funcionario(models.Model):
     funcao = models.ForeignKey(Funcao, on_delete=models.PROTECT, related_name='funcionarios')
     ativo = models.BooleanField(default=True, verbose_name="Ativo")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['nome'], condition=models.Q(ativo=True), name='funcionario_ativo_nome_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nome} ({self.funcao.nome})"
     
@@ -46,18 +57,47 @@ class TipoCaixa(models.Model):
     tamanho = models.CharField(max_length=20, verbose_name="Tamanho")
     ativo = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['nome'], condition=models.Q(ativo=True), name='tipocaixa_ativo_nome_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nome} - {self.tamanho}"
 
 class TipoProduto(models.Model):
     nome = models.CharField(max_length=100, verbose_name="Tipo de Produto")
     ativo = models.BooleanField(default=True)
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nome'], condition=models.Q(ativo=True), name='tipoproduto_ativo_nome_idx'),
+        ]
+
     def __str__(self):
         return self.nome
 
+# Lançamentos com `data` que entram no fechamento do mês (ver FechamentoMes)
+class LancamentoDoMes:
+    def clean(self):
+        super().clean()
+        try:
+            verificar_mes_aberto(self.data, self._data_gravada())
+        except MesFechado as e:
+            raise ValidationError({'data': e.messages})
+
+    def delete(self, *args, **kwargs):
+        # verifica antes do atomic do delete(): o erro não deixa a transação quebrada
+        verificar_mes_aberto(self.data, self._data_gravada())
+        return super().delete(*args, **kwargs)
+
+    def _data_gravada(self):
+        if not self.pk or not meses_fechados():
+            return None
+        return type(self).objects.filter(pk=self.pk).values_list('data', flat=True).first()
+
 # Financeiro
-class Financeiro(models.Model):
+class Financeiro(LancamentoDoMes, models.Model):
     data = models.DateField(default=timezone.now)
 
     ano = models.PositiveIntegerField(editable=False)
@@ -70,7 +110,15 @@ class Financeiro(models.Model):
     contabilidade = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     inss = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
-    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # calculado pelo banco: vale também para QuerySet.update() e bulk_create
+    total = models.GeneratedField(
+        expression=(
+            F('salario_total_funcionarios') + F('frete') + F('refeicao_cafe')
+            + F('refeicao_almoco') + F('contabilidade') + F('inss')
+        ),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
 
     criado_em = models.DateTimeField(auto_now_add=True)
     criado_por = models.ForeignKey(
@@ -82,17 +130,10 @@ class Financeiro(models.Model):
 
     class Meta:
         ordering = ['-data']
-
-    def calcular_total(self):
-        valores = [
-            self.salario_total_funcionarios,
-            self.frete,
-            self.refeicao_cafe,
-            self.refeicao_almoco,
-            self.contabilidade,
-            self.inss,
+        indexes = [
+            models.Index(fields=['data'], name='financeiro_data_idx'),
+            models.Index(fields=['ano', 'mes'], name='financeiro_ano_mes_idx'),
         ]
-        return sum((v or Decimal("0.00")) for v in valores)
 
     def save(self, *args, **kwargs):
         # Preenche ano e mês automaticamente
@@ -100,96 +141,172 @@ class Financeiro(models.Model):
             self.ano = self.data.year
             self.mes = self.data.month
 
-        self.total = self.calcular_total()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.data.strftime('%d/%m/%Y')} - R$ {self.total}"
     
+def proteger_carretas(collector, field, sub_objs, using):
+    """
+    on_delete de Lavagem.cliente: mantém o que cada tabela antiga fazia ao excluir
+    o cliente. Lavagens de carreta protegem o cliente (PROTECT); as de lavador
+    sujo e carga são excluídas junto (CASCADE).
+    """
+    carretas = [obj for obj in sub_objs if obj.origem == 'carreta']
+    if carretas:
+        models.PROTECT(collector, field, carretas, using)
+    models.CASCADE(collector, field, [obj for obj in sub_objs if obj.origem != 'carreta'], using)
+
+
 # Lavagem / Lavadores
-class LavagemCarreta(models.Model):
-    data = models.DateField(verbose_name="Data da Lavagem")
-    carreta_ident = models.CharField(max_length=100, verbose_name="Carreta (Nome Motorista)", blank=True)
-    cliente = models.ForeignKey(
-        "Cliente",
-        on_delete=models.PROTECT,
-        related_name="lavagens_carreta",
-        null=True, blank=True
-    )
+# As três origens (carreta, lavador sujo, lavador carga) ficam numa tabela só,
+# discriminadas por `origem`; as colunas próprias de cada origem ficam nulas
+# nas outras. LavagemCarreta, LavadorSujoEntry e LavadorCargaEntry são proxies
+# que filtram pela origem e já nascem com ela preenchida.
+class Lavagem(LancamentoDoMes, models.Model):
+    ORIGEM_CHOICES = [
+        ('carreta', 'Lavagens Carretas'),
+        ('sujo', 'Lavador Sujo'),
+        ('carga', 'Lavador Carga'),
+    ]
     TIPO_CHOICES = [
         ("sujo", "Sujo"),
         ("carga", "Por Carga"),
     ]
-    tipo_lavagem = models.CharField(max_length=10, choices=TIPO_CHOICES, default="sujo")
 
-    def __str__(self):
-        return f"Carreta {self.carreta_ident} - {self.data}"
-    tipo_caixa = models.ForeignKey(TipoCaixa, on_delete=models.PROTECT)
-    tipo_produto = models.ForeignKey(TipoProduto, on_delete=models.PROTECT)
-    quantidade_caixas = models.PositiveIntegerField(default=0)
-    valor_por_caixa = models.DecimalField(max_digits=8, decimal_places=2, validators=[MinValueValidator(Decimal('0.00'))])
-    criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
-
-    def valor_total(self):
-        return self.quantidade_caixas * self.valor_por_caixa
-
-class LavadorSujoEntry(models.Model):
-    lavador = models.CharField(max_length=50, default="Lavador 1", editable=False)
-    data = models.DateField()
+    origem = models.CharField(max_length=10, choices=ORIGEM_CHOICES, editable=False)
+    data = models.DateField(verbose_name="Data da Lavagem")
     cliente = models.ForeignKey(
         "Cliente",
-        on_delete=models.CASCADE,
-        related_name="lavagens_sujo",
+        on_delete=proteger_carretas,
+        related_name="lavagens",
         null=True, blank=True
     )
-    TIPO_CHOICES = [
-        ("sujo", "Sujo"),
-        ("carga", "Por Carga"),
-    ]
     tipo_lavagem = models.CharField(max_length=10, choices=TIPO_CHOICES, default="sujo")
+    lavador = models.CharField(max_length=50, blank=True, editable=False)
+    quantidade_caixas = models.PositiveIntegerField(default=0)
 
-    def __str__(self):
-        return f"Sujo - {self.data}"
-    quantidade_caixas = models.PositiveIntegerField()
-    tamanho_caixa = models.CharField(max_length=10)
-    tipo_produto = models.ForeignKey(TipoProduto, on_delete=models.PROTECT)
-    valor_por_caixa = models.DecimalField(max_digits=8, decimal_places=2)
-    criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
-
-    def valor_total(self):
-        return self.quantidade_caixas * self.valor_por_caixa
-
-    def __str__(self):
-        return f"{self.lavador} - {self.data} - {self.quantidade_caixas} caixas"
-
-class LavadorCargaEntry(models.Model):
-    lavador = models.CharField(max_length=50, default="Lavador 2", editable=False)
-    data = models.DateField()
-    cliente = models.ForeignKey(
-        "Cliente",
-        on_delete=models.CASCADE,
-        related_name="lavagens_carga",
-        null=True, blank=True
+    # carreta
+    carreta_ident = models.CharField(max_length=100, verbose_name="Carreta (Nome Motorista)", blank=True)
+    tipo_caixa = models.ForeignKey(TipoCaixa, on_delete=models.PROTECT, null=True, blank=True)
+    # carreta e lavador sujo
+    tipo_produto = models.ForeignKey(TipoProduto, on_delete=models.PROTECT, null=True, blank=True)
+    valor_por_caixa = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(Decimal('0.00'))]
     )
-    TIPO_CHOICES = [
-        ("sujo", "Sujo"),
-        ("carga", "Por Carga"),
-    ]
-    tipo_lavagem = models.CharField(max_length=10, choices=TIPO_CHOICES, default="carga")
-
-    def __str__(self):
-        return f"Carga - {self.data}"
-    quantidade_caixas = models.PositiveIntegerField()
+    # lavador sujo
+    tamanho_caixa = models.CharField(max_length=10, blank=True)
+    # lavador carga
     q_3A = models.PositiveIntegerField(default=0)
     q_2A = models.PositiveIntegerField(default=0)
     q_1A = models.PositiveIntegerField(default=0)
     q_G = models.PositiveIntegerField(default=0)
     valor_rendido = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Valor que rendeu da carreta")
+
+    # a carga registra o valor que a carreta rendeu; as demais, quantidade x valor por caixa
+    valor_total = models.GeneratedField(
+        expression=models.Case(
+            models.When(origem='carga', then=F('valor_rendido')),
+            default=F('quantidade_caixas') * F('valor_por_caixa'),
+        ),
+        output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        db_persist=True,
+    )
     criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
 
+    # preenchidos pelos proxies
+    ORIGEM = None
+    PADROES = {}
+    # FKs que o lançamento em lote já conferiu contra os objetos carregados
+    # (EscolhaCarregada): clean_fields() não consulta o banco de novo por linha
+    fks_conferidas = ()
+
+    class Meta:
+        verbose_name_plural = "lavagens"
+        indexes = [
+            models.Index(fields=['data'], name='lavagem_data_idx'),
+            models.Index(fields=['origem', 'data'], name='lavagem_origem_data_idx'),
+            models.Index(fields=['cliente', 'data'], name='lavagem_cliente_data_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # from_db() passa os valores posicionais: só instâncias novas recebem os padrões
+        if not args and self.ORIGEM:
+            self.origem = self.ORIGEM
+            for campo, valor in self.PADROES.items():
+                if campo not in kwargs:
+                    setattr(self, campo, valor)
+
+    def clean_fields(self, exclude=None):
+        super().clean_fields(exclude=set(exclude or ()) | set(self.fks_conferidas))
+
     def total_caixas_por_categoria(self):
         return self.q_3A + self.q_2A + self.q_1A + self.q_G
 
+    @classmethod
+    def criar_em_lote(cls, lavagens, lote=None):
+        """
+        Grava várias lavagens com bulk_create (em lotes de `lote` linhas, se
+        informado), numa transação. O bulk_create não dispara os signals: a
+        checagem de mês fechado, a ReceitaDiaria e os caches que eles cuidariam
+        são tratados aqui, uma vez para o lote inteiro.
+        """
+        if not lavagens:
+            return []
+        datas = {l.data for l in lavagens}
+        verificar_mes_aberto(*datas)
+        with transaction.atomic():
+            criadas = cls.objects.bulk_create(lavagens, batch_size=lote)
+            ReceitaDiaria.recalcular_varios({(l.origem, l.data, l.cliente_id) for l in criadas})
+            invalidar_kpis(*datas)
+            invalidar_grafico_painel(cls, None)
+        return criadas
+
+    def __str__(self):
+        return f"{self.get_origem_display()} - {self.data} - {self.quantidade_caixas} caixas"
+
+
+class LavagensDaOrigem(models.Manager):
+    def __init__(self, origem):
+        super().__init__()
+        self.origem = origem
+
+    def get_queryset(self):
+        return super().get_queryset().filter(origem=self.origem)
+
+
+class LavagemCarreta(Lavagem):
+    ORIGEM = 'carreta'
+    objects = LavagensDaOrigem('carreta')
+
+    class Meta:
+        proxy = True
+
+    def __str__(self):
+        return f"Carreta {self.carreta_ident} - {self.data}"
+
+
+class LavadorSujoEntry(Lavagem):
+    ORIGEM = 'sujo'
+    PADROES = {'lavador': "Lavador 1"}
+    objects = LavagensDaOrigem('sujo')
+
+    class Meta:
+        proxy = True
+
+    def __str__(self):
+        return f"{self.lavador} - {self.data} - {self.quantidade_caixas} caixas"
+
+
+class LavadorCargaEntry(Lavagem):
+    ORIGEM = 'carga'
+    PADROES = {'lavador': "Lavador 2", 'tipo_lavagem': "carga"}
+    objects = LavagensDaOrigem('carga')
+
+    class Meta:
+        proxy = True
+
     def __str__(self):
         return f"{self.lavador} - {self.data} - {self.quantidade_caixas} caixas"
 
@@ -249,6 +366,10 @@ class Presenca(models.Model):
 
     class Meta:
         unique_together = ('funcionario', 'data')
+        indexes = [
+            models.Index(fields=['data'], name='presenca_data_idx'),
+            models.Index(fields=['funcionario', 'status', 'data'], name='presenca_func_status_data_idx'),
+        ]
 
     def __str__(self):
         return f"{self.funcionario.nome} - {self.data} - {self.get_status_display()}"
@@ -272,3 +393,458 @@ class BonusPayment(models.Model):
 
     def __str__(self):
         return f"{self.funcionario.nome} - {self.get_tipo_display()} - R$ {self.valor}"
+
+
+# Receita diária consolidada (data x origem x cliente)
+# Mantida pelos signals da Lavagem; o comando
+# `reconstruir_receita_diaria` reconcilia após cargas em massa.
+class ReceitaDiaria(models.Model):
+    ORIGEM_CHOICES = Lavagem.ORIGEM_CHOICES
+
+    data = models.DateField()
+    origem = models.CharField(max_length=10, choices=ORIGEM_CHOICES)
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        related_name="receitas_diarias",
+        null=True, blank=True
+    )
+    quantidade_caixas = models.PositiveIntegerField(default=0)
+    valor_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('data', 'origem', 'cliente')
+        constraints = [
+            # NULL não se repete no unique_together: o bucket sem cliente precisa do seu
+            models.UniqueConstraint(
+                fields=['data', 'origem'], condition=models.Q(cliente__isnull=True),
+                name='receitadiaria_sem_cliente_unica',
+            ),
+        ]
+        ordering = ['-data']
+
+    def __str__(self):
+        return f"{self.data} - {self.get_origem_display()} - R$ {self.valor_total}"
+
+    @classmethod
+    def calcular(cls, dt_inicio=None, dt_fim=None):
+        """
+        Agrega a Lavagem por (data, origem, cliente) em uma única consulta.
+        Retorna {(data, origem, cliente_id): (quantidade, valor)}.
+        """
+        qs = Lavagem.objects.all()
+        if dt_inicio:
+            qs = qs.filter(data__gte=dt_inicio)
+        if dt_fim:
+            qs = qs.filter(data__lte=dt_fim)
+        linhas = qs.values('data', 'origem', 'cliente_id').annotate(
+            qtd=Sum('quantidade_caixas'),
+            valor=Sum('valor_total'),
+        ).order_by()
+        return {
+            (r['data'], r['origem'], r['cliente_id']): (r['qtd'] or 0, r['valor'] or Decimal('0.00'))
+            for r in linhas
+        }
+
+    @classmethod
+    def recalcular(cls, origem, data, cliente_id):
+        """Recalcula um único bucket a partir da Lavagem."""
+        totais = Lavagem.objects.filter(origem=origem, data=data, cliente_id=cliente_id).aggregate(
+            n=models.Count('id'),
+            qtd=Sum('quantidade_caixas'),
+            valor=Sum('valor_total'),
+        )
+        if not totais['n']:
+            cls.objects.filter(data=data, origem=origem, cliente_id=cliente_id).delete()
+            return
+        cls.objects.update_or_create(
+            data=data, origem=origem, cliente_id=cliente_id,
+            defaults={
+                'quantidade_caixas': totais['qtd'] or 0,
+                'valor_total': totais['valor'] or Decimal('0.00'),
+            },
+        )
+
+    @classmethod
+    def recalcular_varios(cls, buckets):
+        """
+        recalcular() de vários buckets de uma vez: uma consulta de totais para todos
+        e um upsert. Usado depois de inclusões em lote, quando todo bucket tem linhas.
+        """
+        if not buckets:
+            return
+        linhas = Lavagem.objects.filter(
+            origem__in={o for o, _, _ in buckets},
+            data__in={d for _, d, _ in buckets},
+        ).values('origem', 'data', 'cliente_id').annotate(
+            qtd=Sum('quantidade_caixas'),
+            valor=Sum('valor_total'),
+        ).order_by()
+        totais = {
+            (r['origem'], r['data'], r['cliente_id']): (r['qtd'] or 0, r['valor'] or Decimal('0.00'))
+            for r in linhas
+        }
+        com_cliente = []
+        for origem, data, cliente_id in buckets:
+            if (origem, data, cliente_id) not in totais:
+                cls.recalcular(origem, data, cliente_id)
+            elif cliente_id is None:
+                # o upsert só conflita pelo unique_together, onde NULL nunca colide;
+                # o bucket sem cliente (receitadiaria_sem_cliente_unica) vai pelo update_or_create
+                cls.recalcular(origem, data, None)
+            else:
+                qtd, valor = totais[(origem, data, cliente_id)]
+                com_cliente.append(cls(
+                    data=data, origem=origem, cliente_id=cliente_id, quantidade_caixas=qtd, valor_total=valor
+                ))
+        cls.objects.bulk_create(
+            com_cliente,
+            update_conflicts=True,
+            unique_fields=['data', 'origem', 'cliente'],
+            update_fields=['quantidade_caixas', 'valor_total'],
+        )
+
+    @classmethod
+    def totais_por_origem(cls, dt_inicio, dt_fim, trechos=None):
+        """
+        Soma a receita do período por origem em uma única consulta.
+        Retorna {origem: {'quantidade': int, 'valor': Decimal}} com todas as origens.
+        `trechos` ([(inicio, fim), ...]) restringe a soma a partes do período
+        (ex.: fora dos meses fechados); vazio, não consulta nada.
+        """
+        totais = {
+            origem: {'quantidade': 0, 'valor': Decimal('0.00')}
+            for origem, _ in cls.ORIGEM_CHOICES
+        }
+        if trechos is None:
+            trechos = [(dt_inicio, dt_fim)]
+        if not trechos:
+            return totais
+        filtro = models.Q()
+        for de, ate in trechos:
+            filtro |= models.Q(data__range=(de, ate))
+        linhas = cls.objects.filter(filtro).values('origem').annotate(
+            qtd=Sum('quantidade_caixas'),
+            valor=Sum('valor_total'),
+        ).order_by()
+        for r in linhas:
+            totais[r['origem']] = {
+                'quantidade': r['qtd'] or 0,
+                'valor': r['valor'] or Decimal('0.00'),
+            }
+        return totais
+
+
+# Os signals de um proxy saem com o proxy como sender: os receivers de lançamento
+# de lavagem se registram na Lavagem e nos três proxies.
+MODELOS_LAVAGEM = (Lavagem, LavagemCarreta, LavadorSujoEntry, LavadorCargaEntry)
+
+def receiver_lavagem(signal):
+    def registrar(func):
+        for modelo in MODELOS_LAVAGEM:
+            receiver(signal, sender=modelo)(func)
+        return func
+    return registrar
+
+@receiver_lavagem(pre_save)
+def guardar_bucket_anterior(sender, instance, **kwargs):
+    # data/cliente antes da edição, para recalcular o bucket antigo se mudarem
+    instance._bucket_receita_anterior = None
+    if instance.pk:
+        instance._bucket_receita_anterior = (
+            sender.objects.filter(pk=instance.pk).values_list('data', 'cliente_id').first()
+        )
+    instance._data_anterior = instance._bucket_receita_anterior[0] if instance._bucket_receita_anterior else None
+
+@receiver_lavagem(post_save)
+def atualizar_receita_diaria(sender, instance, **kwargs):
+    origem = instance.origem
+    atual = (instance.data, instance.cliente_id)
+    ReceitaDiaria.recalcular(origem, *atual)
+
+    anterior = getattr(instance, '_bucket_receita_anterior', None)
+    if anterior and anterior != atual:
+        ReceitaDiaria.recalcular(origem, *anterior)
+
+@receiver_lavagem(post_delete)
+def remover_receita_diaria(sender, instance, **kwargs):
+    ReceitaDiaria.recalcular(instance.origem, instance.data, instance.cliente_id)
+
+
+# Cache dos indicadores do painel (ver services.kpis_do_mes)
+def chave_kpis_mes(ano, mes):
+    return f"mvb:kpis:{ano}-{mes:02d}"
+
+def invalidar_kpis(*datas):
+    """Apaga, após o commit, o snapshot dos meses afetados pelas datas informadas."""
+    chaves = {chave_kpis_mes(d.year, d.month) for d in datas if d}
+    if chaves:
+        transaction.on_commit(lambda: cache.delete_many(list(chaves)))
+
+@receiver(pre_save, sender=Financeiro)
+@receiver(pre_save, sender=Presenca)
+def guardar_data_anterior(sender, instance, **kwargs):
+    instance._data_anterior = None
+    if instance.pk:
+        instance._data_anterior = sender.objects.filter(pk=instance.pk).values_list('data', flat=True).first()
+
+@receiver_lavagem(post_save)
+@receiver(post_save, sender=Financeiro)
+@receiver_lavagem(post_delete)
+@receiver(post_delete, sender=Financeiro)
+def invalidar_kpis_lancamento(sender, instance, **kwargs):
+    invalidar_kpis(instance.data, getattr(instance, '_data_anterior', None))
+
+def chave_grafico_painel(ano, mes):
+    return f"mvb:grafico_painel:{ano}-{mes:02d}"
+
+@receiver_lavagem(post_save)
+@receiver(post_save, sender=Financeiro)
+@receiver_lavagem(post_delete)
+@receiver(post_delete, sender=Financeiro)
+def invalidar_grafico_painel(sender, instance, **kwargs):
+    # o gráfico do painel cobre os 12 meses até hoje: só a chave do mês corrente está em uso
+    hoje = date.today()
+    chave = chave_grafico_painel(hoje.year, hoje.month)
+    transaction.on_commit(lambda: cache.delete(chave))
+
+# Versão dos dados do Financeiro, usada nas chaves de cache que dependem de todos
+# os meses (ex.: acumulado da lista): trocar a versão invalida todas de uma vez.
+CHAVE_VERSAO_FINANCEIRO = "mvb:financeiro:versao"
+
+def versao_financeiro():
+    versao = cache.get(CHAVE_VERSAO_FINANCEIRO)
+    if versao is None:
+        cache.add(CHAVE_VERSAO_FINANCEIRO, uuid.uuid4().hex[:12], None)
+        versao = cache.get(CHAVE_VERSAO_FINANCEIRO)
+    return versao
+
+@receiver(post_save, sender=Financeiro)
+@receiver(post_delete, sender=Financeiro)
+def nova_versao_financeiro(sender, instance, **kwargs):
+    transaction.on_commit(lambda: cache.set(CHAVE_VERSAO_FINANCEIRO, uuid.uuid4().hex[:12], None))
+
+def invalidar_kpis_presencas(*datas):
+    # a elegibilidade semanal olha a semana inteira, que pode cruzar o mês
+    semanas = []
+    for d in datas:
+        if d:
+            segunda = d - timedelta(days=d.weekday())
+            semanas += [d, segunda, segunda + timedelta(days=6)]
+    invalidar_kpis(*semanas)
+
+@receiver(post_save, sender=Presenca)
+@receiver(post_delete, sender=Presenca)
+def invalidar_kpis_presenca(sender, instance, **kwargs):
+    invalidar_kpis_presencas(instance.data, getattr(instance, '_data_anterior', None))
+
+@receiver(post_save, sender=Funcionario)
+@receiver(post_delete, sender=Funcionario)
+def invalidar_kpis_funcionario(sender, instance, **kwargs):
+    # entrar/sair da lista de ativos muda as contagens de elegíveis do mês corrente
+    invalidar_kpis(date.today())
+
+
+# Fechamento de mês: foto da receita por origem, das despesas por categoria e do
+# lucro de um mês encerrado. Enquanto existir, os lançamentos do mês ficam
+# travados e os relatórios leem a foto em vez de reagregar o mês.
+class FechamentoMes(models.Model):
+    CATEGORIAS_DESPESA = [
+        'salario_total_funcionarios', 'frete', 'refeicao_cafe', 'refeicao_almoco', 'contabilidade', 'inss',
+    ]
+
+    ano = models.PositiveIntegerField()
+    mes = models.PositiveIntegerField()
+
+    quantidade_carreta = models.PositiveIntegerField(default=0)
+    quantidade_sujo = models.PositiveIntegerField(default=0)
+    quantidade_carga = models.PositiveIntegerField(default=0)
+    receita_carreta = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    receita_sujo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    receita_carga = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    salario_total_funcionarios = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    frete = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refeicao_cafe = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refeicao_almoco = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    contabilidade = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    inss = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    receita_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    despesas_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lucro = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    fechado_em = models.DateTimeField(auto_now_add=True)
+    fechado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='fechamentos'
+    )
+
+    class Meta:
+        ordering = ['-ano', '-mes']
+        constraints = [
+            models.UniqueConstraint(fields=['ano', 'mes'], name='fechamento_ano_mes_unico'),
+        ]
+
+    def __str__(self):
+        return f"Fechamento {self.mes:02d}/{self.ano} - lucro R$ {self.lucro}"
+
+    def receitas(self):
+        """Receita do mês no formato de ReceitaDiaria.totais_por_origem."""
+        return {
+            origem: {
+                'quantidade': getattr(self, f'quantidade_{origem}'),
+                'valor': getattr(self, f'receita_{origem}'),
+            }
+            for origem, _ in ReceitaDiaria.ORIGEM_CHOICES
+        }
+
+    @classmethod
+    def calcular(cls, ano, mes):
+        """Fechamento (ainda não salvo) com os totais atuais da Lavagem e do Financeiro."""
+        inicio = date(ano, mes, 1)
+        fim = date(ano, mes, monthrange(ano, mes)[1])
+        fechamento = cls(ano=ano, mes=mes)
+
+        por_origem = Lavagem.objects.filter(data__range=(inicio, fim)).values('origem').annotate(
+            qtd=Sum('quantidade_caixas'),
+            valor=Sum('valor_total'),
+        ).order_by()
+        for r in por_origem:
+            setattr(fechamento, f"quantidade_{r['origem']}", r['qtd'] or 0)
+            setattr(fechamento, f"receita_{r['origem']}", r['valor'] or Decimal('0.00'))
+
+        despesas = Financeiro.objects.filter(ano=ano, mes=mes).aggregate(
+            total=Sum('total'), **{c: Sum(c) for c in cls.CATEGORIAS_DESPESA}
+        )
+        for categoria in cls.CATEGORIAS_DESPESA:
+            setattr(fechamento, categoria, despesas[categoria] or Decimal('0.00'))
+
+        fechamento.receita_total = sum(r['valor'] for r in fechamento.receitas().values())
+        fechamento.despesas_total = despesas['total'] or Decimal('0.00')
+        fechamento.lucro = fechamento.receita_total - fechamento.despesas_total
+        return fechamento
+
+    @classmethod
+    def fechar(cls, ano, mes, usuario=None):
+        hoje = date.today()
+        if (ano, mes) >= (hoje.year, hoje.month):
+            raise ValidationError("Só é possível fechar meses já encerrados.")
+        with transaction.atomic():
+            cls._travar_lancamentos(ano, mes)
+            if cls.objects.filter(ano=ano, mes=mes).exists():
+                raise ValidationError(f"O mês {mes:02d}/{ano} já está fechado.")
+            fechamento = cls.calcular(ano, mes)
+            fechamento.fechado_por = usuario
+            fechamento.save()
+        return fechamento
+
+    @classmethod
+    def _travar_lancamentos(cls, ano, mes):
+        """
+        Impede que uma gravação de Lavagem/Financeiro seja confirmada entre o
+        calcular() e o save() do fechamento: as que estão em andamento terminam
+        antes do cálculo, e as seguintes esperam o commit do fechamento (e então
+        o bloquear_mes_fechado já encontra o mês fechado).
+        """
+        if connection.vendor == 'postgresql':
+            # SHARE ROW EXCLUSIVE conflita com INSERT/UPDATE/DELETE e com outro fechamento
+            tabelas = ", ".join(connection.ops.quote_name(m._meta.db_table) for m in (Lavagem, Financeiro))
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {tabelas} IN SHARE ROW EXCLUSIVE MODE")
+            return
+        # demais bancos: trava as linhas do mês (no SQLite a escrita já é serializada)
+        inicio = date(ano, mes, 1)
+        fim = date(ano, mes, monthrange(ano, mes)[1])
+        list(Lavagem.objects.select_for_update().filter(data__range=(inicio, fim)).values_list('pk', flat=True))
+        list(Financeiro.objects.select_for_update().filter(ano=ano, mes=mes).values_list('pk', flat=True))
+
+    def reabrir(self):
+        self.delete()
+
+
+# Meses fechados, consultados em todo save/delete de lançamento: ficam no cache
+# até algum mês ser fechado ou reaberto.
+CHAVE_MESES_FECHADOS = "mvb:meses_fechados"
+
+def meses_fechados():
+    fechados = cache.get(CHAVE_MESES_FECHADOS)
+    if fechados is None:
+        fechados = set(FechamentoMes.objects.values_list('ano', 'mes'))
+        cache.set(CHAVE_MESES_FECHADOS, fechados, None)
+    return fechados
+
+class MesFechado(ValidationError):
+    pass
+
+def verificar_mes_aberto(*datas):
+    fechados = meses_fechados()
+    for d in datas:
+        if d and (d.year, d.month) in fechados:
+            raise MesFechado(
+                f"O mês {d.month:02d}/{d.year} está fechado; reabra o fechamento para alterar seus lançamentos."
+            )
+
+@receiver_lavagem(pre_save)
+@receiver(pre_save, sender=Financeiro)
+@receiver_lavagem(pre_delete)
+@receiver(pre_delete, sender=Financeiro)
+def bloquear_mes_fechado(sender, instance, **kwargs):
+    # vale também para o que não passa por formulário (shell, admin, exclusão em cascata)
+    verificar_mes_aberto(instance.data, instance._data_gravada())
+
+@receiver(post_save, sender=FechamentoMes)
+@receiver(post_delete, sender=FechamentoMes)
+def invalidar_meses_fechados(sender, instance, **kwargs):
+    hoje = date.today()
+    chaves = [CHAVE_MESES_FECHADOS, chave_grafico_painel(hoje.year, hoje.month)]
+    transaction.on_commit(lambda: cache.delete_many(chaves))
+
+
+# Exportações pesadas geradas fora do ciclo da requisição.
+# O comando `processar_exportacoes` consome a fila; o arquivo gerado fica no próprio
+# registro (conteudo), ao alcance do processo web em qualquer máquina.
+class ExportJob(models.Model):
+    TIPO_CHOICES = [
+        ('relatorio_pdf', 'Relatório por período (PDF)'),
+        ('relatorio_excel', 'Relatório por período (planilha)'),
+        ('filtrado_pdf', 'Relatório filtrado (PDF)'),
+        ('filtrado_excel', 'Relatório filtrado (planilha)'),
+        ('financeiro_pdf', 'Financeiro (PDF)'),
+        ('financeiro_excel', 'Financeiro (planilha)'),
+        ('lavagens_pdf', 'Lavagens (PDF)'),
+        ('lavagens_excel', 'Lavagens (planilha)'),
+    ]
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('processando', 'Processando'),
+        ('concluido', 'Concluído'),
+        ('erro', 'Erro'),
+    ]
+
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    parametros = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='pendente')
+    progresso = models.PositiveSmallIntegerField(default=0)
+    # vezes que um worker reservou o job (ver processar_exportacoes --timeout)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    # O arquivo gerado fica no próprio banco: o worker e o web rodam em máquinas
+    # diferentes (Procfile) e não compartilham disco.
+    nome_arquivo = models.CharField(max_length=100, blank=True)
+    conteudo = models.BinaryField(null=True, blank=True, editable=False)
+    erro = models.TextField(blank=True)
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='exportacoes'
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['criado_em']
+        indexes = [models.Index(fields=['status', 'criado_em'])]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} - {self.get_status_display()}"
+
@@ -0,0 +1,150 @@
+"""
+Paginação por cursor (keyset) para as listagens.
+
+Em vez de COUNT(*) + OFFSET, cada página filtra a partir da última linha da
+anterior ("data < X ou (data = X e id < Y)"), então o custo não cresce com a
+profundidade da página. O cursor é opaco: base64 da posição e da direção.
+"""
+import base64
+import binascii
+import json
+from datetime import date
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+TAMANHO_PAGINA = 20
+
+
+class Pagina:
+    def __init__(self, itens, url_proxima=None, url_anterior=None, url_primeira=None):
+        self.itens = itens
+        self.url_proxima = url_proxima
+        self.url_anterior = url_anterior
+        self.url_primeira = url_primeira
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def __bool__(self):
+        return bool(self.itens)
+
+    @property
+    def has_next(self):
+        return self.url_proxima is not None
+
+    @property
+    def has_previous(self):
+        return self.url_anterior is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def codificar_cursor(valores, direcao):
+    bruto = json.dumps({"v": [v.isoformat() if isinstance(v, date) else v for v in valores], "d": direcao})
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """
+    Retorna (valores, direcao) ou None se o cursor for inválido. Os valores ainda
+    não foram conferidos contra os campos da ordenação (ver _converter).
+    """
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        dados = json.loads(bruto)
+        valores, direcao = dados["v"], dados["d"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+    if direcao not in ("p", "a") or not isinstance(valores, list):
+        return None
+    return valores, direcao
+
+
+def _converter(model, campos, valores):
+    """
+    Valores do cursor convertidos pelo to_python() de cada campo da ordenação, ou
+    None se algum não servir: o cursor vem da URL e pode ter sido adulterado.
+    """
+    convertidos = []
+    for campo, valor in zip(campos, valores):
+        if valor is None or isinstance(valor, (list, dict)):
+            return None
+        try:
+            convertidos.append(model._meta.get_field(campo.lstrip("-")).to_python(valor))
+        except (FieldDoesNotExist, ValidationError, ValueError, TypeError):
+            return None
+    return convertidos
+
+
+def _depois_de(campos, valores):
+    """Q das linhas que vêm depois de `valores` na ordenação `campos`."""
+    condicao = Q()
+    iguais = Q()
+    for campo, valor in zip(campos, valores):
+        nome = campo.lstrip("-")
+        lookup = "lt" if campo.startswith("-") else "gt"
+        condicao |= iguais & Q(**{f"{nome}__{lookup}": valor})
+        iguais &= Q(**{nome: valor})
+    return condicao
+
+
+def _inverter(campos):
+    return [campo[1:] if campo.startswith("-") else f"-{campo}" for campo in campos]
+
+
+def _posicao(obj, campos):
+    return [getattr(obj, campo.lstrip("-")) for campo in campos]
+
+
+def paginar(request, queryset, campos=("-data", "-id"), tamanho=TAMANHO_PAGINA, parametro="cursor"):
+    """
+    Página do `queryset` indicada por request.GET[parametro].
+
+    `campos` é a ordenação completa e deve terminar em uma coluna única (o id),
+    para que a posição seja inequívoca. Os demais parâmetros da URL (filtros)
+    são mantidos nos links de próxima/anterior.
+    """
+    campos = list(campos)
+    posicao = decodificar_cursor(request.GET.get(parametro, "")) if request.GET.get(parametro) else None
+
+    valores, direcao = None, "p"
+    if posicao and len(posicao[0]) == len(campos):
+        valores = _converter(queryset.model, campos, posicao[0])
+        if valores is not None:
+            direcao = posicao[1]
+
+    if direcao == "a":
+        # volta uma página: percorre a ordenação ao contrário e desvira o resultado
+        qs = queryset.filter(_depois_de(_inverter(campos), valores)).order_by(*_inverter(campos))
+        itens = list(qs[:tamanho + 1])
+        ha_mais_antes = len(itens) > tamanho
+        itens = itens[:tamanho][::-1]
+        ha_mais_depois = True
+    else:
+        qs = queryset.order_by(*campos)
+        if valores:
+            qs = qs.filter(_depois_de(campos, valores))
+        itens = list(qs[:tamanho + 1])
+        ha_mais_depois = len(itens) > tamanho
+        itens = itens[:tamanho]
+        ha_mais_antes = valores is not None
+
+    def url(cursor):
+        params = request.GET.copy()
+        params.pop(parametro, None)
+        if cursor:
+            params[parametro] = cursor
+        return "?" + params.urlencode()
+
+    return Pagina(
+        itens,
+        url_proxima=url(codificar_cursor(_posicao(itens[-1], campos), "p")) if itens and ha_mais_depois else None,
+        url_anterior=url(codificar_cursor(_posicao(itens[0], campos), "a")) if itens and ha_mais_antes else None,
+        url_primeira=url(None) if ha_mais_antes else None,
+    )
@@ -0,0 +1,217 @@
+"""
+Gerador de dados sintéticos para testes de volume.
+
+Tudo é gravado com bulk_create em lotes, sem passar pelos signals: quem chama
+deve reconstruir a ReceitaDiaria depois (`reconstruir_receita_diaria`).
+O resultado é determinístico para a mesma semente e os mesmos parâmetros.
+"""
+import random
+from itertools import accumulate
+from datetime import date, timedelta
+from decimal import Decimal
+
+from .models import (
+    Cliente, FechamentoMes, Financeiro, Funcao, Funcionario, LavadorCargaEntry, LavadorSujoEntry,
+    LavagemCarreta, MesFechado, Presenca, TipoCaixa, TipoProduto,
+)
+from .services import meses_do_intervalo
+
+PRODUTOS = ["Tomate", "Batata", "Cebola", "Cenoura", "Pimentão", "Repolho", "Chuchu", "Abobrinha"]
+
+# (nome, tamanho, preço médio por caixa)
+CAIXAS = [("Plástica", "G", 2.80), ("Plástica", "M", 2.20), ("Madeira", "G", 3.10), ("Papelão", "P", 1.40)]
+
+FUNCOES = [("Lavador", 1800), ("Motorista", 2600), ("Conferente", 2200), ("Administrativo", 3000)]
+
+# Peso de cada dia da semana (segunda = 0) no volume de lavagens
+PESO_DIA_SEMANA = [1.15, 1.1, 1.0, 1.0, 1.05, 0.6, 0.1]
+
+
+def _lotes(gerador, tamanho):
+    lote = []
+    for item in gerador:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _dias(inicio, fim):
+    dia = inicio
+    while dia <= fim:
+        yield dia
+        dia += timedelta(days=1)
+
+
+def _cpf(rng):
+    # CPF com dígitos verificadores válidos
+    numeros = [rng.randint(0, 9) for _ in range(9)]
+    for peso_inicial in (10, 11):
+        soma = sum(n * p for n, p in zip(numeros, range(peso_inicial, 1, -1)))
+        digito = (soma * 10) % 11
+        numeros.append(0 if digito == 10 else digito)
+    return "".join(map(str, numeros))
+
+
+def semear(
+    clientes=200, funcionarios=60, anos=3, lavagens_por_dia=120,
+    fim=None, semente=42, lote=5000, progresso=None,
+):
+    """
+    Gera cadastros e `anos` anos de movimento terminando em `fim` (hoje, por padrão).
+
+    `lavagens_por_dia` é a média de lançamentos diários somando as três tabelas de
+    lavagem; o volume varia com o dia da semana e a safra. Retorna {modelo: linhas}.
+    Levanta MesFechado se o período tocar um mês fechado: o bulk_create não
+    passa pela checagem dos signals.
+    """
+    rng = random.Random(semente)
+    progresso = progresso or (lambda nome, qtd: None)
+    fim = fim or date.today()
+    inicio = fim - timedelta(days=round(365.25 * anos) - 1)
+    # direto no banco, não pelo cache de meses_fechados(): quem chama pode ter
+    # acabado de apagar os fechamentos nesta mesma transação
+    fechados = FechamentoMes.objects.filter(meses_do_intervalo(inicio, fim)).order_by('ano', 'mes')
+    if fechados.exists():
+        meses = ", ".join(f"{f.mes:02d}/{f.ano}" for f in fechados)
+        raise MesFechado(f"Meses fechados no período gerado: {meses}. Reabra-os ou use --limpar.")
+    contagem = {}
+
+    def gravar(modelo, objetos):
+        total = 0
+        for pedaco in _lotes(objetos, lote):
+            modelo.objects.bulk_create(pedaco, batch_size=lote)
+            total += len(pedaco)
+            progresso(modelo.__name__, total)
+        contagem[modelo.__name__] = contagem.get(modelo.__name__, 0) + total
+
+    # Cadastros
+    gravar(TipoProduto, (TipoProduto(nome=nome) for nome in PRODUTOS))
+    gravar(TipoCaixa, (TipoCaixa(nome=nome, tamanho=tamanho) for nome, tamanho, _ in CAIXAS))
+    produtos = list(TipoProduto.objects.filter(nome__in=PRODUTOS).order_by('-pk')[:len(PRODUTOS)])
+    caixas = list(TipoCaixa.objects.order_by('-pk')[:len(CAIXAS)])[::-1]
+    ids_produtos = [p.pk for p in produtos]
+    precos = {c.pk: preco for c, (_, _, preco) in zip(caixas, CAIXAS)}
+
+    gravar(Cliente, (
+        Cliente(nome=f"Cliente {i:05d}", telefone=f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}")
+        for i in range(1, clientes + 1)
+    ))
+    lista_clientes = list(Cliente.objects.order_by('-pk')[:clientes])
+    # poucos clientes concentram a maior parte do volume (cauda de Pareto)
+    pesos_clientes = list(accumulate(rng.paretovariate(1.2) for _ in lista_clientes))
+    # ids em vez de instâncias: atribuir cliente_id evita o descriptor da FK a cada linha
+    ids_clientes = [c.pk for c in lista_clientes]
+
+    def cliente_sorteado():
+        return rng.choices(ids_clientes, cum_weights=pesos_clientes)[0]
+
+    gravar(Funcao, (Funcao(nome=nome, salario_mensal=Decimal(salario)) for nome, salario in FUNCOES))
+    funcoes = list(Funcao.objects.order_by('-pk')[:len(FUNCOES)])
+    cpfs = set(Funcionario.objects.values_list('cpf', flat=True))
+
+    def novos_funcionarios():
+        for i in range(funcionarios):
+            cpf = _cpf(rng)
+            while cpf in cpfs:
+                cpf = _cpf(rng)
+            cpfs.add(cpf)
+            yield Funcionario(
+                nome=f"Funcionário {i + 1:04d}",
+                cpf=cpf,
+                funcao=rng.choices(funcoes, weights=[6, 2, 2, 1])[0],
+                ativo=rng.random() > 0.08,
+            )
+    gravar(Funcionario, novos_funcionarios())
+    lista_funcionarios = list(Funcionario.objects.select_related('funcao').order_by('-pk')[:funcionarios])
+
+    # Lavagens
+    def volume_do_dia(dia):
+        safra = 1 + 0.35 * (1 if dia.month in (5, 6, 7, 8, 9) else -0.4)
+        media = lavagens_por_dia * PESO_DIA_SEMANA[dia.weekday()] * safra
+        return max(0, int(rng.gauss(media, media * 0.15)))
+
+    def caixas_por_lancamento():
+        return max(1, int(rng.lognormvariate(3.4, 0.6)))
+
+    volumes = {dia: volume_do_dia(dia) for dia in _dias(inicio, fim)}
+
+    def carretas():
+        for dia, volume in volumes.items():
+            for _ in range(volume * 5 // 10):
+                caixa = rng.choice(caixas)
+                yield LavagemCarreta(
+                    data=dia,
+                    carreta_ident=f"Motorista {rng.randint(1, 400)}",
+                    cliente_id=cliente_sorteado(),
+                    tipo_lavagem=rng.choices(["sujo", "carga"], weights=[7, 3])[0],
+                    tipo_caixa_id=caixa.pk,
+                    tipo_produto_id=rng.choice(ids_produtos),
+                    quantidade_caixas=caixas_por_lancamento(),
+                    valor_por_caixa=Decimal(f"{rng.gauss(precos[caixa.pk], 0.2):.2f}"),
+                )
+
+    def sujos():
+        for dia, volume in volumes.items():
+            for _ in range(volume * 3 // 10):
+                _, tamanho, preco = rng.choice(CAIXAS)
+                yield LavadorSujoEntry(
+                    data=dia,
+                    cliente_id=cliente_sorteado(),
+                    quantidade_caixas=caixas_por_lancamento(),
+                    tamanho_caixa=tamanho,
+                    tipo_produto_id=rng.choice(ids_produtos),
+                    valor_por_caixa=Decimal(f"{rng.gauss(preco, 0.2):.2f}"),
+                )
+
+    def cargas():
+        for dia, volume in volumes.items():
+            for _ in range(volume - volume * 8 // 10):
+                categorias = [int(rng.lognormvariate(2.5, 0.7)) for _ in range(4)]
+                total = sum(categorias)
+                yield LavadorCargaEntry(
+                    data=dia,
+                    cliente_id=cliente_sorteado(),
+                    quantidade_caixas=total,
+                    q_3A=categorias[0], q_2A=categorias[1], q_1A=categorias[2], q_G=categorias[3],
+                    valor_rendido=Decimal(f"{total * rng.uniform(1.8, 3.2):.2f}"),
+                )
+
+    gravar(LavagemCarreta, carretas())
+    gravar(LavadorSujoEntry, sujos())
+    gravar(LavadorCargaEntry, cargas())
+
+    # Presenças: domingo é folga; nos demais dias ~92% presente, ~4% falta, ~4% folga
+    def presencas():
+        for dia in volumes:
+            for f in lista_funcionarios:
+                if dia.weekday() == 6:
+                    status = 'O'
+                else:
+                    status = rng.choices(['P', 'F', 'O'], weights=[92, 4, 4])[0]
+                yield Presenca(funcionario_id=f.pk, data=dia, status=status)
+    gravar(Presenca, presencas())
+
+    # Financeiro: fechamento mensal com a folha e despesas que acompanham o volume
+    folha = sum(f.funcao.salario_mensal for f in lista_funcionarios if f.ativo)
+
+    def financeiros():
+        mes = inicio.replace(day=1)
+        while mes <= fim:
+            volume_mes = sum(v for d, v in volumes.items() if (d.year, d.month) == (mes.year, mes.month))
+            valores = {
+                'salario_total_funcionarios': folha,
+                'frete': Decimal(f"{volume_mes * rng.uniform(3, 5):.2f}"),
+                'refeicao_cafe': Decimal(f"{len(lista_funcionarios) * rng.uniform(60, 90):.2f}"),
+                'refeicao_almoco': Decimal(f"{len(lista_funcionarios) * rng.uniform(350, 450):.2f}"),
+                'contabilidade': Decimal("1200.00"),
+                'inss': (folha * Decimal("0.20")).quantize(Decimal("0.01")),
+            }
+            # bulk_create não chama save(): ano e mes vão preenchidos aqui (o total é gerado pelo banco)
+            yield Financeiro(data=min(mes.replace(day=28), fim), ano=mes.year, mes=mes.month, **valores)
+            mes = (mes + timedelta(days=32)).replace(day=1)
+    gravar(Financeiro, financeiros())
+
+    return contagem
@@ -0,0 +1,420 @@
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.core.cache import cache
+from django.db.models import (
+    Case, CharField, Count, DecimalField, ExpressionWrapper, F, FilteredRelation, FloatField, Q, Sum, Value, When, Window,
+)
+from django.db.models.functions import Cast, Coalesce, Concat, NullIf, TruncMonth
+
+from .graficos_svg import grafico_linha
+from .models import (
+    FechamentoMes, Financeiro, Funcionario, Lavagem, Presenca, ReceitaDiaria, chave_grafico_painel,
+    chave_kpis_mes, meses_fechados, versao_financeiro,
+)
+
+# Rede de segurança: alterações que não disparam signals (QuerySet.update)
+# deixam de aparecer no painel no máximo por este tempo.
+KPI_CACHE_TIMEOUT = 60 * 60 * 6
+
+
+def semana_e_mes(hoje):
+    """Limites (segunda a domingo) da semana e do mês de `hoje`."""
+    inicio_sem = hoje - timedelta(days=hoje.weekday())
+    fim_sem = inicio_sem + timedelta(days=6)
+    inicio_mes = hoje.replace(day=1)
+    fim_mes = inicio_mes.replace(day=monthrange(hoje.year, hoje.month)[1])
+    return inicio_sem, fim_sem, inicio_mes, fim_mes
+
+
+PERIODOS = ['diario', 'semanal', 'mensal', 'trimestral', 'anual']
+
+
+def intervalo_periodo(periodo, params=None, hoje=None):
+    """
+    (inicio, fim) do período que contém `hoje`: diario, semanal (segunda a
+    domingo), mensal, trimestral ou anual. Qualquer outro nome é um intervalo
+    personalizado lido de params['start'] e params['end'] (AAAA-MM-DD); sem
+    datas válidas, vale o dia de hoje.
+    """
+    hoje = hoje or date.today()
+    inicio_sem, fim_sem, inicio_mes, fim_mes = semana_e_mes(hoje)
+    if periodo == 'diario':
+        return hoje, hoje
+    if periodo == 'semanal':
+        return inicio_sem, fim_sem
+    if periodo == 'mensal':
+        return inicio_mes, fim_mes
+    if periodo == 'trimestral':
+        primeiro = 3 * ((hoje.month - 1) // 3) + 1
+        ultimo = primeiro + 2
+        return date(hoje.year, primeiro, 1), date(hoje.year, ultimo, monthrange(hoje.year, ultimo)[1])
+    if periodo == 'anual':
+        return date(hoje.year, 1, 1), date(hoje.year, 12, 31)
+
+    params = params or {}
+    try:
+        inicio = date.fromisoformat(params.get('start') or '')
+        fim = date.fromisoformat(params.get('end') or '')
+    except ValueError:
+        return hoje, hoje
+    return min(inicio, fim), max(inicio, fim)
+
+
+def meses_do_intervalo(inicio, fim):
+    """Q dos lançamentos com (ano, mes) entre o mês de `inicio` e o de `fim`, inclusive."""
+    return (
+        (Q(ano__gt=inicio.year) | Q(ano=inicio.year, mes__gte=inicio.month))
+        & (Q(ano__lt=fim.year) | Q(ano=fim.year, mes__lte=fim.month))
+    )
+
+
+def fechamentos_do_intervalo(inicio, fim):
+    """{(ano, mes): FechamentoMes} dos meses fechados que o intervalo toca."""
+    if not meses_fechados():
+        return {}
+    return {(f.ano, f.mes): f for f in FechamentoMes.objects.filter(meses_do_intervalo(inicio, fim))}
+
+
+def trechos_sem(inicio, fim, meses):
+    """
+    Partes contínuas (de, ate) de [inicio, fim] fora dos meses (ano, mes) em `meses`.
+    Percorre só os meses de `meses`: sem nenhum, é o próprio intervalo.
+    """
+    trechos = []
+    de = inicio
+    for ano, mes in sorted(m for m in meses if (inicio.year, inicio.month) <= m <= (fim.year, fim.month)):
+        primeiro = date(ano, mes, 1)
+        if de < primeiro:
+            trechos.append((de, primeiro - timedelta(days=1)))
+        de = max(de, date(ano, mes, monthrange(ano, mes)[1]) + timedelta(days=1))
+    if de <= fim:
+        trechos.append((de, fim))
+    return trechos
+
+
+def _nos_trechos(trechos):
+    return reduce(or_, (Q(data__range=trecho) for trecho in trechos))
+
+
+def fracao_do_mes(inicio, fim, ano, mes):
+    """Parte do mês (ano, mes) coberta por [inicio, fim], em dias: 1 no mês inteiro."""
+    dias = monthrange(ano, mes)[1]
+    de = max(inicio, date(ano, mes, 1))
+    ate = min(fim, date(ano, mes, dias))
+    return Decimal(max((ate - de).days + 1, 0)) / dias
+
+
+def totais_periodo(inicio, fim):
+    """
+    Receita por origem (ReceitaDiaria) e despesas (Financeiro): uma consulta
+    agregada por fonte, qualquer que seja o tamanho do intervalo. As despesas
+    são mensais, então cada mês entra proporcional aos dias que o intervalo
+    cobre (15 dias de um mês de 30 levam metade das despesas dele).
+    Meses fechados saem do FechamentoMes (a receita, quando o mês está inteiro
+    no intervalo; as despesas, sempre) e ficam fora das somas.
+    """
+    fechados = fechamentos_do_intervalo(inicio, fim)
+    inteiros = {
+        chave: f for chave, f in fechados.items()
+        if inicio <= date(f.ano, f.mes, 1) and date(f.ano, f.mes, monthrange(f.ano, f.mes)[1]) <= fim
+    }
+
+    receitas = ReceitaDiaria.totais_por_origem(inicio, fim, trechos=trechos_sem(inicio, fim, inteiros))
+    for f in inteiros.values():
+        for origem, r in f.receitas().items():
+            receitas[origem]['quantidade'] += r['quantidade']
+            receitas[origem]['valor'] += r['valor']
+
+    por_mes = {chave: f.despesas_total for chave, f in fechados.items()}
+    abertos = trechos_sem(inicio, fim, fechados)
+    if abertos:
+        filtro = reduce(or_, (meses_do_intervalo(de, ate) for de, ate in abertos))
+        for linha in Financeiro.objects.filter(filtro).values('ano', 'mes').annotate(total=Sum('total')).order_by():
+            por_mes[(linha['ano'], linha['mes'])] = linha['total'] or Decimal('0.00')
+    despesas = sum(
+        (total * fracao_do_mes(inicio, fim, ano, mes) for (ano, mes), total in por_mes.items()), Decimal('0.00')
+    ).quantize(Decimal('0.01'))
+
+    receita_total = sum(r['valor'] for r in receitas.values())
+    return {
+        'receitas': receitas,
+        'receita_total': receita_total,
+        'despesas_total': despesas,
+        'lucro': receita_total - despesas,
+    }
+
+
+def elegibilidade_bonus(hoje):
+    """
+    Contagens de presença (P/F/O) da semana e faltas do mês de cada funcionário
+    ativo, calculadas em uma única consulta agrupada.
+    Elegível = nenhuma falta no período (semana para o bônus, mês para a cesta).
+    """
+    inicio_sem, fim_sem, inicio_mes, fim_mes = semana_e_mes(hoje)
+
+    # o JOIN só traz as presenças da janela semana+mês, não o histórico inteiro
+    janela = FilteredRelation('presenca', condition=Q(
+        presenca__data__range=(min(inicio_sem, inicio_mes), max(fim_sem, fim_mes))
+    ))
+    na_semana = Q(p__data__range=(inicio_sem, fim_sem))
+    no_mes = Q(p__data__range=(inicio_mes, fim_mes))
+
+    funcionarios = Funcionario.objects.filter(ativo=True).annotate(p=janela).annotate(
+        pres_sem=Count('p', filter=na_semana & Q(p__status='P')),
+        faltas_sem=Count('p', filter=na_semana & Q(p__status='F')),
+        folgas_sem=Count('p', filter=na_semana & Q(p__status='O')),
+        faltas_mes=Count('p', filter=no_mes & Q(p__status='F')),
+    ).order_by('nome')
+
+    return [
+        {
+            "funcionario": f,
+            "pres_sem": f.pres_sem,
+            "faltas_sem": f.faltas_sem,
+            "folgas_sem": f.folgas_sem,
+            "elegivel_sem": f.faltas_sem == 0,
+            "elegivel_mes": f.faltas_mes == 0,
+        }
+        for f in funcionarios
+    ]
+
+
+def calcular_kpis_mes(hoje):
+    inicio_sem, _, inicio_mes, fim_mes = semana_e_mes(hoje)
+    dados = elegibilidade_bonus(hoje)
+
+    receitas = ReceitaDiaria.totais_por_origem(inicio_mes, fim_mes)
+    financeiro = Financeiro.objects.filter(ano=hoje.year, mes=hoje.month).first()
+
+    return {
+        'inicio_sem': inicio_sem,
+        'receita_total': float(sum(r['valor'] for r in receitas.values())),
+        'despesas_total': float(financeiro.total) if financeiro else 0.0,
+        'qtd_elegiveis_semana': sum(1 for d in dados if d['elegivel_sem']),
+        'qtd_elegiveis_mes': sum(1 for d in dados if d['elegivel_mes']),
+    }
+
+
+def kpis_do_mes(hoje):
+    """
+    Snapshot dos indicadores do painel para o mês de `hoje`, guardado no cache.
+    Os signals de models.py apagam a chave quando algum dado do mês muda.
+    """
+    chave = chave_kpis_mes(hoje.year, hoje.month)
+    kpis = cache.get(chave)
+    # a contagem semanal vale só para a semana em que foi calculada
+    if kpis is None or kpis['inicio_sem'] != semana_e_mes(hoje)[0]:
+        kpis = calcular_kpis_mes(hoje)
+        cache.set(chave, kpis, KPI_CACHE_TIMEOUT)
+    return kpis
+
+
+def inicio_da_janela(hoje, meses):
+    """Primeiro dia do mês que abre uma janela de `meses` meses terminada no mês de `hoje`."""
+    ano, mes = divmod(hoje.year * 12 + hoje.month - meses, 12)
+    return date(ano, mes + 1, 1)
+
+
+def tendencia_mensal(meses=12, hoje=None):
+    """
+    Receita por origem e despesas de cada um dos últimos `meses` meses (até o de
+    `hoje`), agrupadas no banco com TruncMonth: uma consulta na ReceitaDiaria,
+    que já consolida as três tabelas de lavagem, e uma no Financeiro. Meses sem
+    movimento entram zerados. Retorna dicts em ordem cronológica com mes (date),
+    carreta, sujo, carga, receita, despesas e lucro.
+    """
+    hoje = hoje or date.today()
+    inicio = inicio_da_janela(hoje, meses)
+    fim = semana_e_mes(hoje)[3]
+
+    serie = {}
+    for i in range(meses):
+        ano, mes = divmod(inicio.year * 12 + inicio.month - 1 + i, 12)
+        primeiro = date(ano, mes + 1, 1)
+        serie[primeiro] = {'mes': primeiro, 'despesas': Decimal('0.00')}
+        serie[primeiro].update({origem: Decimal('0.00') for origem, _ in ReceitaDiaria.ORIGEM_CHOICES})
+
+    # meses fechados vêm prontos do FechamentoMes; as consultas cobrem só o resto
+    fechados = fechamentos_do_intervalo(inicio, fim)
+    for f in fechados.values():
+        item = serie[date(f.ano, f.mes, 1)]
+        item.update({origem: r['valor'] for origem, r in f.receitas().items()})
+        item['despesas'] = f.despesas_total
+
+    abertos = trechos_sem(inicio, fim, fechados)
+    if abertos:
+        receitas = (ReceitaDiaria.objects.filter(_nos_trechos(abertos))
+                    .annotate(m=TruncMonth('data')).values('m', 'origem')
+                    .annotate(valor=Sum('valor_total')).order_by())
+        for r in receitas:
+            serie[r['m']][r['origem']] = r['valor'] or Decimal('0.00')
+
+        despesas = (Financeiro.objects.filter(_nos_trechos(abertos))
+                    .annotate(m=TruncMonth('data')).values('m')
+                    .annotate(valor=Sum('total')).order_by())
+        for r in despesas:
+            serie[r['m']]['despesas'] = r['valor'] or Decimal('0.00')
+
+    for item in serie.values():
+        item['receita'] = sum(item[origem] for origem, _ in ReceitaDiaria.ORIGEM_CHOICES)
+        item['lucro'] = item['receita'] - item['despesas']
+    return list(serie.values())
+
+
+def grafico_painel(hoje):
+    """
+    SVG de receita x despesas dos últimos 12 meses (até o mês de `hoje`) para o
+    painel. Fica no cache como os KPIs; os signals de lançamentos apagam a chave.
+    """
+    chave = chave_grafico_painel(hoje.year, hoje.month)
+    svg = cache.get(chave)
+    if svg is None:
+        serie = tendencia_mensal(12, hoje)
+        svg = grafico_linha(
+            [f"{item['mes']:%m/%Y}" for item in serie],
+            [("Receita", [item['receita'] for item in serie]), ("Despesas", [item['despesas'] for item in serie])],
+            altura=200, titulo="Receita e despesas por mês",
+        )
+        cache.set(chave, svg, KPI_CACHE_TIMEOUT)
+    return svg
+
+
+def acumulado_financeiro(ano=None, mes=None):
+    """
+    Soma de cada mês do Financeiro e o acumulado até ele, em uma consulta: as
+    somas saem de Window(Sum) (por mês e corrente, ordenada por ano/mes) e o
+    DISTINCT deixa uma linha por mês. O total geral é o último acumulado.
+    Guardado no cache por filtro, sob a versão atual do Financeiro.
+    """
+    chave = f"mvb:financeiro_acumulado:{versao_financeiro()}:{ano or '*'}-{mes or '*'}"
+    resultado = cache.get(chave)
+    if resultado is None:
+        qs = Financeiro.objects.all()
+        if ano:
+            qs = qs.filter(ano=ano)
+        if mes:
+            qs = qs.filter(mes=mes)
+        ordem = [F('ano').asc(), F('mes').asc()]
+        linhas = qs.annotate(
+            soma=Window(Sum('total'), partition_by=[F('ano'), F('mes')]),
+            acumulado=Window(Sum('total'), order_by=ordem),
+        ).values('ano', 'mes', 'soma', 'acumulado').order_by(*ordem).distinct()
+
+        centavo = Decimal('0.01')
+        meses = [
+            {
+                'ano': r['ano'],
+                'mes': r['mes'],
+                'soma': (r['soma'] or Decimal('0')).quantize(centavo),
+                'acumulado': (r['acumulado'] or Decimal('0')).quantize(centavo),
+            }
+            for r in linhas
+        ]
+        resultado = {'meses': meses, 'total': meses[-1]['acumulado'] if meses else Decimal('0.00')}
+        cache.set(chave, resultado, KPI_CACHE_TIMEOUT)
+    return resultado
+
+
+def filtrar_lavagens(tipo=None, data=None, cliente=None, data_inicio=None, data_fim=None, modelo=Lavagem):
+    lavagens = modelo.objects.all()
+
+    # FILTRO POR TIPO
+    if tipo:
+        lavagens = lavagens.filter(tipo_lavagem=tipo)
+
+    # FILTRO POR CLIENTE
+    if cliente:
+        lavagens = lavagens.filter(cliente__nome__icontains=cliente)
+
+    # FILTRO POR DATA EXATA
+    if data:
+        try:
+            d = datetime.strptime(data, "%Y-%m-%d").date()
+            lavagens = lavagens.filter(data=d)
+        except:
+            pass
+
+    # FILTRO POR PERÍODO
+    if data_inicio and data_fim:
+        try:
+            di = datetime.strptime(data_inicio, "%Y-%m-%d").date()
+            df = datetime.strptime(data_fim, "%Y-%m-%d").date()
+            lavagens = lavagens.filter(data__range=[di, df])
+        except:
+            pass
+
+    return lavagens
+
+# =========================
+# Lavagens das três origens em um único formato de linha
+# =========================
+
+VALOR = DecimalField(max_digits=14, decimal_places=2)
+
+COLUNAS_LAVAGEM = [
+    "id", "data", "origem", "cliente_nome", "tipo", "produto", "caixa",
+    "quantidade", "valor_unitario", "subtotal",
+]
+
+# Expressões das colunas de COLUNAS_LAVAGEM (exceto id/data/origem); as
+# diferenças entre as origens ficam em CASE, na mesma consulta.
+PROJECAO_LAVAGEM = {
+    "cliente_nome": Coalesce(F("cliente__nome"), Value(""), output_field=CharField()),
+    "tipo": F("tipo_lavagem"),
+    "produto": Coalesce(F("tipo_produto__nome"), Value(""), output_field=CharField()),
+    "caixa": Case(
+        When(origem="carreta", then=Concat(F("tipo_caixa__nome"), Value(" - "), F("tipo_caixa__tamanho"))),
+        default=F("tamanho_caixa"),
+        output_field=CharField(),
+    ),
+    "quantidade": F("quantidade_caixas"),
+    # a carga registra o valor total que a carreta rendeu, não o preço da caixa;
+    # o divisor vira float para o SQLite não fazer divisão inteira
+    "valor_unitario": Case(
+        When(origem="carga", then=ExpressionWrapper(
+            F("valor_rendido") / NullIf(Cast("quantidade_caixas", FloatField()), 0), output_field=VALOR
+        )),
+        default=F("valor_por_caixa"),
+        output_field=VALOR,
+    ),
+    "subtotal": F("valor_total"),
+}
+
+
+def lavagens_unificadas(**filtros):
+    """
+    Lavagens das três origens numa única consulta à Lavagem, já com cliente,
+    produto, caixa, valor unitário e subtotal calculados no banco.
+    Aceita os mesmos filtros de filtrar_lavagens; cada linha é um dict com as
+    chaves de COLUNAS_LAVAGEM, em ordem de data.
+    """
+    return filtrar_lavagens(**filtros).values("id", "data", "origem", **PROJECAO_LAVAGEM).order_by(
+        "data", "origem", "id"
+    )
+
+
+def total_lavagens(**filtros):
+    """Soma dos subtotais de lavagens_unificadas(**filtros), numa única consulta."""
+    return filtrar_lavagens(**filtros).aggregate(total=Sum("valor_total"))["total"] or Decimal("0.00")
+
+
+def filtrar_presencas(funcionario=None, data=None, data_inicio=None, data_fim=None):
+    qs = Presenca.objects.select_related("funcionario")
+
+    if funcionario:
+        qs = qs.filter(funcionario__nome=funcionario)
+
+    if data:
+        qs = qs.filter(data=data)
+
+    if data_inicio:
+        qs = qs.filter(data__gte=data_inicio)
+
+    if data_fim:
+        qs = qs.filter(data__lte=data_fim)
+
+    return qs.order_by("data", "funcionario__nome")
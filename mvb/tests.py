@@ -1,3 +1,707 @@
-from django.test import TestCase
+import base64
+import io
+import json
+from calendar import monthrange
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .forms import LavagemCarretaForm
+from .importacao import importar_lavagens
+from .models import (
+    Cliente, ExportJob, FechamentoMes, Financeiro, Funcao, Funcionario, LavadorCargaEntry, LavadorSujoEntry,
+    Lavagem, LavagemCarreta, MesFechado, Presenca, ReceitaDiaria, TipoCaixa, TipoProduto,
+    meses_fechados,
+)
+from .services import acumulado_financeiro, elegibilidade_bonus, intervalo_periodo, semana_e_mes, totais_periodo
+
+
+# cache em memória: o de arquivo do settings é compartilhado com o servidor de desenvolvimento
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BaseTestCase(TestCase):
+    def setUp(self):
+        # o cache (meses fechados, KPIs) sobrevive ao rollback de cada teste
+        cache.clear()
+        self.staff = User.objects.create_user('adm', password='x', is_staff=True, is_superuser=True)
+        self.client.force_login(self.staff)
+        self.cliente = Cliente.objects.create(nome='ACME')
+        self.tipo_caixa = TipoCaixa.objects.create(nome='Caixa', tamanho='G')
+        self.tipo_produto = TipoProduto.objects.create(nome='Tomate')
+        self.hoje = date.today()
+
+
+class PaginacaoTests(BaseTestCase):
+    def cursor(self, dados):
+        return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode().rstrip("=")
+
+    def test_cursor_adulterado_volta_para_a_primeira_pagina(self):
+        Financeiro.objects.create(data=self.hoje, frete=Decimal('1'))
+        for dados in [{"v": ["lixo", 5], "d": "p"}, {"v": [None, 5], "d": "a"}, {"v": [[1], {"a": 1}], "d": "p"}]:
+            for url in ['/financeiro/', '/lavagens/', '/presencas/lista/', '/clientes/']:
+                r = self.client.get(url, {'cursor': self.cursor(dados)})
+                self.assertEqual(r.status_code, 200, (url, dados))
+        r = self.client.get('/financeiro/', {'cursor': self.cursor({"v": ["lixo", 5], "d": "p"})})
+        self.assertEqual(len(r.context['financeiros']), 1)
+
+
+class FechamentoMesTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mes_passado = (self.hoje.replace(day=1) - timedelta(days=1)).replace(day=10)
+
+    def fechar(self, dia):
+        with self.captureOnCommitCallbacks(execute=True):
+            return FechamentoMes.fechar(dia.year, dia.month, self.staff)
+
+    def test_admin_somente_leitura(self):
+        fechamento = self.fechar(self.mes_passado)
+        self.assertEqual(self.client.get('/admin/mvb/fechamentomes/add/').status_code, 403)
+        r = self.client.get(f'/admin/mvb/fechamentomes/{fechamento.pk}/change/')
+        self.assertEqual(r.status_code, 200)
+        self.assertNotContains(r, 'name="lucro"')
+        self.client.post(f'/admin/mvb/fechamentomes/{fechamento.pk}/change/', {'lucro': '999'})
+        fechamento.refresh_from_db()
+        self.assertEqual(fechamento.lucro, Decimal('0.00'))
+
+    def lavagem(self, dia, quantidade=10, valor='2.00'):
+        return LavagemCarreta.objects.create(
+            data=dia, cliente=self.cliente, tipo_caixa=self.tipo_caixa, tipo_produto=self.tipo_produto,
+            quantidade_caixas=quantidade, valor_por_caixa=Decimal(valor),
+        )
+
+    def test_fechar_trava_os_lancamentos_antes_de_calcular(self):
+        ordem = []
+        travar, calcular = FechamentoMes._travar_lancamentos, FechamentoMes.calcular
+        with mock.patch.object(FechamentoMes, '_travar_lancamentos', side_effect=lambda *a: ordem.append('travar') or travar(*a)), \
+                mock.patch.object(FechamentoMes, 'calcular', side_effect=lambda *a: ordem.append('calcular') or calcular(*a)):
+            self.fechar(self.mes_passado)
+        self.assertEqual(ordem, ['travar', 'calcular'])
+
+    def test_fechar_mes_corrente_ou_repetido(self):
+        with self.assertRaises(ValidationError):
+            FechamentoMes.fechar(self.hoje.year, self.hoje.month)
+        self.fechar(self.mes_passado)
+        with self.assertRaises(ValidationError):
+            self.fechar(self.mes_passado)
+
+    def test_clean_acusa_mes_fechado_no_campo_data(self):
+        self.fechar(self.mes_passado)
+        form = LavagemCarretaForm(data={
+            'data': self.mes_passado, 'tipo_caixa': self.tipo_caixa.pk, 'tipo_produto': self.tipo_produto.pk,
+            'quantidade_caixas': 1, 'valor_por_caixa': '1', 'tipo_lavagem': 'sujo',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('data', form.errors)
+        with self.assertRaises(ValidationError) as erro:
+            Financeiro(data=self.mes_passado, frete=Decimal('1')).full_clean()
+        self.assertIn('data', erro.exception.message_dict)
+
+    def test_exclusao_em_mes_fechado(self):
+        lavagem = self.lavagem(self.mes_passado)
+        financeiro = Financeiro.objects.create(data=self.mes_passado, frete=Decimal('5'))
+        self.fechar(self.mes_passado)
+        for obj in (lavagem, financeiro):
+            with self.assertRaises(MesFechado):
+                obj.delete()
+            self.assertTrue(type(obj).objects.filter(pk=obj.pk).exists())
+        r = self.client.post(f'/lavagens/{lavagem.pk}/excluir/', follow=True)
+        self.assertContains(r, 'está fechado')
+        self.assertTrue(Lavagem.objects.filter(pk=lavagem.pk).exists())
+
+    def test_mover_lancamento_para_dentro_ou_para_fora_de_mes_fechado(self):
+        aberta = self.lavagem(self.hoje)
+        fechada = self.lavagem(self.mes_passado)
+        self.fechar(self.mes_passado)
+        aberta.data = self.mes_passado
+        with self.assertRaises(MesFechado):
+            aberta.save()
+        fechada.data = self.hoje
+        with self.assertRaises(MesFechado):
+            fechada.save()
+        self.assertEqual(Lavagem.objects.get(pk=aberta.pk).data, self.hoje)
+        self.assertEqual(Lavagem.objects.get(pk=fechada.pk).data, self.mes_passado)
+
+    def test_criar_em_lote_em_mes_fechado(self):
+        self.fechar(self.mes_passado)
+        lote = [LavagemCarreta(data=d, tipo_caixa=self.tipo_caixa, tipo_produto=self.tipo_produto,
+                               quantidade_caixas=1, valor_por_caixa=Decimal('1')) for d in (self.hoje, self.mes_passado)]
+        with self.assertRaises(MesFechado):
+            LavagemCarreta.criar_em_lote(lote)
+        self.assertFalse(Lavagem.objects.exists())
+
+    def test_seed_nao_grava_em_mes_fechado(self):
+        self.fechar(self.mes_passado)
+        opcoes = ['--anos=1', '--clientes=2', '--funcionarios=2', '--lavagens-por-dia=2', '--forcar']
+        with self.assertRaisesMessage(CommandError, f'{self.mes_passado:%m/%Y}'):
+            call_command('seed_mvb', *opcoes, stdout=io.StringIO())
+        self.assertFalse(Lavagem.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('seed_mvb', *opcoes, '--limpar', '--no-input', stdout=io.StringIO())
+        self.assertFalse(FechamentoMes.objects.exists())
+        self.assertEqual(meses_fechados(), set())
+        self.assertTrue(Lavagem.objects.filter(data__month=self.mes_passado.month).exists())
+
+    def test_totais_periodo_com_mes_fechado_parcialmente_no_intervalo(self):
+        inicio_mes = self.mes_passado.replace(day=1)
+        self.lavagem(inicio_mes, quantidade=10)                        # fora do intervalo
+        self.lavagem(inicio_mes.replace(day=20), quantidade=5)        # dentro
+        self.lavagem(self.hoje, quantidade=1)
+        Financeiro.objects.create(data=inicio_mes, frete=Decimal('7'))
+        self.fechar(self.mes_passado)
+        # alterações que não passam pelos signals não mudam o que o fechamento congelou
+        Financeiro.objects.update(frete=Decimal('100'))
+
+        totais = totais_periodo(inicio_mes.replace(day=15), self.hoje)
+        # receita: o mês fechado só entra em parte, então vem das linhas dos dias 15 em diante
+        self.assertEqual(totais['receitas']['carreta']['valor'], Decimal('12.00'))
+        # despesas são mensais: o mês fechado entra pelo fechamento, proporcional aos dias
+        dias = monthrange(inicio_mes.year, inicio_mes.month)[1]
+        self.assertEqual(totais['despesas_total'], (Decimal('7') * (dias - 14) / dias).quantize(Decimal('0.01')))
+
+        ReceitaDiaria.objects.filter(data__lt=self.hoje.replace(day=1)).update(valor_total=0)
+        totais = totais_periodo(inicio_mes, self.hoje)
+        self.assertEqual(totais['receitas']['carreta']['valor'], Decimal('32.00'))
+
+
+class PeriodoTests(BaseTestCase):
+    def test_intervalo_nas_viradas_de_mes(self):
+        casos = [
+            ('diario', date(2024, 2, 29), (date(2024, 2, 29), date(2024, 2, 29))),
+            ('semanal', date(2024, 3, 1), (date(2024, 2, 26), date(2024, 3, 3))),
+            ('mensal', date(2024, 2, 29), (date(2024, 2, 1), date(2024, 2, 29))),
+            ('mensal', date(2023, 2, 1), (date(2023, 2, 1), date(2023, 2, 28))),
+            ('trimestral', date(2024, 3, 31), (date(2024, 1, 1), date(2024, 3, 31))),
+            ('trimestral', date(2024, 10, 1), (date(2024, 10, 1), date(2024, 12, 31))),
+            ('anual', date(2024, 12, 31), (date(2024, 1, 1), date(2024, 12, 31))),
+        ]
+        for periodo, hoje, esperado in casos:
+            with self.subTest(periodo=periodo, hoje=hoje):
+                self.assertEqual(intervalo_periodo(periodo, hoje=hoje), esperado)
+        hoje = date(2024, 5, 10)
+        self.assertEqual(
+            intervalo_periodo('personalizado', {'start': '2024-02-01', 'end': '2024-01-31'}, hoje),
+            (date(2024, 1, 31), date(2024, 2, 1)),
+        )
+        self.assertEqual(intervalo_periodo('personalizado', {'start': '2024-02-30', 'end': ''}, hoje), (hoje, hoje))
+
+    def test_despesas_proporcionais_aos_dias_do_mes(self):
+        Financeiro.objects.create(data=date(2024, 1, 10), frete=Decimal('31'))
+        Financeiro.objects.create(data=date(2024, 2, 10), frete=Decimal('29'))
+        LavagemCarreta.objects.create(
+            data=date(2024, 2, 1), tipo_caixa=self.tipo_caixa, tipo_produto=self.tipo_produto,
+            quantidade_caixas=10, valor_por_caixa=Decimal('2'),
+        )
+        casos = [
+            ((date(2024, 1, 1), date(2024, 1, 31)), Decimal('31.00')),
+            ((date(2024, 1, 31), date(2024, 2, 1)), Decimal('2.00')),
+            ((date(2024, 2, 1), date(2024, 2, 15)), Decimal('15.00')),
+            ((date(2024, 1, 1), date(2024, 2, 29)), Decimal('60.00')),
+            ((date(2024, 3, 1), date(2024, 3, 31)), Decimal('0.00')),
+        ]
+        for (inicio, fim), despesas in casos:
+            with self.subTest(inicio=inicio, fim=fim):
+                self.assertEqual(totais_periodo(inicio, fim)['despesas_total'], despesas)
+        totais = totais_periodo(date(2024, 1, 31), date(2024, 2, 1))
+        self.assertEqual((totais['receita_total'], totais['lucro']), (Decimal('20.00'), Decimal('18.00')))
+
+
+class PresencaTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.funcao = Funcao.objects.create(nome='Lavador', salario_mensal=Decimal('1500'))
+
+    def funcionario(self, nome, *presencas, ativo=True):
+        f = Funcionario.objects.create(nome=nome, cpf=nome, funcao=self.funcao, ativo=ativo)
+        Presenca.objects.bulk_create([Presenca(funcionario=f, data=d, status=s) for d, s in presencas])
+        return f
+
+    def test_elegibilidade_igual_a_contagem_por_funcionario(self):
+        # sexta-feira: a semana (26/02 a 03/03) começa no mês anterior
+        hoje = date(2024, 3, 1)
+        ana = self.funcionario('Ana', (date(2024, 2, 26), 'P'), (date(2024, 2, 27), 'O'),
+                               (date(2024, 2, 28), 'F'), (date(2024, 1, 10), 'F'))
+        bruno = self.funcionario('Bruno', (date(2024, 3, 1), 'P'), (date(2024, 3, 20), 'F'), (date(2024, 4, 1), 'F'))
+        carla = self.funcionario('Carla')
+        self.funcionario('Davi', (date(2024, 3, 1), 'F'), ativo=False)
+
+        # o cálculo de antes: um COUNT por funcionário e status
+        inicio_sem, fim_sem, inicio_mes, fim_mes = semana_e_mes(hoje)
+        def contar(f, de, ate, status):
+            return Presenca.objects.filter(funcionario=f, data__range=(de, ate), status=status).count()
+        esperado = [
+            {
+                "funcionario": f,
+                "pres_sem": contar(f, inicio_sem, fim_sem, 'P'),
+                "faltas_sem": contar(f, inicio_sem, fim_sem, 'F'),
+                "folgas_sem": contar(f, inicio_sem, fim_sem, 'O'),
+                "elegivel_sem": contar(f, inicio_sem, fim_sem, 'F') == 0,
+                "elegivel_mes": contar(f, inicio_mes, fim_mes, 'F') == 0,
+            }
+            for f in Funcionario.objects.filter(ativo=True).order_by('nome')
+        ]
+
+        with self.assertNumQueries(1):
+            dados = elegibilidade_bonus(hoje)
+        self.assertEqual(dados, esperado)
+        elegiveis = {d['funcionario']: (d['elegivel_sem'], d['elegivel_mes']) for d in dados}
+        self.assertEqual(elegiveis, {ana: (False, True), bruno: (True, False), carla: (True, True)})
+        self.assertEqual((dados[0]['pres_sem'], dados[0]['folgas_sem']), (1, 1))
+
+    def test_folha_regravada_sem_duplicar(self):
+        dia, semana_passada = self.hoje, self.hoje - timedelta(days=7)
+        ana = self.funcionario('Ana', (dia, 'P'), (semana_passada, 'F'))
+        bruno = self.funcionario('Bruno')
+        carla = self.funcionario('Carla', (dia, 'O'))
+        folha = {'data': dia.isoformat(), f'status_{ana.pk}': 'F', f'status_{bruno.pk}': 'P',
+                 f'status_{carla.pk}': '', 'status_9999': 'P'}
+        self.assertEqual(self.client.get('/').context['qtd_elegiveis_semana'], 3)
+
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                r = self.client.post('/presencas/registrar/', folha)
+            self.assertRedirects(r, '/presencas/lista/', fetch_redirect_response=False)
+
+        # o mesmo que o update_or_create por funcionário deixava: uma linha por
+        # (funcionario, data), status vazio não mexe na linha existente
+        self.assertEqual(
+            set(Presenca.objects.values_list('funcionario__nome', 'data', 'status')),
+            {('Ana', dia, 'F'), ('Ana', semana_passada, 'F'), ('Bruno', dia, 'P'), ('Carla', dia, 'O')},
+        )
+        # bulk_create não dispara os signals: o painel tem de ver a falta nova
+        self.assertEqual(self.client.get('/').context['qtd_elegiveis_semana'], 2)
+
+
+class AcumuladoFinanceiroTests(BaseTestCase):
+    def acumulado_antigo(self, ano=None, mes=None):
+        # o laço de antes: soma por mês agrupada e acumulado em Python
+        qs = Financeiro.objects.all()
+        if ano:
+            qs = qs.filter(ano=ano)
+        if mes:
+            qs = qs.filter(mes=mes)
+        meses, corrente = [], Decimal('0.00')
+        for r in qs.values('ano', 'mes').annotate(soma=Sum('total')).order_by('ano', 'mes'):
+            corrente += r['soma']
+            meses.append({'ano': r['ano'], 'mes': r['mes'], 'soma': r['soma'], 'acumulado': corrente})
+        return {'meses': meses, 'total': corrente}
+
+    def test_acumulado_igual_ao_laco_por_mes(self):
+        for dia, campos in [
+            (date(2023, 12, 5), {'frete': '10'}),
+            (date(2024, 1, 3), {'frete': '5', 'inss': '1.25'}),
+            (date(2024, 1, 20), {'refeicao_cafe': '3'}),
+            (date(2024, 3, 15), {'contabilidade': '100', 'salario_total_funcionarios': '0.10'}),
+        ]:
+            Financeiro.objects.create(data=dia, **{c: Decimal(v) for c, v in campos.items()})
+
+        filtros = [{}, {'ano': 2024}, {'mes': 1}, {'ano': 2024, 'mes': 3}, {'ano': 2023, 'mes': 2}]
+        for filtro in filtros:
+            with self.subTest(**filtro):
+                self.assertEqual(acumulado_financeiro(**filtro), self.acumulado_antigo(**filtro))
+        self.assertEqual(
+            [(m['mes'], m['soma'], m['acumulado']) for m in acumulado_financeiro()['meses']],
+            [(12, Decimal('10.00'), Decimal('10.00')), (1, Decimal('9.25'), Decimal('19.25')),
+             (3, Decimal('100.10'), Decimal('119.35'))],
+        )
+
+        # lançamento novo troca a versão do cache: todos os filtros veem a mudança
+        with self.captureOnCommitCallbacks(execute=True):
+            Financeiro.objects.create(data=date(2024, 2, 1), frete=Decimal('0.65'))
+        for filtro in filtros:
+            with self.subTest(depois=True, **filtro):
+                self.assertEqual(acumulado_financeiro(**filtro), self.acumulado_antigo(**filtro))
+        r = self.client.get('/financeiro/', {'ano': 2024})
+        self.assertEqual(r.context['despesas_total'], Decimal('110.00'))
+
+
+class ValoresGeradosTests(BaseTestCase):
+    def test_valor_total_de_cada_origem_e_total_do_financeiro(self):
+        carreta = LavagemCarreta.objects.create(
+            data=self.hoje, tipo_caixa=self.tipo_caixa, tipo_produto=self.tipo_produto,
+            quantidade_caixas=3, valor_por_caixa=Decimal('2.50'),
+        )
+        sujo = LavadorSujoEntry.objects.create(
+            data=self.hoje, tipo_produto=self.tipo_produto, quantidade_caixas=4, valor_por_caixa=Decimal('1.25'),
+        )
+        # a carga vale o que a carreta rendeu, mesmo com valor por caixa preenchido
+        carga = LavadorCargaEntry.objects.create(
+            data=self.hoje, quantidade_caixas=6, valor_por_caixa=Decimal('5'), valor_rendido=Decimal('99'),
+        )
+        financeiro = Financeiro.objects.create(
+            data=self.hoje, salario_total_funcionarios=Decimal('1000'), frete=Decimal('10'), refeicao_cafe=Decimal('1'),
+            refeicao_almoco=Decimal('2'), contabilidade=Decimal('3'), inss=Decimal('4.50'),
+        )
+
+        def conferir():
+            # as fórmulas que os métodos valor_total() e o save() do Financeiro calculavam em Python
+            for lavagem in Lavagem.objects.all():
+                esperado = (
+                    lavagem.valor_rendido if lavagem.origem == 'carga'
+                    else lavagem.quantidade_caixas * lavagem.valor_por_caixa
+                )
+                self.assertEqual(lavagem.valor_total, esperado, lavagem.origem)
+            f = Financeiro.objects.get()
+            self.assertEqual(f.total, sum(getattr(f, c) for c in (
+                'salario_total_funcionarios', 'frete', 'refeicao_cafe', 'refeicao_almoco', 'contabilidade', 'inss',
+            )))
+
+        conferir()
+        self.assertEqual(
+            {l.origem: l.valor_total for l in Lavagem.objects.all()},
+            {'carreta': Decimal('7.50'), 'sujo': Decimal('5.00'), 'carga': Decimal('99.00')},
+        )
+        self.assertEqual(Financeiro.objects.get().total, Decimal('1020.50'))
+
+        # update() não passa por save(): o banco recalcula mesmo assim
+        Lavagem.objects.filter(pk__in=[carreta.pk, sujo.pk, carga.pk]).update(quantidade_caixas=F('quantidade_caixas') + 1)
+        Financeiro.objects.filter(pk=financeiro.pk).update(inss=Decimal('0'))
+        conferir()
+        self.assertEqual(Financeiro.objects.get().total, Decimal('1016.00'))
+
+
+class LavagemAdminTests(BaseTestCase):
+    def test_visao_geral_somente_leitura(self):
+        lavagem = LavagemCarreta.objects.create(
+            data=self.hoje, tipo_caixa=self.tipo_caixa, tipo_produto=self.tipo_produto,
+            quantidade_caixas=3, valor_por_caixa=Decimal('2'),
+        )
+        self.assertEqual(self.client.get('/admin/mvb/lavagem/').status_code, 200)
+        r = self.client.get(f'/admin/mvb/lavagem/{lavagem.pk}/change/')
+        self.assertNotContains(r, 'name="quantidade_caixas"')
+        self.client.post(f'/admin/mvb/lavagem/{lavagem.pk}/change/', {'quantidade_caixas': '9', 'data': self.hoje})
+        self.assertEqual(Lavagem.objects.get(pk=lavagem.pk).quantidade_caixas, 3)
+        self.assertEqual(self.client.get(f'/admin/mvb/lavagem/{lavagem.pk}/delete/').status_code, 403)
+        self.client.post('/admin/mvb/lavagem/', {
+            'action': 'delete_selected', '_selected_action': [lavagem.pk], 'post': 'yes',
+        })
+        self.assertTrue(Lavagem.objects.filter(pk=lavagem.pk).exists())
+        # a edição continua disponível pelo proxy da origem
+        r = self.client.get(f'/admin/mvb/lavagemcarreta/{lavagem.pk}/change/')
+        self.assertContains(r, 'name="quantidade_caixas"')
+
+
+class ExclusaoClienteTests(BaseTestCase):
+    def lavagens(self, dia):
+        LavadorSujoEntry.objects.create(data=dia, cliente=self.cliente, lavador='L1', quantidade_caixas=2,
+                                        tipo_produto=self.tipo_produto, valor_por_caixa=Decimal('1'))
+        LavadorCargaEntry.objects.create(data=dia, cliente=self.cliente, lavador='L2', valor_rendido=Decimal('9'))
+
+    def test_sujo_e_carga_vao_junto_com_o_cliente(self):
+        self.lavagens(self.hoje)
+        r = self.client.post(f'/clientes/{self.cliente.pk}/excluir/', follow=True)
+        self.assertFalse(Cliente.objects.filter(pk=self.cliente.pk).exists())
+        self.assertFalse(Lavagem.objects.exists())
+        self.assertFalse(ReceitaDiaria.objects.exists())
+        self.assertEqual(r.status_code, 200)
+
+    def test_carreta_protege_o_cliente(self):
+        self.lavagens(self.hoje)
+        LavagemCarreta.objects.create(data=self.hoje, cliente=self.cliente, tipo_caixa=self.tipo_caixa,
+                                      tipo_produto=self.tipo_produto, quantidade_caixas=1, valor_por_caixa=Decimal('1'))
+        r = self.client.post(f'/clientes/{self.cliente.pk}/excluir/', follow=True)
+        self.assertContains(r, 'lavagens de carreta')
+        self.assertTrue(Cliente.objects.filter(pk=self.cliente.pk).exists())
+        self.assertEqual(Lavagem.objects.count(), 3)
+
+    def test_cascata_nao_apaga_mes_fechado(self):
+        mes_passado = (self.hoje.replace(day=1) - timedelta(days=1)).replace(day=10)
+        self.lavagens(mes_passado)
+        with self.captureOnCommitCallbacks(execute=True):
+            FechamentoMes.fechar(mes_passado.year, mes_passado.month, self.staff)
+        r = self.client.post(f'/clientes/{self.cliente.pk}/excluir/', follow=True)
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(Cliente.objects.filter(pk=self.cliente.pk).exists())
+        self.assertEqual(Lavagem.objects.count(), 2)
+
+
+class MigracaoTestCase(TransactionTestCase):
+    def migrar(self, alvo):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(alvo)
+        return executor.loader.project_state(alvo).apps
+
+    def tearDown(self):
+        self.migrar(MigrationExecutor(connection).loader.graph.leaf_nodes('mvb'))
+
+
+class MigracaoValoresGeradosTests(MigracaoTestCase):
+    antes = [('mvb', '0017_fechamento_mes')]
+    depois = [('mvb', '0018_valores_gerados')]
+
+    def test_total_do_financeiro_recalculado_pelo_banco(self):
+        apps = self.migrar(self.antes)
+        # total gravado à mão e desatualizado, como o save() antigo podia deixar
+        apps.get_model('mvb', 'Financeiro').objects.create(
+            data=date(2024, 3, 5), ano=2024, mes=3, frete=Decimal('10'), inss=Decimal('2.50'), total=Decimal('999'),
+        )
+        apps.get_model('mvb', 'LavagemCarreta').objects.create(
+            data=date(2024, 3, 5), quantidade_caixas=3, valor_por_caixa=Decimal('2.50'),
+            tipo_caixa=apps.get_model('mvb', 'TipoCaixa').objects.create(nome='Caixa', tamanho='G'),
+            tipo_produto=apps.get_model('mvb', 'TipoProduto').objects.create(nome='Tomate'),
+        )
+
+        apps = self.migrar(self.depois)
+        # a coluna é removida e criada de novo como gerada: o valor antigo não sobrevive
+        self.assertEqual(apps.get_model('mvb', 'Financeiro').objects.get().total, Decimal('12.50'))
+        self.assertEqual(apps.get_model('mvb', 'LavagemCarreta').objects.get().valor_total, Decimal('7.50'))
+
+        apps = self.migrar(self.antes)
+        financeiro = apps.get_model('mvb', 'Financeiro').objects.get()
+        self.assertEqual((financeiro.frete, financeiro.inss, financeiro.total), (Decimal('10'), Decimal('2.50'), 0))
+
+
+class MigracaoLavagemUnificadaTests(MigracaoTestCase):
+    antes = [('mvb', '0018_valores_gerados')]
+    depois = [('mvb', '0021_remover_tabelas_por_origem')]
+
+    def test_copia_de_ida_e_volta(self):
+        apps = self.migrar(self.antes)
+        cliente = apps.get_model('mvb', 'Cliente').objects.create(nome='ACME')
+        caixa = apps.get_model('mvb', 'TipoCaixa').objects.create(nome='Caixa', tamanho='G')
+        produto = apps.get_model('mvb', 'TipoProduto').objects.create(nome='Tomate')
+        dia = date(2024, 3, 5)
+        Carreta = apps.get_model('mvb', 'LavagemCarreta')
+        Carreta.objects.create(id=40, data=dia, cliente=cliente, carreta_ident='Zé', tipo_caixa=caixa,
+                               tipo_produto=produto, quantidade_caixas=10, valor_por_caixa=Decimal('2.50'))
+        apps.get_model('mvb', 'LavadorSujoEntry').objects.create(
+            id=40, data=dia, lavador='Lavador 1', quantidade_caixas=4, tamanho_caixa='P',
+            tipo_produto=produto, valor_por_caixa=Decimal('1.00'))
+        apps.get_model('mvb', 'LavadorCargaEntry').objects.create(
+            id=7, data=dia, cliente=cliente, lavador='Lavador 2', tipo_lavagem='carga', quantidade_caixas=6,
+            q_3A=1, q_2A=2, q_1A=3, valor_rendido=Decimal('99.00'))
+
+        apps = self.migrar(self.depois)
+        Lavagem = apps.get_model('mvb', 'Lavagem')
+        linhas = {l.origem: l for l in Lavagem.objects.all()}
+        self.assertEqual(set(linhas), {'carreta', 'sujo', 'carga'})
+        self.assertEqual(linhas['carreta'].id, 40)
+        self.assertEqual((linhas['carreta'].carreta_ident, linhas['carreta'].valor_total), ('Zé', Decimal('25.00')))
+        self.assertEqual((linhas['sujo'].tamanho_caixa, linhas['sujo'].valor_total), ('P', Decimal('4.00')))
+        self.assertEqual((linhas['carga'].q_1A, linhas['carga'].valor_total), (3, Decimal('99.00')))
+        self.assertGreater(linhas['sujo'].id, 40)
+        # a sequência continua depois dos ids copiados
+        nova = Lavagem.objects.create(origem='sujo', data=dia)
+        self.assertGreater(nova.id, max(l.id for l in linhas.values()))
+        nova.delete()
+
+        apps = self.migrar(self.antes)
+        carreta = apps.get_model('mvb', 'LavagemCarreta').objects.get()
+        self.assertEqual((carreta.id, carreta.carreta_ident, carreta.valor_por_caixa), (40, 'Zé', Decimal('2.50')))
+        self.assertEqual(apps.get_model('mvb', 'LavadorSujoEntry').objects.get().tamanho_caixa, 'P')
+        carga = apps.get_model('mvb', 'LavadorCargaEntry').objects.get()
+        self.assertEqual((carga.q_2A, carga.valor_rendido, carga.tipo_lavagem), (2, Decimal('99.00'), 'carga'))
+
+
+class LavagensEmLoteTests(BaseTestCase):
+    url = '/lavagens/lote/carreta/'
+
+    def dados(self, preenchidas, total=10):
+        dados = {'form-TOTAL_FORMS': total, 'form-INITIAL_FORMS': 0, 'form-MIN_NUM_FORMS': 0, 'form-MAX_NUM_FORMS': 100}
+        for i in range(total):
+            linha = {'data': self.hoje, 'carreta_ident': '', 'tipo_caixa': '', 'tipo_produto': '',
+                     'quantidade_caixas': 0, 'valor_por_caixa': '', 'cliente': '', 'tipo_lavagem': 'sujo'}
+            if i < preenchidas:
+                linha.update(carreta_ident=f'C{i}', tipo_caixa=self.tipo_caixa.pk, tipo_produto=self.tipo_produto.pk,
+                             quantidade_caixas=2, valor_por_caixa='3', cliente=self.cliente.pk)
+            dados.update({f'form-{i}-{campo}': valor for campo, valor in linha.items()})
+        return dados
+
+    def consultas_do_post(self, preenchidas):
+        with CaptureQueriesContext(connection) as consultas:
+            r = self.client.post(f'{self.url}?linhas=10&data={self.hoje}', self.dados(preenchidas))
+        self.assertEqual(r.status_code, 302)
+        return len(consultas)
+
+    def test_consultas_nao_crescem_com_as_linhas(self):
+        meses_fechados()  # aquece o cache, para as duas requisições partirem do mesmo estado
+        duas = self.consultas_do_post(2)
+        oito = self.consultas_do_post(8)
+        self.assertEqual(duas, oito)
+        self.assertEqual(Lavagem.objects.count(), 10)
+        self.assertEqual(ReceitaDiaria.objects.get().valor_total, Decimal('60.00'))
+
+    def test_numero_de_consultas_do_post(self):
+        # sessão e usuário, 3 listas de escolha, meses fechados (cache frio) e, na transação,
+        # savepoint, bulk_create, totais e upsert da ReceitaDiaria, release
+        with self.assertNumQueries(11):
+            self.client.post(f'{self.url}?linhas=10&data={self.hoje}', self.dados(5))
+
+    def test_escolha_inexistente_invalida_a_linha(self):
+        dados = self.dados(2)
+        dados['form-1-tipo_caixa'] = 9999
+        r = self.client.post(f'{self.url}?linhas=10&data={self.hoje}', dados)
+        self.assertEqual(r.status_code, 200)
+        self.assertFalse(Lavagem.objects.exists())
+
+
+class ReceitaDiariaTests(BaseTestCase):
+    def lavagem(self, **campos):
+        return LavagemCarreta.objects.create(
+            data=self.hoje, tipo_caixa=self.tipo_caixa, tipo_produto=self.tipo_produto,
+            quantidade_caixas=2, valor_por_caixa=Decimal('1.50'), **campos
+        )
+
+    def test_bucket_sem_cliente_e_unico(self):
+        self.lavagem()
+        self.lavagem()
+        self.assertEqual(ReceitaDiaria.objects.filter(cliente=None).count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ReceitaDiaria.objects.create(data=self.hoje, origem='carreta', cliente=None)
+
+    def test_dry_run_nao_diz_que_recriou(self):
+        self.lavagem(cliente=self.cliente)
+        ReceitaDiaria.objects.all().delete()
+        for opcoes in (['--dry-run'], ['--reconstruir', '--dry-run']):
+            saida = io.StringIO()
+            call_command('reconstruir_receita_diaria', *opcoes, stdout=saida)
+            self.assertIn('Seriam', saida.getvalue())
+            self.assertNotIn('recriados.', saida.getvalue())
+        self.assertFalse(ReceitaDiaria.objects.exists())
+        call_command('reconstruir_receita_diaria', '--reconstruir', stdout=io.StringIO())
+        self.assertEqual(ReceitaDiaria.objects.count(), 1)
+
+
+class ExportacaoTests(BaseTestCase):
+    def test_pdf_enfileira_em_vez_de_gerar_na_requisicao(self):
+        for url, tipo in [
+            ('/export/pdf/mensal/', 'relatorio_pdf'),
+            ('/relatorios/exportar-pdf/', 'filtrado_pdf'),
+            ('/financeiro/exportar/pdf', 'financeiro_pdf'),
+            ('/lavagens/exportar/pdf/', 'lavagens_pdf'),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 405)
+                with mock.patch('mvb.exportacao.executar_job') as executar:
+                    r = self.client.post(f'{url}?ano=2024')
+                executar.assert_not_called()
+                self.assertEqual(r.status_code, 202)
+                job = ExportJob.objects.get(pk=r.json()['id'])
+                self.assertEqual((job.tipo, job.status, job.parametros['ano']), (tipo, 'pendente', '2024'))
+                self.assertEqual(self.client.get(r.json()['status_url']).json()['status'], 'pendente')
+        self.assertEqual(ExportJob.objects.get(tipo='relatorio_pdf').parametros['periodo'], 'mensal')
+
+    def test_grafico_financeiro_em_svg_com_etag(self):
+        Financeiro.objects.create(data=self.hoje, frete=Decimal('10'))
+        r = self.client.get('/financeiro/grafico.svg')
+        self.assertEqual(r['Content-Type'], 'image/svg+xml')
+        self.assertTrue(r.content.startswith(b'<svg'))
+        self.assertEqual(self.client.get('/financeiro/grafico.svg', HTTP_IF_NONE_MATCH=r['ETag']).status_code, 304)
+        Financeiro.objects.filter(data=self.hoje).update(frete=Decimal('20'))
+        self.assertEqual(self.client.get('/financeiro/grafico.svg', HTTP_IF_NONE_MATCH=r['ETag']).status_code, 200)
+
+    def test_arquivo_do_worker_fica_no_banco(self):
+        LavagemCarreta.objects.create(
+            data=self.hoje, cliente=self.cliente, tipo_caixa=self.tipo_caixa, tipo_produto=self.tipo_produto,
+            quantidade_caixas=2, valor_por_caixa=Decimal('1.50'),
+        )
+        r = self.client.post('/exportacoes/solicitar/lavagens_excel/?formato=csv')
+        call_command('processar_exportacoes', '--uma-vez', stdout=io.StringIO())
+        job = ExportJob.objects.get(pk=r.json()['id'])
+        self.assertEqual((job.status, job.nome_arquivo), ('concluido', f'lavagens_filtradas_{job.pk}.csv'))
+        status = self.client.get(r.json()['status_url']).json()
+        download = self.client.get(status['download_url'])
+        self.assertIn(f'filename="{job.nome_arquivo}"', download['Content-Disposition'])
+        self.assertIn('ACME', b''.join(download.streaming_content).decode('utf-8-sig'))
+
+    def test_worker_recupera_jobs_abandonados(self):
+        velho = timezone.now() - timedelta(hours=1)
+        abandonado = ExportJob.objects.create(tipo='relatorio_pdf', status='processando', iniciado_em=velho, tentativas=1)
+        esgotado = ExportJob.objects.create(tipo='relatorio_pdf', status='processando', iniciado_em=velho, tentativas=3)
+        em_andamento = ExportJob.objects.create(tipo='relatorio_pdf', status='processando', iniciado_em=timezone.now())
+        with mock.patch('mvb.management.commands.processar_exportacoes.executar_job') as executar:
+            call_command('processar_exportacoes', '--uma-vez', '--timeout', '30', stdout=io.StringIO(), stderr=io.StringIO())
+        executar.assert_called_once()
+        abandonado.refresh_from_db(); esgotado.refresh_from_db(); em_andamento.refresh_from_db()
+        self.assertEqual((abandonado.status, abandonado.tentativas), ('concluido', 2))
+        self.assertEqual(esgotado.status, 'erro')
+        self.assertEqual(em_andamento.status, 'processando')
+
+    def test_erro_do_job_nao_expoe_traceback(self):
+        job = ExportJob.objects.create(tipo='relatorio_pdf', solicitado_por=self.staff)
+        falha = mock.patch(
+            'mvb.management.commands.processar_exportacoes.executar_job', side_effect=OSError("/srv/media: disco cheio")
+        )
+        with falha, self.assertLogs('mvb.exportacao', 'ERROR') as log:
+            call_command('processar_exportacoes', '--uma-vez', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertIn('Traceback', log.output[0])
+        job.refresh_from_db()
+        self.assertEqual(job.erro, "OSError: /srv/media: disco cheio")
+        self.assertEqual(self.client.get(f'/exportacoes/{job.pk}/').json()['erro'], "Falha ao gerar o arquivo.")
+
+
+class ServerTimingTests(BaseTestCase):
+    def registros(self, log):
+        return [json.loads(linha.split(":", 2)[2]) for linha in log.output]
+
+    def test_tempo_de_template_com_o_backend_padrao(self):
+        from django.template import engines
+        from django.template.backends.django import DjangoTemplates, Template
+        self.assertIs(type(engines['django']), DjangoTemplates)
+        self.assertFalse(hasattr(Template.render, "_server_timing"))
+        with self.assertLogs('mvb.desempenho', 'DEBUG') as log:
+            r = self.client.get('/lavagens/importar/')
+        self.assertRegex(r['Server-Timing'], r'tpl;dur=(?!0\.0,)')
+        self.assertGreater(self.registros(log)[0]['template_ms'], 0)
+        self.assertEqual(log.records[0].levelname, 'DEBUG')
+
+    def test_excesso_de_consultas_em_warning(self):
+        with override_settings(SERVER_TIMING_LIMITE_CONSULTAS=0), self.assertLogs('mvb.desempenho', 'WARNING') as log:
+            self.client.get('/lavagens/importar/')
+        self.assertTrue(self.registros(log)[0]['excesso_consultas'])
+
+    def test_consultas_do_corpo_streaming_entram_no_registro(self):
+        LavagemCarreta.objects.create(
+            data=self.hoje, cliente=self.cliente, tipo_caixa=self.tipo_caixa, tipo_produto=self.tipo_produto,
+            quantidade_caixas=2, valor_por_caixa=Decimal('1.50'),
+        )
+        with self.assertLogs('mvb.desempenho', 'DEBUG') as log:
+            with CaptureQueriesContext(connection) as na_view:
+                r = self.client.get('/lavagens/exportar/excel/', {'formato': 'csv'})
+            self.assertTrue(r.streaming)
+            self.assertEqual(log.output, [])
+            with CaptureQueriesContext(connection) as no_corpo:
+                b''.join(r.streaming_content)
+            r.close()
+        self.assertGreater(len(no_corpo), 0)
+        self.assertEqual(len(log.output), 1)
+        self.assertEqual(self.registros(log)[0]['consultas'], len(na_view) + len(no_corpo))
+
+
+class ImportacaoTests(BaseTestCase):
+    def planilha(self, *linhas):
+        cabecalho = "Data;Carreta;Cliente;Tipo Caixa;Tipo Produto;Quantidade;Valor por caixa\n"
+        corpo = "".join(f"{self.hoje:%d/%m/%Y};C;ACME;Caixa - G;Tomate;2;{valor}\n" for valor in linhas)
+        return io.BytesIO((cabecalho + corpo).encode())
+
+    def test_valor_por_caixa_sem_arredondar(self):
+        resultado = importar_lavagens(self.planilha("2,50", "1,005", "1.234,5", "-1", "abc", "2.500"), "h.csv")
+        self.assertEqual(resultado.importadas, 3)
+        erros = dict(resultado.erros)
+        self.assertEqual(erros[3], ["valor por caixa com mais de 2 casas decimais"])
+        self.assertEqual(erros[5], ["valor por caixa inválido"])
+        self.assertEqual(erros[6], ["valor por caixa inválido"])
+        self.assertEqual(
+            sorted(LavagemCarreta.objects.values_list('valor_por_caixa', flat=True)),
+            [Decimal('2.50'), Decimal('2.50'), Decimal('1234.50')],
+        )
+
+    def test_tela_recusa_planilha_acima_do_limite(self):
+        arquivo = self.planilha("2,50", "3,00", "4,00")
+        arquivo.name = "h.csv"
+        with mock.patch("mvb.views.LIMITE_LINHAS_WEB", 2):
+            resposta = self.client.post("/lavagens/importar/", {"arquivo": arquivo})
+        self.assertContains(resposta, "pela tela o limite é 2")
+        self.assertFalse(LavagemCarreta.objects.exists())
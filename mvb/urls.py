@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, views_exportacao
 from django.contrib.auth import views as auth_views
 
 urlpatterns = [
@@ -20,8 +20,8 @@ urlpatterns = [
     path('', views.mvb_dashboard, name='mvb_dashboard'),
 
     # export
-    path('export/excel/<str:periodo>/', views.export_relatorio_excel, name='export_excel'),
-    path('export/pdf/<str:periodo>/', views.export_relatorio_pdf, name='export_pdf'),
+    path('export/excel/<str:periodo>/', views_exportacao.export_relatorio_excel, name='export_excel'),
+    path('export/pdf/<str:periodo>/', views_exportacao.export_relatorio_pdf, name='export_pdf'),
 
     # Funções / Funcionários
     path('funcoes/', views.lista_funcoes, name='lista_funcoes'),
@@ -43,12 +43,14 @@ urlpatterns = [
     # Lavagens
     path('lavagens/', views.lista_lavagens, name='lista_lavagens'),
     path('lavagens/nova/', views.nova_lavagem, name='nova_lavagem'),
+    path('lavagens/lote/<str:origem>/', views.lavagens_em_lote, name='lavagens_em_lote'),
+    path('lavagens/importar/', views.importar_lavagens, name='importar_lavagens'),
     path('lavador/sujo/', views.lista_lavador_sujo, name='lista_lavador_sujo'),
     path('lavador/sujo/novo/', views.novo_lavador_sujo, name='novo_lavador_sujo'),
     path('lavador/carga/', views.lista_lavador_carga, name='lista_lavador_carga'),
     path('lavador/carga/novo/', views.novo_lavador_carga, name='novo_lavador_carga'),
-    path("lavagens/exportar/excel/", views.exportar_lavagens_excel, name="exportar_lavagens_excel"),
-    path("lavagens/exportar/pdf/", views.exportar_lavagens_pdf, name="exportar_lavagens_pdf"),
+    path("lavagens/exportar/excel/", views_exportacao.exportar_lavagens_excel, name="exportar_lavagens_excel"),
+    path("lavagens/exportar/pdf/", views_exportacao.exportar_lavagens_pdf, name="exportar_lavagens_pdf"),
     path('lavagens/<int:pk>/editar/', views.editar_lavagem, name='editar_lavagem'),
     path('lavagens/<int:pk>/excluir/', views.excluir_lavagem, name='excluir_lavagem'),
 
@@ -56,14 +58,17 @@ urlpatterns = [
     path('financeiro/', views.lista_financeiro, name='lista_financeiro'),
     path('financeiro/adicionar/', views.adicionar_financeiro, name='adicionar_financeiro'),
     path('financeiro/novo/', views.novo_financeiro, name='novo_financeiro'),
-    path('financeiro/grafico.png', views.financeiro_grafico_png, name='financeiro_grafico_png'),
-    path('financeiro/exportar/pdf', views.exportar_financeiro_pdf, name='exportar_financeiro_pdf'),
-    path('financeiro/exportar/excel', views.exportar_financeiro_excel, name='exportar_financeiro_excel'),
+    path('financeiro/grafico.svg', views_exportacao.financeiro_grafico, name='financeiro_grafico'),
+    path('financeiro/exportar/pdf', views_exportacao.exportar_financeiro_pdf, name='exportar_financeiro_pdf'),
+    path('financeiro/exportar/excel', views_exportacao.exportar_financeiro_excel, name='exportar_financeiro_excel'),
     path("financeiro/<int:pk>/editar/", views.editar_financeiro, name="editar_financeiro"),
     path("financeiro/<int:pk>/excluir/", views.excluir_financeiro, name="excluir_financeiro"),
     #path('financeiro/relatorio_finan', views.relatorio_finan, name='relatorio_finan'),
 
     # Relatório
+    path('relatorio/tendencia/', views.api_tendencia_mensal, name='api_tendencia_mensal'),
+    path('relatorio/fechamentos/', views.fechamentos, name='fechamentos'),
+    path('relatorio/fechamentos/<int:pk>/reabrir/', views.reabrir_fechamento, name='reabrir_fechamento'),
     path('relatorio/<str:periodo>/', views.relatorio_periodo, name='relatorio_periodo'),
 
     # Clientes
@@ -83,10 +88,15 @@ urlpatterns = [
     path('relatorio/cliente/<int:cliente_id>/', views.relatorio_por_cliente, name='relatorio_por_cliente'),
 
     # Relatório filtrado
-    path("relatorios/exportar-excel/", views.exportar_excel_filtrado, name="exportar_excel_filtrado"),
-    path("relatorios/exportar-pdf/", views.exportar_pdf_filtrado, 
+    path("relatorios/exportar-excel/", views_exportacao.exportar_excel_filtrado, name="exportar_excel_filtrado"),
+    path("relatorios/exportar-pdf/", views_exportacao.exportar_pdf_filtrado, 
     name="exportar_pdf_filtrado"),
 
+    # Exportações em segundo plano
+    path("exportacoes/solicitar/<str:tipo>/", views_exportacao.solicitar_exportacao, name="solicitar_exportacao"),
+    path("exportacoes/<int:pk>/", views_exportacao.status_exportacao, name="status_exportacao"),
+    path("exportacoes/<int:pk>/download/", views_exportacao.baixar_exportacao, name="baixar_exportacao"),
+
     path("relatorios/", views.relatorios, name="relatorios"),
     path("relatorios/resultado/", views.resultado_relatorio, name="resultado_relatorio"),
 ]
@@ -1,47 +1,41 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Sum, F, DecimalField, ExpressionWrapper, Q
+from django.shortcuts import redirect, get_object_or_404
+from django.template.response import TemplateResponse
+from django.db.models import Sum, ProtectedError
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth import login, logout
-from django.views.decorators.http import require_GET
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib.auth.models import User
-from django.http import HttpResponse
-from django.template.loader import render_to_string
+from django.core.exceptions import ValidationError
 from django.contrib import messages
 from decimal import Decimal
-from calendar import monthrange
 from django.db import transaction
 from .models import Cliente, Presenca, BonusPayment
 from .models import (
         LavagemCarreta, LavadorSujoEntry, LavadorCargaEntry, Cliente
 )
 from .forms import ClienteForm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-import pandas as pd
 from django.utils import timezone
-from datetime import datetime, timedelta,date
-import openpyxl
-from openpyxl.utils import get_column_letter
-import pandas as pd
-import io
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from datetime import date
 import base64
-from weasyprint import HTML
-from django.core.paginator import Paginator
 from .models import (
     Funcionario, Funcao, Financeiro,
-    LavagemCarreta, LavadorSujoEntry, LavadorCargaEntry, TipoCaixa, TipoProduto, Profile
+    Lavagem, LavagemCarreta, LavadorSujoEntry, LavadorCargaEntry, TipoCaixa, TipoProduto, Profile,
+    FechamentoMes, MesFechado, invalidar_kpis_presencas
 )
 from .forms import (
     FuncionarioForm, FuncaoForm, FinanceiroForm,
-    LavagemCarretaForm, LavadorSujoForm, LavadorCargaForm,
+    LavagemCarretaForm, LavadorSujoForm, LavadorCargaForm, LINHAS_LOTE_MAX, lote_formset,
     TipoCaixaForm, TipoProdutoForm, UserRegisterForm
 )
+from . import importacao
+from .graficos_svg import grafico_barras_empilhadas
+from .paginacao import paginar
 from .permissions import admin_required, entry_allowed
+from .services import (
+    PERIODOS, acumulado_financeiro, elegibilidade_bonus, grafico_painel, intervalo_periodo, kpis_do_mes,
+    lavagens_unificadas, tendencia_mensal, total_lavagens, totais_periodo,
+)
 
 
 # Registro
@@ -56,15 +50,15 @@ def register_request(request):
             user.profile.is_approved = False
             user.profile.save()
             messages.success(request, "Solicitação enviada. Aguarde aprovação do administrador.")
-            return render(request, 'mvb/register_done.html', {'user': user})
+            return TemplateResponse(request, 'mvb/register_done.html', {'user': user})
     else:
         form = UserRegisterForm()
-    return render(request, 'mvb/register.html', {'form': form})
+    return TemplateResponse(request, 'mvb/register.html', {'form': form})
 
 @admin_required
 def lista_pedidos_pendentes(request):
     pendentes = Profile.objects.filter(is_approved=False).select_related('user')
-    return render(request, 'mvb/pedidos_pendentes.html', {'pendentes': pendentes})
+    return TemplateResponse(request, 'mvb/pedidos_pendentes.html', {'pendentes': pendentes})
 
 @admin_required
 def aprovar_usuario(request, user_id):
@@ -85,56 +79,21 @@ def logout_view(request):
 @login_required
 def mvb_dashboard(request):
     hoje = date.today()
-    funcionarios = Funcionario.objects.filter(ativo=True)
-    inicio_sem = hoje - timedelta(days=hoje.weekday())
-    fim_sem = inicio_sem + timedelta(days=6)
-
-    elegiveis_semana = [
-        f for f in funcionarios if Presenca.objects.filter(
-            funcionario=f,
-            data__range=(inicio_sem, fim_sem),
-            status="F"
-        ).count() == 0
-    ]
-
-    elegiveis_mes = [
-        f for f in funcionarios if Presenca.objects.filter(
-            funcionario=f,
-            data__month=hoje.month,
-            data__year=hoje.year,
-            status="F"
-        ).count() == 0
-    ]
-
-    receita_carretas = LavagemCarreta.objects.filter(data__year=hoje.year, data__month=hoje.month).aggregate(
-        total=Sum(ExpressionWrapper(F('quantidade_caixas') * F('valor_por_caixa'), output_field=DecimalField()))
-    )['total'] or Decimal('0.00')
-
-    receita_sujo = LavadorSujoEntry.objects.filter(data__year=hoje.year, data__month=hoje.month).aggregate(
-        total=Sum(ExpressionWrapper(F('quantidade_caixas') * F('valor_por_caixa'), output_field=DecimalField()))
-    )['total'] or Decimal('0.00')
-
-    receita_carga = LavadorCargaEntry.objects.filter(data__year=hoje.year, data__month=hoje.month).aggregate(
-        total=Sum('valor_rendido')
-    )['total'] or Decimal('0.00')
-
-    receita_total = float(receita_carretas + receita_sujo + receita_carga)
-    financeiro = Financeiro.objects.filter(ano=hoje.year, mes=hoje.month).first()
-    despesas_total = float(financeiro.total) if financeiro else 0.0
-
-    return render(request, 'mvb/dashboard.html', {
-        'receita_total': receita_total,
-        'despesas_total': despesas_total,
-        'financeiro': financeiro,
-        'qtd_elegiveis_semana': len(elegiveis_semana),
-        'qtd_elegiveis_mes': len(elegiveis_mes),
+    kpis = kpis_do_mes(hoje)
+
+    return TemplateResponse(request, 'mvb/dashboard.html', {
+        'receita_total': kpis['receita_total'],
+        'despesas_total': kpis['despesas_total'],
+        'qtd_elegiveis_semana': kpis['qtd_elegiveis_semana'],
+        'qtd_elegiveis_mes': kpis['qtd_elegiveis_mes'],
+        'grafico_painel': grafico_painel(hoje) if request.user.is_staff else None,
     })
 
 # CRUD simplificados (use decorators conforme necessidade)
 @login_required
 def lista_funcoes(request):
     funcoes = Funcao.objects.all()
-    return render(request, 'mvb/lista_funcoes.html', {'funcoes': funcoes})
+    return TemplateResponse(request, 'mvb/lista_funcoes.html', {'funcoes': funcoes})
 
 @admin_required
 def nova_funcao(request):
@@ -143,12 +102,12 @@ def nova_funcao(request):
         form.save()
         messages.success(request, "Função criada.")
         return redirect('lista_funcoes')
-    return render(request, 'mvb/form.html', {'form': form, 'titulo': 'Nova Função'})
+    return TemplateResponse(request, 'mvb/form.html', {'form': form, 'titulo': 'Nova Função'})
 
 @login_required
 def lista_funcionarios(request):
     funcionarios = Funcionario.objects.select_related('funcao').all()
-    return render(request, 'mvb/lista_funcionarios.html', {'funcionarios': funcionarios})
+    return TemplateResponse(request, 'mvb/lista_funcionarios.html', {'funcionarios': funcionarios})
 
 # permite criar funcionário para quem tem permissão mvb.add_funcionario
 @login_required
@@ -162,7 +121,7 @@ def novo_funcionario(request):
             return redirect('lista_funcionarios')
         else:
             messages.error(request, "Erros no formulário. Verifique os campos.")
-    return render(request, 'mvb/form.html', {'form': form, 'titulo': 'Novo Funcionário'})
+    return TemplateResponse(request, 'mvb/form.html', {'form': form, 'titulo': 'Novo Funcionário'})
 
 @admin_required
 def editar_funcionario(request, pk):
@@ -172,7 +131,7 @@ def editar_funcionario(request, pk):
         form.save()
         messages.success(request, "Funcionário atualizado.")
         return redirect('lista_funcionarios')
-    return render(request, 'mvb/form.html', {'form': form, 'titulo': 'Editar Funcionário'})
+    return TemplateResponse(request, 'mvb/form.html', {'form': form, 'titulo': 'Editar Funcionário'})
 
 @admin_required
 def deletar_funcionario(request, pk):
@@ -181,12 +140,12 @@ def deletar_funcionario(request, pk):
         obj.delete()
         messages.success(request, "Funcionário excluído.")
         return redirect('lista_funcionarios')
-    return render(request, 'mvb/confirmar_exclusao.html', {'obj': obj})
+    return TemplateResponse(request, 'mvb/confirmar_exclusao.html', {'obj': obj})
 
 #Cadastrar caixas
 def lista_tipos_caixa(request):
-    tipos = TipoCaixa.objects.filter(ativo=True)
-    return render(request, 'mvb/lista_tipos_caixa.html', {'tipos': tipos})
+    tipos = TipoCaixa.objects.filter(ativo=True).order_by('nome')
+    return TemplateResponse(request, 'mvb/lista_tipos_caixa.html', {'tipos': tipos})
 
 def criar_tipo_caixa(request):
     if request.method == 'POST':
@@ -197,7 +156,7 @@ def criar_tipo_caixa(request):
     else:
         form = TipoCaixaForm()
 
-    return render(request, 'mvb/criar_tipo_caixa.html', {'form': form})
+    return TemplateResponse(request, 'mvb/criar_tipo_caixa.html', {'form': form})
 
 def excluir_tipo_caixa(request, pk):
     tipo = get_object_or_404(TipoCaixa, pk=pk)
@@ -207,12 +166,12 @@ def excluir_tipo_caixa(request, pk):
         tipo.save()
         return redirect('lista_tipos_caixa')
 
-    return render(request, 'mvb/confirmar_excluir_caixa.html', {'tipo': tipo})
+    return TemplateResponse(request, 'mvb/confirmar_excluir_caixa.html', {'tipo': tipo})
 
 #Cadastrar produto
 def lista_tipos_produto(request):
-    tipos = TipoProduto.objects.filter(ativo=True)
-    return render(request, 'mvb/lista_tipos_produto.html', {'tipos': tipos})
+    tipos = TipoProduto.objects.filter(ativo=True).order_by('nome')
+    return TemplateResponse(request, 'mvb/lista_tipos_produto.html', {'tipos': tipos})
 
 def criar_tipo_produto(request):
     if request.method == 'POST':
@@ -223,7 +182,7 @@ def criar_tipo_produto(request):
     else:
         form = TipoProdutoForm()
 
-    return render(request, 'mvb/criar_tipo_produto.html', {'form': form})
+    return TemplateResponse(request, 'mvb/criar_tipo_produto.html', {'form': form})
 
 def excluir_tipo_produto(request, pk):
     tipo = get_object_or_404(TipoProduto, pk=pk)
@@ -233,17 +192,14 @@ def excluir_tipo_produto(request, pk):
         tipo.save()
         return redirect('lista_tipos_produto')
 
-    return render(request, 'mvb/confirmar_excluir_produto.html', {'tipo': tipo})
+    return TemplateResponse(request, 'mvb/confirmar_excluir_produto.html', {'tipo': tipo})
 
 @login_required
 def lista_lavagens(request):
-    lavagens_list = LavagemCarreta.objects.select_related('tipo_caixa','tipo_produto').all().order_by('-data')
+    lavagens_list = LavagemCarreta.objects.select_related('tipo_caixa','tipo_produto','cliente','criado_por')
+    lavagens = paginar(request, lavagens_list, tamanho=6)
 
-    paginator = Paginator(lavagens_list, 6)  # 10 por página
-    page_number = request.GET.get('page')
-    lavagens = paginator.get_page(page_number)
-
-    return render(request, 'mvb/lista_lavagens.html', {'lavagens': lavagens})
+    return TemplateResponse(request, 'mvb/lista_lavagens.html', {'lavagens': lavagens})
 
 @admin_required
 def editar_lavagem(request, pk):
@@ -257,7 +213,7 @@ def editar_lavagem(request, pk):
     else:
         form = LavagemCarretaForm(instance=lavagem)
 
-    return render(request, "mvb/editar_lavagem.html", {
+    return TemplateResponse(request, "mvb/editar_lavagem.html", {
         "form": form,
         "lavagem": lavagem
     })
@@ -267,10 +223,13 @@ def excluir_lavagem(request, pk):
     lavagem = get_object_or_404(LavagemCarreta, pk=pk)
 
     if request.method == "POST":
-        lavagem.delete()
+        try:
+            lavagem.delete()
+        except MesFechado as e:
+            messages.error(request, " ".join(e.messages))
         return redirect("lista_lavagens")
 
-    return render(request, "mvb/excluir_lavagem.html", {
+    return TemplateResponse(request, "mvb/excluir_lavagem.html", {
         "lavagem": lavagem
     })
 
@@ -290,12 +249,12 @@ def nova_lavagem(request):
             messages.error(request, "Erros no formulário. Verifique os campos.")
     else:
         form = LavagemCarretaForm()
-    return render(request, "mvb/lavagemcarreta_form.html", {"form": form})
+    return TemplateResponse(request, "mvb/lavagemcarreta_form.html", {"form": form})
 
 @login_required
 def lista_lavador_sujo(request):
-    entries = LavadorSujoEntry.objects.select_related('tipo_produto').all().order_by('-data')
-    return render(request, 'mvb/lista_lavador_sujo.html', {'entries': entries})
+    entries = paginar(request, LavadorSujoEntry.objects.select_related('tipo_produto', 'cliente'))
+    return TemplateResponse(request, 'mvb/lista_lavador_sujo.html', {'entries': entries})
 
 @entry_allowed
 def novo_lavador_sujo(request):
@@ -311,12 +270,12 @@ def novo_lavador_sujo(request):
             messages.error(request, "Erros no formulário. Verifique os campos.")
     else:
         form = LavadorSujoForm()
-    return render(request, "mvb/lavadorsujo_form.html", {"form": form})
+    return TemplateResponse(request, "mvb/lavadorsujo_form.html", {"form": form})
 
 @login_required
 def lista_lavador_carga(request):
-    entries = LavadorCargaEntry.objects.all().order_by('-data')
-    return render(request, 'mvb/lista_lavador_carga.html', {'entries': entries})
+    entries = paginar(request, LavadorCargaEntry.objects.select_related('cliente'))
+    return TemplateResponse(request, 'mvb/lista_lavador_carga.html', {'entries': entries})
 
 @entry_allowed
 def novo_lavador_carga(request):
@@ -334,7 +293,92 @@ def novo_lavador_carga(request):
             messages.error(request, "Erros no formulário. Verifique os campos.")
     else:
         form = LavadorCargaForm()
-    return render(request, "mvb/lavadorcarga_form.html", {"form": form})
+    return TemplateResponse(request, "mvb/lavadorcarga_form.html", {"form": form})
+
+# Lançamento em lote: origem -> (formulário de cada linha, título)
+FORMULARIOS_LOTE = {
+    'carreta': (LavagemCarretaForm, "Lavagens de Carretas"),
+    'sujo': (LavadorSujoForm, "Lavador Sujo"),
+    'carga': (LavadorCargaForm, "Lavador Carga"),
+}
+LINHAS_LOTE = 10
+
+@entry_allowed
+def lavagens_em_lote(request, origem):
+    if origem not in FORMULARIOS_LOTE:
+        raise Http404
+    form_class, titulo = FORMULARIOS_LOTE[origem]
+    try:
+        linhas = min(max(int(request.GET.get('linhas', LINHAS_LOTE)), 1), LINHAS_LOTE_MAX)
+    except ValueError:
+        linhas = LINHAS_LOTE
+    try:
+        dia = date.fromisoformat(request.GET.get('data', ''))
+    except ValueError:
+        dia = date.today()
+    FormSet = lote_formset(form_class, linhas)
+    # o POST volta para a mesma URL: com o mesmo initial, as linhas intocadas não contam como preenchidas
+    inicial = [{'data': dia}] * linhas
+
+    if request.method == "POST":
+        formset = FormSet(request.POST, initial=inicial)
+        if formset.is_valid():
+            # linhas em branco não mudam nada e ficam fora do save()
+            lavagens = formset.save(commit=False)
+            for lavagem in lavagens:
+                lavagem.criado_por = request.user
+            try:
+                form_class._meta.model.criar_em_lote(lavagens)
+            except MesFechado as e:
+                messages.error(request, e.messages[0])
+            else:
+                if lavagens:
+                    messages.success(request, f"{len(lavagens)} lançamento(s) de {titulo} registrados.")
+                else:
+                    messages.warning(request, "Nenhuma linha preenchida.")
+                return redirect("lista_lavagens")
+        else:
+            messages.error(request, "Erros no formulário. Verifique as linhas marcadas.")
+    else:
+        formset = FormSet(initial=inicial)
+    return TemplateResponse(request, "mvb/lavagens_lote.html", {
+        "formset": formset,
+        "titulo": titulo,
+        "origem": origem,
+        "origens": [(chave, t) for chave, (_, t) in FORMULARIOS_LOTE.items()],
+        "linhas": linhas,
+        "dia": dia,
+    })
+
+# Erros exibidos na tela da importação; o comando importar_lavagens --erros gera o relatório completo
+ERROS_EXIBIDOS = 500
+# Linhas aceitas pela tela: a importação roda dentro da requisição (~2,5s a cada
+# 10 mil linhas) e precisa terminar bem antes do timeout do gunicorn (30s)
+LIMITE_LINHAS_WEB = 20000
+
+@admin_required
+def importar_lavagens(request):
+    resultado = None
+    if request.method == "POST":
+        arquivo = request.FILES.get("arquivo")
+        if arquivo is None:
+            messages.error(request, "Selecione uma planilha .xlsx ou .csv.")
+        else:
+            try:
+                resultado = importacao.importar_lavagens(
+                    arquivo, arquivo.name, usuario=request.user, validar_apenas=bool(request.POST.get("validar")),
+                    limite=LIMITE_LINHAS_WEB,
+                )
+            except importacao.PlanilhaInvalida as e:
+                messages.error(request, str(e))
+            except MesFechado as e:
+                messages.error(request, e.messages[0])
+    return TemplateResponse(request, "mvb/importar_lavagens.html", {
+        "resultado": resultado,
+        "erros": resultado.erros[:ERROS_EXIBIDOS] if resultado else [],
+        "validar": bool(request.POST.get("validar")),
+        "limite": LIMITE_LINHAS_WEB,
+    })
 
 @login_required
 def lista_financeiro(request):
@@ -348,39 +392,17 @@ def lista_financeiro(request):
     if mes:
         qs = qs.filter(mes=int(mes))
 
-    # 🔹 Totais do mês (para os cards)
-    receita_total = qs.aggregate(total=Sum('total'))['total'] or 0
-    despesas_total = qs.aggregate(total=Sum('total'))['total'] or 0
-
-    # 🔹 Acumulado mensal
-    acumulado_por_mes = (
-        qs.values('ano', 'mes')
-          .annotate(soma=Sum('total'))
-          .order_by('ano', 'mes')
-    )
-
-    acumulado_cumulativo = []
-    running = 0
-    for row in acumulado_por_mes:
-        running += row['soma'] or 0
-        acumulado_cumulativo.append({
-            'ano': row['ano'],
-            'mes': row['mes'],
-            'soma': row['soma'],
-            'acumulado': running
-        })
+    # 🔹 Somas mensais e acumulado (uma consulta, em cache por filtro)
+    acumulado = acumulado_financeiro(ano=int(ano) if ano else None, mes=int(mes) if mes else None)
 
-    # 🔹 Paginação (AGORA no lugar certo)
-    paginator = Paginator(qs, 6)
-    page_number = request.GET.get('page')
-    financeiros = paginator.get_page(page_number)
+    # 🔹 Paginação por cursor (mantém os filtros ano/mes nos links)
+    financeiros = paginar(request, qs, tamanho=6)
 
-    return render(request, 'mvb/lista_financeiro.html', {
+    return TemplateResponse(request, 'mvb/lista_financeiro.html', {
         'financeiros': financeiros,
-        'receita_total': receita_total,
-        'despesas_total': despesas_total,
-        'acumulado_por_mes': acumulado_por_mes,
-        'acumulado_cumulativo': acumulado_cumulativo,
+        'receita_total': acumulado['total'],
+        'despesas_total': acumulado['total'],
+        'acumulado_cumulativo': acumulado['meses'],
     })
 
 
@@ -393,7 +415,7 @@ def adicionar_financeiro(request):
         financeiro.save()
         messages.success(request, f'Lançamento financeiro de {financeiro.data.strftime("%d/%m/%Y")} salvo com sucesso.')
         return redirect('lista_financeiro')
-    return render(request, 'mvb/form.html', {'form': form, 'titulo': 'Adicionar Financeiro'})
+    return TemplateResponse(request, 'mvb/form.html', {'form': form, 'titulo': 'Adicionar Financeiro'})
 
 
 @admin_required
@@ -408,7 +430,7 @@ def editar_financeiro(request, pk):
     else:
         form = FinanceiroForm(instance=financeiro)
 
-    return render(request, "mvb/editar_financeiro.html", {
+    return TemplateResponse(request, "mvb/editar_financeiro.html", {
         "form": form,
         "financeiro": financeiro
     })
@@ -418,10 +440,13 @@ def excluir_financeiro(request, pk):
     financeiro = get_object_or_404(Financeiro, pk=pk)
 
     if request.method == "POST":
-        financeiro.delete()
+        try:
+            financeiro.delete()
+        except MesFechado as e:
+            messages.error(request, " ".join(e.messages))
         return redirect("lista_financeiro")
 
-    return render(request, "mvb/excluir_financeiro.html", {
+    return TemplateResponse(request, "mvb/excluir_financeiro.html", {
         "financeiro": financeiro
     })
 
@@ -443,55 +468,6 @@ def novo_financeiro(request):
 
     return redirect('lista_financeiro')
 
-@login_required
-@permission_required('mvb.view_financeiro', raise_exception=True)
-def exportar_financeiro_excel(request):
-    ano = request.GET.get('ano')
-    mes = request.GET.get('mes')
-
-    qs = Financeiro.objects.all().order_by('-ano', '-mes')
-    if ano:
-        qs = qs.filter(ano=int(ano))
-    if mes:
-        qs = qs.filter(mes=int(mes))
-
-    rows = []
-    total_geral = 0
-    for f in qs:
-        rows.append({
-            "Data": f.data.strftime("%d/%m/%y") if f.data else "",
-            "Ano": f.ano,
-            "Mes": f.mes,
-            "Salarios": float(f.salario_total_funcionarios or 0),
-            "Frete": float(f.frete or 0),
-            "Cafe": float(f.refeicao_cafe or 0),
-            "Almoço": float(f.refeicao_almoco or 0),
-            "Contabilidade": float(f.contabilidade or 0),
-            "INSS": float(f.inss or 0),
-            "Total (R$)": float(f.total or 0),
-        })
-        total_geral += float(f.total or 0)
-
-    # linha final
-    rows.append({
-        "Data": "",
-        "Ano": "",
-        "Mes": "",
-        "Salarios": "",
-        "Frete": "",
-        "Cafe": "",
-        "Almoço": "",
-        "Contabilidade": "",
-        "INSS": "TOTAL GERAL",
-        "Total (R$)": total_geral,
-    })
-
-    df = pd.DataFrame(rows)
-    response = HttpResponse(content_type='application/vnd.ms-excel')
-    response['Content-Disposition'] = 'attachment; filename=financeiro_relatorio.xlsx'
-    df.to_excel(response, index=False)
-    return response
-
 def gerar_dados_financeiro():
     dados = []
     registros = Financeiro.objects.all().order_by('-data')
@@ -512,144 +488,25 @@ def gerar_dados_financeiro():
 
     return dados
 
-@login_required
-def financeiro_grafico_png(request):
-    # agrupamento por mes
-    qs = Financeiro.objects.values('ano','mes').annotate(total=Sum('total')).order_by('ano','mes')
-    labels = [f"{r['ano']}-{r['mes']}" for r in qs]
-    values = [float(r['total'] or 0) for r in qs]
-
-    plt.figure(figsize=(6,2.5))
-    plt.plot(labels, values, marker='o')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-    return HttpResponse(buf.getvalue(), content_type='image/png')
-
-@login_required
-@permission_required('mvb.view_financeiro', raise_exception=True)
-def exportar_financeiro_pdf(request):
-    ano = request.GET.get('ano')
-    mes = request.GET.get('mes')
-
-    qs = Financeiro.objects.all().order_by('ano','mes')
-    if ano: qs = qs.filter(ano=int(ano))
-    if mes: qs = qs.filter(mes=int(mes))
-
-    # montar tabela
-    data_table = [["Data","Ano","Mês","Salários","Frete","Café","Almoço","Contab.","INSS","Total"]]
-    total_geral = 0
-    x_labels = []
-    y_totals = []
-
-    for f in qs:
-        data_table.append([
-            f.criado_em.strftime("%Y-%m-%d"),
-            str(f.ano),
-            str(f.mes),
-            f"{f.salario_total_funcionarios:.2f}",
-            f"{f.frete:.2f}",
-            f"{f.refeicao_cafe:.2f}",
-            f"{f.refeicao_almoco:.2f}",
-            f"{f.contabilidade:.2f}",
-            f"{f.inss:.2f}",
-            f"{f.total:.2f}",
-        ])
-        total_geral += float(f.total or 0)
-        x_labels.append(f"{f.ano}-{f.mes}")
-        y_totals.append(float(f.total or 0))
-
-    # linha total
-    data_table.append(["","","","","","","","TOTAL GERAL","","",f"{total_geral:.2f}"])
-
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    elems = [Paragraph("Relatório Financeiro", styles['Title']), Spacer(1,12)]
-
-    # tabela
-    table = Table(data_table, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('GRID',(0,0),(-1,-1),0.5,colors.black),
-        ('BACKGROUND',(0,0),(-1,0),colors.lightgrey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-    ]))
-    elems.append(table)
-    elems.append(Spacer(1,12))
-    
-    # gráfico (barras)
-    if x_labels and y_totals:
-        plt.figure(figsize=(8,3))
-        plt.bar(x_labels, y_totals)
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        imgbuf = io.BytesIO()
-        plt.savefig(imgbuf, format='png')
-        plt.close()
-        imgbuf.seek(0)
-        im = Image(imgbuf, width=450, height=150)
-        elems.append(Paragraph("Total por Período", styles['Heading3']))
-        elems.append(im)
-
-    doc.build(elems)
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename=financeiro_relatorio.pdf'
-    return response
-
 # Relatório (reaproveitável)
 @login_required
 def relatorio_periodo(request, periodo='diario'):
-    hoje = date.today()
-    if periodo == 'diario':
-        dt_inicio = dt_fim = hoje
-    elif periodo == 'semanal':
-        dt_inicio = hoje - timedelta(days=hoje.weekday())
-        dt_fim = dt_inicio + timedelta(days=6)
-    elif periodo == 'mensal':
-        dt_inicio = hoje.replace(day=1)
-        if dt_inicio.month == 12:
-            prox = dt_inicio.replace(year=dt_inicio.year+1, month=1, day=1)
-        else:
-            prox = dt_inicio.replace(month=dt_inicio.month+1, day=1)
-        dt_fim = prox - timedelta(days=1)
-    else:
-        start = request.GET.get('start'); end = request.GET.get('end')
-        if start and end:
-            dt_inicio = date.fromisoformat(start)
-            dt_fim = date.fromisoformat(end)
-        else:
-            dt_inicio = dt_fim = hoje
-
-    receita_carretas = LavagemCarreta.objects.filter(data__range=(dt_inicio, dt_fim)).aggregate(
-        total=Sum(ExpressionWrapper(F('quantidade_caixas') * F('valor_por_caixa'), output_field=DecimalField()))
-    )['total'] or Decimal('0.00')
-
-    receita_sujo = LavadorSujoEntry.objects.filter(data__range=(dt_inicio, dt_fim)).aggregate(
-        total=Sum(ExpressionWrapper(F('quantidade_caixas') * F('valor_por_caixa'), output_field=DecimalField()))
-    )['total'] or Decimal('0.00')
-
-    receita_carga = LavadorCargaEntry.objects.filter(data__range=(dt_inicio, dt_fim)).aggregate(
-        total=Sum('valor_rendido')
-    )['total'] or Decimal('0.00')
-
-    receita_total = receita_carretas + receita_sujo + receita_carga
-
-    meses = set(); cursor = dt_inicio
-    while cursor <= dt_fim:
-        meses.add((cursor.year, cursor.month))
-        cursor = cursor + timedelta(days=1)
-
-    despesas_total = Decimal('0.00')
-    financeiro_qs = Financeiro.objects.filter(Q(ano__in=[y for y,m in meses]) & Q(mes__in=[m for y,m in meses]))
-    for f in financeiro_qs:
-        despesas_total += f.total or Decimal("0.00")
-
-    lucro = receita_total - despesas_total
+    dt_inicio, dt_fim = intervalo_periodo(periodo, request.GET)
+    totais = totais_periodo(dt_inicio, dt_fim)
+    receitas = totais['receitas']
+    receita_carretas = receitas['carreta']['valor']
+    receita_sujo = receitas['sujo']['valor']
+    receita_carga = receitas['carga']['valor']
+    receita_total = totais['receita_total']
+    despesas_total = totais['despesas_total']
+    lucro = totais['lucro']
+
+    grafico = grafico_barras_empilhadas(["Receitas", "Despesas"], [
+        ("Carretas", [receita_carretas, 0]),
+        ("Lavador sujo", [receita_sujo, 0]),
+        ("Lavador carga", [receita_carga, 0]),
+        ("Despesas", [0, despesas_total]),
+    ], altura=220, titulo="Receitas por origem e despesas")
 
     context = {
         'periodo': periodo,
@@ -661,13 +518,61 @@ def relatorio_periodo(request, periodo='diario'):
         'receita_total': receita_total,
         'despesas_total': despesas_total,
         'lucro': lucro,
+        'grafico': grafico,
+        'periodos': PERIODOS,
     }
-    return render(request, 'mvb/relatorio.html', context)
+    return TemplateResponse(request, 'mvb/relatorio.html', context)
+
+# Limite da série de tendência pedida pela API
+MAX_MESES_TENDENCIA = 60
+
+@admin_required
+@require_GET
+def api_tendencia_mensal(request):
+    try:
+        meses = int(request.GET.get('meses', 12))
+    except ValueError:
+        meses = 12
+    meses = min(max(meses, 1), MAX_MESES_TENDENCIA)
+
+    campos = ['carreta', 'sujo', 'carga', 'receita', 'despesas', 'lucro']
+    serie = [
+        {'mes': f"{item['mes']:%Y-%m}", **{campo: float(item[campo]) for campo in campos}}
+        for item in tendencia_mensal(meses)
+    ]
+    return JsonResponse({'meses': meses, 'serie': serie})
+
+# Fechamento de mês
+@admin_required
+def fechamentos(request):
+    if request.method == "POST":
+        try:
+            ano, mes = (int(p) for p in request.POST.get("mes", "").split("-"))
+            fechamento = FechamentoMes.fechar(ano, mes, request.user)
+        except ValueError:
+            messages.error(request, "Informe o mês no formato AAAA-MM.")
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
+        else:
+            messages.success(request, f"Mês {fechamento.mes:02d}/{fechamento.ano} fechado.")
+        return redirect("fechamentos")
+
+    return TemplateResponse(request, "mvb/fechamentos.html", {
+        "fechamentos": FechamentoMes.objects.select_related("fechado_por"),
+    })
+
+@admin_required
+@require_POST
+def reabrir_fechamento(request, pk):
+    fechamento = get_object_or_404(FechamentoMes, pk=pk)
+    fechamento.reabrir()
+    messages.success(request, f"Mês {fechamento.mes:02d}/{fechamento.ano} reaberto.")
+    return redirect("fechamentos")
 
 @login_required
 def lista_clientes(request):
-    cliente = Cliente.objects.all()
-    return render(request, 'mvb/lista_clientes.html', {'clientes': cliente})
+    cliente = paginar(request, Cliente.objects.all(), campos=('nome', 'id'))
+    return TemplateResponse(request, 'mvb/lista_clientes.html', {'clientes': cliente})
 
 @admin_required
 def editar_cliente(request, pk):
@@ -681,7 +586,7 @@ def editar_cliente(request, pk):
     else:
         form = ClienteForm(instance=cliente)
 
-    return render(request, "mvb/editar_cliente.html", {
+    return TemplateResponse(request, "mvb/editar_cliente.html", {
         "form": form,
         "cliente": cliente
     })
@@ -691,10 +596,18 @@ def excluir_cliente(request, pk):
     cliente = get_object_or_404(Cliente, pk=pk)
 
     if request.method == "POST":
-        cliente.delete()
+        try:
+            # a exclusão em cascata é desfeita por inteiro se algum pre_delete recusar
+            with transaction.atomic():
+                cliente.delete()
+        except ProtectedError:
+            messages.error(request, "O cliente tem lavagens de carreta registradas e não pode ser excluído.")
+        except MesFechado as e:
+            # as lavagens de lavador sujo/carga iriam junto, e alguma está num mês fechado
+            messages.error(request, " ".join(e.messages))
         return redirect("lista_clientes")
 
-    return render(request, "mvb/excluir_cliente.html", {
+    return TemplateResponse(request, "mvb/excluir_cliente.html", {
         "cliente": cliente
     })
 
@@ -709,21 +622,23 @@ def novo_cliente(request):
             return redirect("lista_clientes")
         else:
             messages.error(request, "Erro ao salvar cliente.")
-    return render(request, "mvb/cliente_form.html", {"form": form})
+    return TemplateResponse(request, "mvb/cliente_form.html", {"form": form})
 
 @login_required
 def lista_presencas(request):
     funcionario_id = request.GET.get("func")
 
-    presencas = Presenca.objects.select_related("funcionario").order_by("-data", "funcionario__nome")
+    presencas = Presenca.objects.select_related("funcionario")
 
     # Se filtrou por funcionário
     if funcionario_id:
         presencas = presencas.filter(funcionario_id=funcionario_id)
 
-    funcionarios = Funcionario.objects.filter(ativo=True)
+    presencas = paginar(request, presencas)
 
-    return render(request, "mvb/lista_presencas.html", {
+    funcionarios = Funcionario.objects.filter(ativo=True).order_by('nome')
+
+    return TemplateResponse(request, "mvb/lista_presencas.html", {
         "presencas": presencas,
         "funcionarios": funcionarios,
         "func_selected": funcionario_id,
@@ -740,7 +655,7 @@ def editar_presenca(request, pk):
             presenca.save()
             return redirect("lista_presencas")
 
-    return render(request, "mvb/editar_presenca.html", {
+    return TemplateResponse(request, "mvb/editar_presenca.html", {
         "presenca": presenca
     })
 
@@ -753,7 +668,7 @@ def excluir_presenca(request, pk):
         messages.success(request, "Presença removida com sucesso.")
         return redirect("lista_presencas")
 
-    return render(request, "mvb/confirmar_excluir_presenca.html", {
+    return TemplateResponse(request, "mvb/confirmar_excluir_presenca.html", {
         "presenca": presenca
     })
 
@@ -768,17 +683,29 @@ def registrar_presencas(request):
         if not data:
             messages.error(request, "Selecione uma data.")
             return redirect("registrar_presencas")
+        try:
+            data = date.fromisoformat(data)
+        except ValueError:
+            messages.error(request, "Data inválida.")
+            return redirect("registrar_presencas")
 
-        # Salva cada funcionário
-        for funcionario in funcionarios:
-            status = request.POST.get(f"status_{funcionario.id}")  # P / F / O / vazio
+        # Monta a folha inteira e grava num único upsert (unique funcionario+data)
+        presencas = []
+        for funcionario_id in funcionarios.values_list("id", flat=True):
+            status = request.POST.get(f"status_{funcionario_id}")  # P / F / O / vazio
 
-            if status:
-                Presenca.objects.update_or_create(
-                    funcionario=funcionario,
-                    data=data,
-                    defaults={"status": status},
-                )
+            if status in ("P", "F", "O"):
+                presencas.append(Presenca(funcionario_id=funcionario_id, data=data, status=status))
+
+        with transaction.atomic():
+            Presenca.objects.bulk_create(
+                presencas,
+                update_conflicts=True,
+                unique_fields=["funcionario", "data"],
+                update_fields=["status"],
+            )
+            # bulk_create não dispara signals
+            invalidar_kpis_presencas(data)
 
         messages.success(request, "Presenças registradas com sucesso.")
         return redirect("lista_presencas")
@@ -786,554 +713,57 @@ def registrar_presencas(request):
     # Se usuário abriu a página com ?data=AAAA-MM-DD
     presencas_dict = {}
     if data_selecionada:
-        presencas = Presenca.objects.filter(data=data_selecionada)
-        presencas_dict = {p.funcionario.id: p.status for p in presencas}
+        presencas_dict = dict(
+            Presenca.objects.filter(data=data_selecionada).values_list("funcionario_id", "status")
+        )
 
-    return render(request, "mvb/registrar_presencas.html", {
+    return TemplateResponse(request, "mvb/registrar_presencas.html", {
         "funcionarios": funcionarios,
         "data": data_selecionada,
         "presencas_dict": presencas_dict,
     })
 
-def funcionario_sem_faltas_na_semana(funcionario, data_referencia):
-    segunda = data_referencia - timedelta(days=data_referencia.weekday())
-    domingo = segunda + timedelta(days=6)
-
-    # Falta real = status F
-    falta = Presenca.objects.filter(
-        funcionario=funcionario,
-        data__range=[segunda, domingo],
-        status="F"
-    ).exists()
-
-    return not falta
-
-def funcionario_sem_faltas_no_mes(funcionario, data_referencia):
-    ano = data_referencia.year
-    mes = data_referencia.month
-
-    falta = Presenca.objects.filter(
-        funcionario=funcionario,
-        data__year=ano,
-        data__month=mes,
-        status="F"
-    ).exists()
-
-    return not falta
-
 @login_required
 def verificar_eligiveis_e_conceder(request):
-    hoje = date.today()
-
-    # Semana atual (segunda a domingo)
-    inicio_sem = hoje - timedelta(days=hoje.weekday())
-    fim_sem = inicio_sem + timedelta(days=6)
-
-    # Mês atual
-    inicio_mes = hoje.replace(day=1)
-    _, last_day = monthrange(inicio_mes.year, inicio_mes.month)
-    fim_mes = inicio_mes.replace(day=last_day)
-
-    funcionarios = Funcionario.objects.filter(ativo=True)
-
-    dados = []  # estrutura final enviada para o template
-
-    for f in funcionarios:
-        faltas_sem = Presenca.objects.filter(
-            funcionario=f, data__range=(inicio_sem, fim_sem), status="F"
-        ).count()
-
-        faltas_mes = Presenca.objects.filter(
-            funcionario=f, data__range=(inicio_mes, fim_mes), status="F"
-        ).count()
-
-        presencas_sem = Presenca.objects.filter(
-            funcionario=f, data__range=(inicio_sem, fim_sem), status="P"
-        ).count()
-
-        folgas_sem = Presenca.objects.filter(
-            funcionario=f, data__range=(inicio_sem, fim_sem), status="O"
-        ).count()
-
-        dados.append({
-            "funcionario": f,
-            "pres_sem": presencas_sem,
-            "faltas_sem": faltas_sem,
-            "folgas_sem": folgas_sem,
-            "elegivel_sem": faltas_sem == 0,
-            "elegivel_mes": faltas_mes == 0,
-        })
+    dados = elegibilidade_bonus(date.today())  # estrutura final enviada para o template
 
     if request.method == "POST":
+        bonus = []
+        for item in dados:
+            f = item["funcionario"]
+
+            if request.POST.get(f"sem_{f.id}") == "on" and item["elegivel_sem"]:
+                bonus.append(BonusPayment(
+                    funcionario=f,
+                    tipo="semanal",
+                    valor=Decimal("120.00"),
+                    criado_por=request.user,
+                ))
+
+            if request.POST.get(f"mes_{f.id}") == "on" and item["elegivel_mes"]:
+                bonus.append(BonusPayment(
+                    funcionario=f,
+                    tipo="cesta",
+                    valor=Decimal("0.00"),
+                    criado_por=request.user,
+                ))
+
         with transaction.atomic():
-            for item in dados:
-                f = item["funcionario"]
-
-                if request.POST.get(f"sem_{f.id}") == "on" and item["elegivel_sem"]:
-                    BonusPayment.objects.create(
-                        funcionario=f,
-                        tipo="semanal",
-                        valor=Decimal("120.00"),
-                        criado_por=request.user,
-                    )
-
-                if request.POST.get(f"mes_{f.id}") == "on" and item["elegivel_mes"]:
-                    BonusPayment.objects.create(
-                        funcionario=f,
-                        tipo="cesta",
-                        valor=Decimal("0.00"),
-                        criado_por=request.user,
-                    )
+            BonusPayment.objects.bulk_create(bonus)
 
         messages.success(request, "Bônus e cestas concedidos com sucesso!")
         return redirect("verificar_eligiveis_e_conceder")
 
-    return render(request, "mvb/bonus_grant.html", {
+    return TemplateResponse(request, "mvb/bonus_grant.html", {
         "dados": dados,
     })
 
-# Exportar Relatório Excel (admin)
-@admin_required
-def export_relatorio_excel(request, periodo='mensal'):
-    hoje = date.today()
-    # definir dt_inicio/dt_fim como no relatorio_periodo
-    if periodo == 'mensal':
-        dt_inicio = hoje.replace(day=1)
-        if dt_inicio.month == 12:
-            prox = dt_inicio.replace(year=dt_inicio.year+1, month=1, day=1)
-        else:
-            prox = dt_inicio.replace(month=dt_inicio.month+1, day=1)
-        dt_fim = prox - timedelta(days=1)
-    else:
-        dt_inicio = dt_fim = hoje
-
-    lavagens = LavagemCarreta.objects.filter(data__range=(dt_inicio, dt_fim))
-    sujos = LavadorSujoEntry.objects.filter(data__range=(dt_inicio, dt_fim))
-    cargas = LavadorCargaEntry.objects.filter(data__range=(dt_inicio, dt_fim))
-    financeiro_qs = Financeiro.objects.filter(ano__in=[dt_inicio.year, dt_fim.year], mes__in=[dt_inicio.month, dt_fim.month])
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Resumo"
-
-    rows = [
-        ["Período", f"{dt_inicio} a {dt_fim}"],
-        [],
-        ["Receitas"],
-        ["Tipo", "Quantidade", "Valor Total (R$)"],
-    ]
-
-    receita_carretas_total = sum([c.quantidade_caixas * c.valor_por_caixa for c in lavagens])
-    rows.append(["Lavagens Carretas", sum([c.quantidade_caixas for c in lavagens]), float(receita_carretas_total)])
-    receita_sujos_total = sum([s.quantidade_caixas * s.valor_por_caixa for s in sujos])
-    rows.append(["Lavador Sujo", sum([s.quantidade_caixas for s in sujos]), float(receita_sujos_total)])
-    receita_cargas_total = sum([c.valor_rendido for c in cargas])
-    rows.append(["Lavador Carga (valor rendido)", sum([c.quantidade_caixas for c in cargas]), float(receita_cargas_total)])
-
-    rows.append([])
-    rows.append(["Despesas"])
-    rows.append(["Ano","Mês","Salário Total","Frete","Café","Almoço","Contabilidade","INSS","Total Despesas"])
-    for f in financeiro_qs:
-        rows.append([f.ano, f.mes, float(f.salario_total_funcionarios), float(f.frete), float(f.refeicao_cafe), float(f.refeicao_almoco), float(f.contabilidade), float(f.inss), float(f.total_despesas())])
-
-    for r_idx, row in enumerate(rows, start=1):
-        for c_idx, value in enumerate(row, start=1):
-            ws.cell(row=r_idx, column=c_idx, value=value)
-
-    for col in ws.columns:
-        max_length = 0
-        col_letter = get_column_letter(col[0].column)
-        for cell in col:
-            try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except:
-                pass
-        ws.column_dimensions[col_letter].width = (max_length + 2)
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename=relatorio_{periodo}_{dt_inicio}_{dt_fim}.xlsx'
-    wb.save(response)
-    return response
-
-# Exportar Relatório PDF (admin)
-@admin_required
-def export_relatorio_pdf(request, periodo='mensal'):
-    hoje = date.today()
-    if periodo == 'mensal':
-        dt_inicio = hoje.replace(day=1)
-        if dt_inicio.month == 12:
-            prox = dt_inicio.replace(year=dt_inicio.year+1, month=1, day=1)
-        else:
-            prox = dt_inicio.replace(month=dt_inicio.month+1, day=1)
-        dt_fim = prox - timedelta(days=1)
-    else:
-        dt_inicio = dt_fim = hoje
-
-    lavagens = LavagemCarreta.objects.filter(data__range=(dt_inicio, dt_fim))
-    sujos = LavadorSujoEntry.objects.filter(data__range=(dt_inicio, dt_fim))
-    cargas = LavadorCargaEntry.objects.filter(data__range=(dt_inicio, dt_fim))
-    financeiro_qs = Financeiro.objects.filter(ano__in=[dt_inicio.year, dt_fim.year], mes__in=[dt_inicio.month, dt_fim.month])
-
-    context = {
-        'dt_inicio': dt_inicio,
-        'dt_fim': dt_fim,
-        'lavagens': lavagens,
-        'sujos': sujos,
-        'cargas': cargas,
-        'financeiro_qs': financeiro_qs,
-    }
-    html_string = render_to_string('mvb/relatorio_pdf.html', context)
-    html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-    pdf = html.write_pdf()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=relatorio_{periodo}_{dt_inicio}_{dt_fim}.pdf'
-    return response
-
-@admin_required
-def exportar_excel_filtrado(request):
-    tipo = request.GET.get("tipo")
-    data = request.GET.get("data")
-    cliente = request.GET.get("cliente")
-    data_inicio = request.GET.get("data_inicio")
-    data_fim = request.GET.get("data_fim")
-
-    incluir_lavagens = request.GET.get("incluir_lavagens")
-    incluir_financeiro = request.GET.get("incluir_financeiro")
-    incluir_presencas = request.GET.get("incluir_presencas")
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = "attachment; filename=relatorio_filtrado.xlsx"
-
-    with pd.ExcelWriter(response, engine="openpyxl") as writer:
-
-        # ======================
-        # LAVAGENS
-        # ======================
-        if incluir_lavagens:
-            lavagens = filtrar_lavagens(
-                tipo=tipo,
-                data=data,
-                cliente=cliente,
-                data_inicio=data_inicio,
-                data_fim=data_fim
-            )
-
-            dados_lavagens = []
-            total_geral = 0
-
-            for l in lavagens:
-                valor_unitario = getattr(l, "valor_por_caixa", None) or getattr(l, "valor_rendido", 0)
-                valor_unitario = float(valor_unitario or 0)
-
-                quantidade = l.quantidade_caixas or 0
-                subtotal = quantidade * valor_unitario
-                total_geral += subtotal
-
-                dados_lavagens.append({
-                    "Data": l.data.strftime("%d/%m/%Y"),
-                    "Cliente": l.cliente.nome if l.cliente else "",
-                    "Tipo": l.get_tipo_lavagem_display(),
-                    "Produto": getattr(l, "tipo_produto", ""),
-                    "Tipo Caixa": getattr(l, "tipo_caixa", getattr(l, "tamanho_caixa", "")),
-                    "Quantidade": quantidade,
-                    "Valor Unitário": valor_unitario,
-                    "Subtotal": subtotal,
-                })
-
-            df_lavagens = pd.DataFrame(dados_lavagens)
-
-            # ➕ Linha TOTAL (forma segura)
-            if not df_lavagens.empty:
-                linha_total_lavagens = {col: "" for col in df_lavagens.columns}
-                linha_total_lavagens["Subtotal"] = total_geral
-
-                df_lavagens = pd.concat(
-                    [df_lavagens, pd.DataFrame([linha_total_lavagens])],
-                    ignore_index=True
-                )
-
-            df_lavagens.to_excel(writer, sheet_name="Lavagens", index=False)
-
-        # ======================
-        # FINANCEIRO
-        # ======================
-        if incluir_financeiro:
-            financeiros = Financeiro.objects.all()
-
-            if data:
-                financeiros = financeiros.filter(data=data)
-            if data_inicio:
-                financeiros = financeiros.filter(data__gte=data_inicio)
-            if data_fim:
-                financeiros = financeiros.filter(data__lte=data_fim)
-
-            dados_financeiro = []
-            total_financeiro = 0
-
-            for f in financeiros:
-                total_financeiro += float(f.total)
-
-                dados_financeiro.append({
-                    "Data": f.data.strftime("%d/%m/%Y"),
-                    "Salários": float(f.salario_total_funcionarios),
-                    "Frete": float(f.frete),
-                    "Café": float(f.refeicao_cafe),
-                    "Almoço": float(f.refeicao_almoco),
-                    "Contabilidade": float(f.contabilidade),
-                    "INSS": float(f.inss),
-                    "Total": float(f.total),
-                })
-
-            df_fin = pd.DataFrame(dados_financeiro)
-
-            # ➕ Linha TOTAL (forma segura)
-            if not df_fin.empty:
-                linha_total_fin = {col: "" for col in df_fin.columns}
-                linha_total_fin["Total"] = total_financeiro
-
-                df_fin = pd.concat(
-                    [df_fin, pd.DataFrame([linha_total_fin])],
-                    ignore_index=True
-                )
-
-            df_fin.to_excel(writer, sheet_name="Financeiro", index=False)
-
-        # ======================
-        # PRESENÇAS
-        # ======================
-        if incluir_presencas:
-            presencas = filtrar_presencas(
-                funcionario=cliente,  # se você reutilizar o select
-                data=data,
-                data_inicio=data_inicio,
-                data_fim=data_fim
-            )
-
-            dados_presencas = []
-
-            total_presentes = 0
-            total_faltas = 0
-
-            for p in presencas:
-                status = p.get_status_display()
-
-                if status.lower() == "presente":
-                    total_presentes += 1
-                elif status.lower() == "falta":
-                    total_faltas += 1
-
-                dados_presencas.append({
-                    "Data": p.data.strftime("%d/%m/%Y"),
-                    "Funcionário": p.funcionario.nome,
-                    "Status": status,
-                })
-
-            df_presencas = pd.DataFrame(dados_presencas)
-
-            if not df_presencas.empty:
-                linha_total = {
-                    "Data": "",
-                    "Funcionário": "TOTAL",
-                    "Status": f"Presentes: {total_presentes} | Faltas: {total_faltas}"
-                }
-
-                df_presencas = pd.concat(
-                    [df_presencas, pd.DataFrame([linha_total])],
-                    ignore_index=True
-                )
-
-            df_presencas.to_excel(writer, sheet_name="Presenças", index=False)
-
-    return response
-
-@admin_required
-def exportar_pdf_filtrado(request):
-    tipo = request.GET.get("tipo")
-    data = request.GET.get("data")
-    cliente = request.GET.get("cliente")
-
-    data_inicio = request.GET.get("data_inicio")
-    data_fim = request.GET.get("data_fim")
-
-    incluir_lavagens = request.GET.get("incluir_lavagens")
-    incluir_financeiro = request.GET.get("incluir_financeiro")
-    incluir_presencas = request.GET.get("incluir_presencas")
-
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = "attachment; filename=relatorio_filtrado.pdf"
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    styles = getSampleStyleSheet()
-
-    elementos = [Paragraph("Relatório Filtrado", styles["Title"])]
-
-    # =========================
-    # LAVAGENS (SÓ SE MARCADO)
-    # =========================
-    if incluir_lavagens:
-        lavagens = filtrar_lavagens(
-            tipo=tipo,
-            data=data,
-            cliente=cliente,
-            data_inicio=data_inicio,
-            data_fim=data_fim,
-        )
-
-        data_table = [
-            ["Data", "Cliente", "Tipo", "Produto", "Tipo Caixa", "Qtd", "Valor Unit.", "Total"]
-        ]
-
-        total_geral = 0
-
-        for l in lavagens:
-            valor_unitario = getattr(l, "valor_por_caixa", None) or getattr(l, "valor_rendido", 0) or 0
-            quantidade = l.quantidade_caixas or 0
-            subtotal = quantidade * float(valor_unitario)
-
-            total_geral += subtotal
-
-            data_table.append([
-                l.data.strftime("%d/%m/%Y"),
-                l.cliente.nome if l.cliente else "",
-                l.get_tipo_lavagem_display(),
-                getattr(l, "tipo_produto", ""),
-                getattr(l, "tipo_caixa", getattr(l, "tamanho_caixa", "")),
-                quantidade,
-                f"R$ {valor_unitario:.2f}",
-                f"R$ {subtotal:.2f}",
-            ])
-
-        data_table.append(["", "", "", "", "", "", "TOTAL", f"R$ {total_geral:.2f}"])
-
-        table = Table(data_table, repeatRows=1)
-        table.setStyle(TableStyle([
-            ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-            ("GRID", (0,0), (-1,-1), 0.5, colors.black),
-            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-            ("FONTNAME", (-2,-1), (-1,-1), "Helvetica-Bold"),
-            ("BACKGROUND", (-2,-1), (-1,-1), colors.beige),
-        ]))
-
-        elementos.append(Paragraph("Lavagens", styles["Heading2"]))
-        elementos.append(table)
-
-    # =========================
-    # FINANCEIRO (SÓ SE MARCADO)
-    # =========================
-    if incluir_financeiro:
-        financeiros = Financeiro.objects.all()
-
-        if data:
-            financeiros = financeiros.filter(data=data)
-
-        if data_inicio:
-            financeiros = financeiros.filter(data__gte=data_inicio)
-
-        if data_fim:
-            financeiros = financeiros.filter(data__lte=data_fim)
-
-        tabela_financeiro = [
-            ["Data", "Salários", "Frete", "Café", "Almoço", "Contabilidade", "INSS", "Total"]
-        ]
-
-        total_geral_financeiro = 0
-
-        for f in financeiros:
-            total_geral_financeiro += float(f.total)
-
-            tabela_financeiro.append([
-                f.data.strftime("%d/%m/%Y"),
-                f"R$ {f.salario_total_funcionarios:.2f}",
-                f"R$ {f.frete:.2f}",
-                f"R$ {f.refeicao_cafe:.2f}",
-                f"R$ {f.refeicao_almoco:.2f}",
-                f"R$ {f.contabilidade:.2f}",
-                f"R$ {f.inss:.2f}",
-                f"R$ {f.total:.2f}",
-            ])
-
-        tabela_financeiro.append([
-            "", "", "", "", "", "", "TOTAL", f"R$ {total_geral_financeiro:.2f}"
-        ])
-
-        table_fin = Table(tabela_financeiro, repeatRows=1)
-        table_fin.setStyle(TableStyle([
-            ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-            ("GRID", (0,0), (-1,-1), 0.5, colors.black),
-            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-            ("FONTNAME", (-2,-1), (-1,-1), "Helvetica-Bold"),
-            ("BACKGROUND", (-2,-1), (-1,-1), colors.beige),
-        ]))
-
-        elementos.append(Paragraph("Financeiro", styles["Heading2"]))
-        elementos.append(table_fin) 
-
-    # ======================
-    # PRESENÇAS (PDF)
-    # ======================
-    if incluir_presencas:
-        presencas = filtrar_presencas(
-            funcionario=cliente,
-            data=data,
-            data_inicio=data_inicio,
-            data_fim=data_fim
-        )
-
-        tabela_presencas = [
-            ["Data", "Funcionário", "Status"]
-        ]
-
-        total_presentes = 0
-        total_faltas = 0
-
-        for p in presencas:
-            status = p.get_status_display()
-
-            if status.lower() == "presente":
-                total_presentes += 1
-            elif status.lower() == "falta":
-                total_faltas += 1
-
-            tabela_presencas.append([
-                p.data.strftime("%d/%m/%Y"),
-                p.funcionario.nome,
-                status,
-            ])
-
-        # Linha de totais
-        tabela_presencas.append([
-            "",
-            "TOTAL",
-            f"Presentes: {total_presentes} | Faltas: {total_faltas}"
-        ])
-
-        table = Table(tabela_presencas, colWidths=[80, 220, 200])
-
-        table.setStyle(TableStyle([
-            ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-            ("GRID", (0,0), (-1,-1), 0.5, colors.black),
-            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-            ("FONTNAME", (1,-1), (-1,-1), "Helvetica-Bold"),
-            ("BACKGROUND", (1,-1), (-1,-1), colors.beige),
-            ("ALIGN", (0,0), (-1,-1), "CENTER"),
-            ("ALIGN", (1,1), (1,-1), "LEFT"),
-        ]))
-
-        elementos.append(Paragraph("Relatório de Presenças", styles["Heading2"]))
-        elementos.append(table)   
-
-    doc.build(elementos)
-    return response
-
 # View da tela inicial (formulário)
 @admin_required
 def relatorios(request):
     from .models import Cliente
     clientes = Cliente.objects.all()
-    return render(request, "mvb/relatorios.html", {"clientes": clientes})
+    return TemplateResponse(request, "mvb/relatorios.html", {"clientes": clientes})
 
 # View que processa o relatório
 @admin_required
@@ -1357,36 +787,28 @@ def resultado_relatorio(request):
     total_geral = Decimal("0.00")
 
     if incluir_lavagens:
-        lavagens_queryset = filtrar_lavagens(
-            tipo=tipo,
-            data=data,
-            cliente=cliente,
-            data_inicio=data_inicio,
-            data_fim=data_fim
-        )
-
-        for l in lavagens_queryset:
-            valor_unitario = getattr(l, "valor_por_caixa", None) or getattr(l, "valor_rendido", 0)
-
-            try:
-                valor_unitario = Decimal(valor_unitario)
-            except:
-                valor_unitario = Decimal("0.00")
-
-            quantidade = l.quantidade_caixas or 0
-            subtotal = quantidade * valor_unitario
-            total_geral += subtotal
-
+        filtros = {
+            "tipo": tipo,
+            "data": data,
+            "cliente": cliente,
+            "data_inicio": data_inicio,
+            "data_fim": data_fim,
+        }
+        tipos = dict(LavagemCarreta.TIPO_CHOICES)
+
+        # carretas, lavador sujo e lavador carga em uma consulta, com o subtotal vindo do banco
+        for l in lavagens_unificadas(**filtros):
             lavagens_processadas.append({
-                "data": l.data,
-                "cliente": l.cliente.nome if l.cliente else "",
-                "tipo_lavagem": l.get_tipo_lavagem_display(),
-                "produto": getattr(l, "tipo_produto", ""),
-                "tipo_caixa": getattr(l, "tipo_caixa", getattr(l, "tamanho_caixa", "")),
-                "quantidade": quantidade,
-                "valor_unitario": valor_unitario,
-                "subtotal": subtotal,
+                "data": l["data"],
+                "cliente": l["cliente_nome"],
+                "tipo_lavagem": tipos.get(l["tipo"], l["tipo"]),
+                "produto": l["produto"],
+                "tipo_caixa": l["caixa"],
+                "quantidade": l["quantidade"] or 0,
+                "valor_unitario": l["valor_unitario"] or Decimal("0.00"),
+                "subtotal": l["subtotal"] or Decimal("0.00"),
             })
+        total_geral = total_lavagens(**filtros)
 
     # =========================
     # FINANCEIRO
@@ -1440,7 +862,7 @@ def resultado_relatorio(request):
     # =========================
     # RENDER
     # =========================
-    return render(request, "mvb/resultado_relatorio.html", {
+    return TemplateResponse(request, "mvb/resultado_relatorio.html", {
         "lavagens": lavagens_processadas,
         "financeiros": financeiros_queryset,
         "presencas": presencas_processadas,
@@ -1459,178 +881,13 @@ def resultado_relatorio(request):
         "total_financeiro": total_financeiro,
     })
 
-def filtrar_lavagens(tipo=None, data=None, cliente=None, data_inicio=None, data_fim=None):
-    lavagens = LavagemCarreta.objects.all()
-
-    # FILTRO POR TIPO
-    if tipo:
-        lavagens = lavagens.filter(tipo_lavagem=tipo)
-
-    # FILTRO POR CLIENTE
-    if cliente:
-        lavagens = lavagens.filter(cliente__nome__icontains=cliente)
-
-    # FILTRO POR DATA EXATA
-    if data:
-        try:
-            d = datetime.strptime(data, "%Y-%m-%d").date()
-            lavagens = lavagens.filter(data=d)
-        except:
-            pass
-
-    # FILTRO POR PERÍODO
-    if data_inicio and data_fim:
-        try:
-            di = datetime.strptime(data_inicio, "%Y-%m-%d").date()
-            df = datetime.strptime(data_fim, "%Y-%m-%d").date()
-            lavagens = lavagens.filter(data__range=[di, df])
-        except:
-            pass
-
-    return lavagens
-
-def filtrar_presencas(funcionario=None, data=None, data_inicio=None, data_fim=None):
-    qs = Presenca.objects.select_related("funcionario")
-
-    if funcionario:
-        qs = qs.filter(funcionario__nome=funcionario)
-
-    if data:
-        qs = qs.filter(data=data)
-
-    if data_inicio:
-        qs = qs.filter(data__gte=data_inicio)
-
-    if data_fim:
-        qs = qs.filter(data__lte=data_fim)
-
-    return qs.order_by("data", "funcionario__nome")
-
 @admin_required
 def relatorio_por_cliente(request, cliente_id=None):
     if cliente_id:
         cliente = get_object_or_404(Cliente, pk=cliente_id)
-        lavagens = LavagemCarreta.objects.filter(cliente=cliente)
-        sujos = LavadorSujoEntry.objects.filter(cliente=cliente)
-        cargas = LavadorCargaEntry.objects.filter(cliente=cliente)
+        # as três origens em uma consulta, pelo índice (cliente, data)
+        lavagens = Lavagem.objects.filter(cliente=cliente).order_by('data', 'origem', 'id')
     else:
         cliente = None
-        lavagens = sujos = cargas = []
-    return render(request, 'mvb/relatorio_cliente.html', {'cliente': cliente, 'lavagens': lavagens, 'sujos': sujos, 'cargas': cargas})
-
-@login_required
-def exportar_lavagens_excel(request):
-    tipo = request.GET.get("tipo")
-    data = request.GET.get("data")
-    cliente = request.GET.get("cliente")
-
-    lavagens = filtrar_lavagens(tipo, data, cliente)
-
-    linhas = []
-    total_geral = 0
-
-    for l in lavagens:
-        valor_unitario = getattr(l, "valor_por_caixa", None) or getattr(l, "valor_rendido", None)
-        subtotal = l.quantidade_caixas * valor_unitario if valor_unitario else 0
-
-        total_geral += subtotal
-
-        linhas.append({
-            "Data": l.data,
-            "Cliente": l.cliente.nome if l.cliente else "",
-            "Tipo Lavagem": l.get_tipo_lavagem_display(),
-            "Produto": getattr(l, "tipo_produto", ""),
-            "Tipo Caixa": getattr(l, "tipo_caixa", getattr(l, "tamanho_caixa", "")),
-            "Quantidade": l.quantidade_caixas,
-            "Valor Unitário (R$)": float(valor_unitario) if valor_unitario else 0,
-            "Subtotal (R$)": float(subtotal),
-        })
-
-    # ADICIONAR LINHA EXTRA DO TOTAL GERAL
-    linhas.append({
-        "Data": "",
-        "Cliente": "",
-        "Tipo Lavagem": "",
-        "Produto": "",
-        "Tipo Caixa": "",
-        "Quantidade": "",
-        "Valor Unitário (R$)": "",
-        "Subtotal (R$)": float(total_geral),
-    })
-
-    df = pd.DataFrame(linhas)
-
-    # remover timezone do Data caso necessário
-    if "Data" in df.columns:
-        df["Data"] = pd.to_datetime(df["Data"], errors="coerce").dt.date
-
-    response = HttpResponse(content_type="application/vnd.ms-excel")
-    response["Content-Disposition"] = 'attachment; filename="lavagens_filtradas.xlsx"'
-    df.to_excel(response, index=False)
-
-    return response
-
-@login_required
-def exportar_lavagens_pdf(request):
-    tipo = request.GET.get("tipo")
-    data = request.GET.get("data")
-    cliente = request.GET.get("cliente")
-
-    lavagens = filtrar_lavagens(tipo, data, cliente)
-
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = "attachment; filename=lavagens_filtradas.pdf"
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    styles = getSampleStyleSheet()
-
-    tabela = [
-        ["Data", "Cliente", "Tipo", "Produto", "Caixa", "Qtd", "Valor Unit.", "Subtotal"],
-    ]
-
-    total_geral = 0
-
-    for l in lavagens:
-        valor_unitario = getattr(l, "valor_por_caixa", None) or getattr(l, "valor_rendido", None)
-        subtotal = l.quantidade_caixas * valor_unitario if valor_unitario else 0
-        total_geral += subtotal
-
-        tabela.append([
-            str(l.data),
-            l.cliente.nome if l.cliente else "",
-            l.get_tipo_lavagem_display(),
-            getattr(l, "tipo_produto", ""),
-            getattr(l, "tipo_caixa", getattr(l, "tamanho_caixa", "")),
-            l.quantidade_caixas,
-            f"R$ {valor_unitario:.2f}" if valor_unitario else "-",
-            f"R$ {subtotal:.2f}",
-        ])
-
-    # ADICIONAR TOTAL GERAL
-    tabela.append([
-        "",
-        "",
-        "",
-        "",
-        "",
-        "",
-        "TOTAL GERAL:",
-        f"R$ {total_geral:.2f}",
-    ])
-
-    table = Table(tabela)
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-        ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-        ("ALIGN", (5, 1), (7, -1), "RIGHT"),
-        ("BACKGROUND", (6, -1), (7, -1), colors.whitesmoke),
-        ("FONTSIZE", (0, 0), (-1, -1), 9),
-    ]))
-
-    doc.build([
-        Paragraph("Relatório de Lavagens", styles["Title"]),
-        table
-    ])
-
-    return response
\ No newline at end of file
+        lavagens = []
+    return TemplateResponse(request, 'mvb/relatorio_cliente.html', {'cliente': cliente, 'lavagens': lavagens})
@@ -0,0 +1,152 @@
+"""
+Views de exportação (Excel/CSV/PDF), gráficos e exportações em segundo plano.
+
+Ficam fora de views.py para que o carregamento das urls não importe nenhuma
+biblioteca de relatório: mvb.exportacao só importa openpyxl, reportlab e
+weasyprint quando uma destas views gera o arquivo.
+"""
+import io
+
+from django.contrib.auth.decorators import login_required, permission_required
+from django.db.models import Sum
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET, require_POST
+
+from .exportacao import (
+    GERADORES, impressao_grafico, resposta_exportacao, nome_relatorio,
+    secoes_relatorio, secoes_filtrado, secoes_financeiro, secoes_lavagens
+)
+from .graficos_svg import grafico_linha
+from .models import ExportJob, Financeiro
+from .permissions import admin_required
+
+
+@login_required
+@permission_required('mvb.view_financeiro', raise_exception=True)
+def exportar_financeiro_excel(request):
+    return resposta_exportacao(
+        secoes_financeiro(request.GET), "financeiro_relatorio", request.GET.get("formato", "xlsx")
+    )
+
+TAMANHO_GRAFICO_FINANCEIRO = (640, 240)
+
+@login_required
+def financeiro_grafico(request):
+    # agrupamento por mes
+    qs = Financeiro.objects.values('ano','mes').annotate(total=Sum('total')).order_by('ano','mes')
+    labels = [f"{r['mes']:02d}/{r['ano']}" for r in qs]
+    values = [float(r['total'] or 0) for r in qs]
+
+    # A versão sai dos próprios dados agregados, então também muda com
+    # QuerySet.update(), que não dispara signals.
+    etag = quote_etag(impressao_grafico("linha", labels, values, TAMANHO_GRAFICO_FINANCEIRO))
+    nao_modificado = get_conditional_response(request, etag=etag)
+    if nao_modificado is not None:
+        # o navegador já tem esta versão: o SVG nem é montado
+        nao_modificado['ETag'] = etag
+        patch_cache_control(nao_modificado, private=True, no_cache=True)
+        return nao_modificado
+
+    largura, altura = TAMANHO_GRAFICO_FINANCEIRO
+    svg = grafico_linha(labels, [("Despesas", values)], largura=largura, altura=altura, titulo="Despesas por mês")
+    response = HttpResponse(svg, content_type='image/svg+xml')
+    response['ETag'] = etag
+    # privado (a rota exige login), mas sempre revalidado pelo ETag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+# Os PDFs (WeasyPrint) levam segundos para sair: as views abaixo só enfileiram
+# o job e devolvem 202; a página acompanha por status_exportacao.
+@login_required
+@permission_required('mvb.view_financeiro', raise_exception=True)
+@require_POST
+def exportar_financeiro_pdf(request):
+    return _enfileirar(request, 'financeiro_pdf', _parametros(request))
+
+# Exportar Relatório Excel (admin)
+@admin_required
+def export_relatorio_excel(request, periodo='mensal'):
+    params = {**request.GET.dict(), "periodo": periodo}
+    return resposta_exportacao(
+        secoes_relatorio(params), nome_relatorio(periodo, params), request.GET.get("formato", "xlsx")
+    )
+
+# Exportar Relatório PDF (admin)
+@admin_required
+@require_POST
+def export_relatorio_pdf(request, periodo='mensal'):
+    return _enfileirar(request, 'relatorio_pdf', {**_parametros(request), "periodo": periodo})
+
+@admin_required
+def exportar_excel_filtrado(request):
+    return resposta_exportacao(
+        secoes_filtrado(request.GET), "relatorio_filtrado", request.GET.get("formato", "xlsx")
+    )
+
+@admin_required
+@require_POST
+def exportar_pdf_filtrado(request):
+    return _enfileirar(request, "filtrado_pdf", _parametros(request))
+
+# Exportações em segundo plano: enfileira o job e devolve onde acompanhar
+@admin_required
+@require_POST
+def solicitar_exportacao(request, tipo):
+    if tipo not in GERADORES:
+        raise Http404("Tipo de exportação desconhecido.")
+    return _enfileirar(request, tipo, _parametros(request))
+
+# status e download só mostram os jobs do próprio usuário: basta o login, já que
+# exportar_financeiro_pdf também enfileira para quem não é admin
+@login_required
+@require_GET
+def status_exportacao(request, pk):
+    job = get_object_or_404(ExportJob.objects.defer("conteudo"), pk=pk, solicitado_por=request.user)
+    return JsonResponse(_status_exportacao(job))
+
+@login_required
+@require_GET
+def baixar_exportacao(request, pk):
+    job = get_object_or_404(
+        ExportJob.objects.exclude(nome_arquivo=""), pk=pk, solicitado_por=request.user, status="concluido"
+    )
+    return FileResponse(io.BytesIO(job.conteudo), as_attachment=True, filename=job.nome_arquivo)
+
+def _parametros(request):
+    parametros = request.GET.dict()
+    parametros.update({k: v for k, v in request.POST.items() if k != "csrfmiddlewaretoken"})
+    return parametros
+
+def _enfileirar(request, tipo, parametros):
+    job = ExportJob.objects.create(tipo=tipo, parametros=parametros, solicitado_por=request.user)
+    return JsonResponse(_status_exportacao(job), status=202)
+
+def _status_exportacao(job):
+    dados = {
+        "id": job.pk,
+        "tipo": job.tipo,
+        "status": job.status,
+        "progresso": job.progresso,
+        "status_url": reverse("status_exportacao", args=[job.pk]),
+    }
+    if job.status == "concluido" and job.nome_arquivo:
+        dados["download_url"] = reverse("baixar_exportacao", args=[job.pk])
+    elif job.status == "erro":
+        # o detalhe fica em job.erro (admin) e no log do worker
+        dados["erro"] = "Falha ao gerar o arquivo."
+    return dados
+
+@login_required
+def exportar_lavagens_excel(request):
+    return resposta_exportacao(
+        secoes_lavagens(request.GET), "lavagens_filtradas", request.GET.get("formato", "xlsx")
+    )
+
+@login_required
+@require_POST
+def exportar_lavagens_pdf(request):
+    return _enfileirar(request, "lavagens_pdf", _parametros(request))
@@ -0,0 +1,122 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("mvb.desempenho")
+
+_medicao_atual = ContextVar("medicao_atual", default=None)
+
+
+class Medicao:
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.tempo_template = 0.0
+        self.sqls = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: chamado em volta de cada consulta da conexão
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_db += time.perf_counter() - inicio
+            self.consultas += 1
+            self.sqls.add(sql)
+
+    def instalar(self):
+        """Context manager que mede as consultas de todas as conexões da thread."""
+        pilha = ExitStack()
+        for conexao in connections.all():
+            pilha.enter_context(conexao.execute_wrapper(self))
+        return pilha
+
+
+class ServerTimingMiddleware:
+    """
+    Mede consultas, tempo de banco e de template de cada requisição.
+
+    O resultado vai para o log "mvb.desempenho" (uma linha JSON por requisição, em DEBUG) e,
+    para staff ou com DEBUG, para o cabeçalho Server-Timing, visível no DevTools.
+    Requisições acima de SERVER_TIMING_LIMITE_CONSULTAS são registradas como WARNING.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limite = getattr(settings, "SERVER_TIMING_LIMITE_CONSULTAS", 50)
+
+    def __call__(self, request):
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            with medicao.instalar():
+                response = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+
+        user = getattr(request, "user", None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            # em respostas streaming o cabeçalho sai antes do corpo: cobre só a view
+            response["Server-Timing"] = ", ".join([
+                f'db;dur={medicao.tempo_db * 1000:.1f};desc="{medicao.consultas} consultas"',
+                f"tpl;dur={medicao.tempo_template * 1000:.1f}",
+                f"total;dur={(time.perf_counter() - inicio) * 1000:.1f}",
+            ])
+
+        # O corpo de um StreamingHttpResponse (CSV das exportações) é gerado depois
+        # que a view retorna, e costuma ser onde estão as consultas: o registro
+        # espera o fim do stream. FileResponse de arquivo só lê disco, e trocar o
+        # iterador desligaria o wsgi.file_wrapper.
+        if response.streaming and not response.is_async and getattr(response, "file_to_stream", None) is None:
+            response.streaming_content = self._medir_stream(
+                response.streaming_content, request, response, medicao, inicio
+            )
+        else:
+            self._registrar(request, response, medicao, inicio)
+        return response
+
+    def process_template_response(self, request, response):
+        # As views devolvem TemplateResponse, renderizado pelo handler logo depois
+        # deste hook (o último a rodar, por este middleware ser o primeiro da lista):
+        # o tempo até o post_render_callback é o do template, includes e extends.
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            inicio = time.perf_counter()
+
+            def fim(response):
+                medicao.tempo_template += time.perf_counter() - inicio
+
+            response.add_post_render_callback(fim)
+        return response
+
+    def _medir_stream(self, conteudo, request, response, medicao, inicio):
+        try:
+            with medicao.instalar():
+                yield from conteudo
+        finally:
+            self._registrar(request, response, medicao, inicio)
+
+    def _registrar(self, request, response, medicao, inicio):
+        total = time.perf_counter() - inicio
+        excesso = medicao.consultas > self.limite
+        match = getattr(request, "resolver_match", None)
+        registro = {
+            "metodo": request.method,
+            "caminho": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "db_ms": round(medicao.tempo_db * 1000, 1),
+            "template_ms": round(medicao.tempo_template * 1000, 1),
+            "consultas": medicao.consultas,
+            "consultas_repetidas": medicao.consultas - len(medicao.sqls),
+            "excesso_consultas": excesso,
+        }
+        # DEBUG para o tráfego normal (SERVER_TIMING_LOG_LEVEL=DEBUG mostra tudo); WARNING acima do limite
+        logger.log(logging.WARNING if excesso else logging.DEBUG, json.dumps(registro, ensure_ascii=False))
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 import dj_database_url
 from pathlib import Path
 
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'project.middleware.server_timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +61,29 @@ MIDDLEWARE += [
     "project.middleware.permission_denied.PermissionDeniedMiddleware",
 ]
 
+# Acima disso a requisição é registrada como WARNING no log mvb.desempenho
+SERVER_TIMING_LIMITE_CONSULTAS = int(os.environ.get("SERVER_TIMING_LIMITE_CONSULTAS", "50"))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'mvb.desempenho': {
+            'handlers': ['console'],
+            'level': os.environ.get("SERVER_TIMING_LOG_LEVEL", "INFO"),
+            'propagate': False,
+        },
+        'mvb.exportacao': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 
 ROOT_URLCONF = 'project.urls'
 
@@ -119,6 +144,15 @@ DATABASES = {
     )
 }
 
+# Cache compartilhado entre os workers do gunicorn (snapshot do painel etc.).
+# Em produção pode ser trocado por outro backend via variáveis de ambiente.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'mvb_cache')),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators